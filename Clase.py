@@ -4,45 +4,594 @@ import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
 import matplotlib
+from numpy.lib.stride_tricks import sliding_window_view
+
+from compartido import adjuntar, publicar
+from instrumentacion import etapa, medir
+
+
+def media_varianza_movil(valores, ventana, bloque=None):
+    """
+    Calcula la media y la varianza (ddof=0) móviles de 'ventana' periodos en una sola pasada O(n).
+    El valor en la posición i corresponde a la ventana que termina en i; las primeras
+    'ventana' - 1 posiciones quedan a NaN.
+
+    Las sumas acumuladas se reinician en bloques de 'bloque' filas y se centran en el primer
+    valor de cada bloque, lo que evita la pérdida de precisión de una suma acumulada global
+    sobre series largas de precios.
+    """
+    x = np.asarray(valores, dtype=float)
+    n = len(x)
+    media = np.full(n, np.nan)
+    varianza = np.full(n, np.nan)
+    if n < ventana:
+        return media, varianza
+
+    if bloque is None:
+        bloque = max(64, ventana)
+    n_bloques = -(-n // bloque)
+
+    # Cada fila de 'segmentos' contiene un bloque precedido de las ventana-1 observaciones anteriores
+    relleno = np.full(n_bloques * bloque + ventana - 1, x[0])
+    relleno[ventana - 1:ventana - 1 + n] = x
+    segmentos = sliding_window_view(relleno, bloque + ventana - 1)[::bloque]
+    referencia = segmentos[:, ventana - 1:ventana]
+    desvios = segmentos - referencia
+
+    # Sumas acumuladas de desvíos y de sus cuadrados dentro de cada bloque
+    suma = np.zeros((n_bloques, bloque + ventana))
+    suma_cuadrados = np.zeros((n_bloques, bloque + ventana))
+    np.cumsum(desvios, axis=1, out=suma[:, 1:])
+    np.cumsum(desvios * desvios, axis=1, out=suma_cuadrados[:, 1:])
+
+    media_bloque = (suma[:, ventana:] - suma[:, :-ventana]) / ventana
+    varianza_bloque = (suma_cuadrados[:, ventana:] - suma_cuadrados[:, :-ventana]) / ventana - media_bloque ** 2
+
+    media[:] = (media_bloque + referencia).ravel()[:n]
+    varianza[:] = np.maximum(varianza_bloque, 0.0).ravel()[:n]
+
+    # Donde la varianza es ínfima frente a las sumas de cuadrados (ventanas constantes o casi) la resta
+    # pierde casi todas las cifras: esas ventanas se recalculan directamente, igual que np.var
+    cota = 1e-6 * ((suma_cuadrados[:, ventana:] + suma_cuadrados[:, :-ventana]) / ventana + media_bloque ** 2)
+    imprecisas = np.flatnonzero((varianza_bloque <= cota).ravel()[:n])
+    imprecisas = imprecisas[imprecisas >= ventana - 1]
+    if len(imprecisas):
+        varianza[imprecisas] = sliding_window_view(x, ventana)[imprecisas - ventana + 1].var(axis=1)
+
+    media[:ventana - 1] = np.nan
+    varianza[:ventana - 1] = np.nan
+    return media, varianza
+
+
+
+def filtro_exponencial(valores, alfa, inicial=None, bloque=256):
+    """
+    Aplica el filtro y[t] = y[t-1] + alfa * (x[t] - y[t-1]) (media exponencial) sin bucles de Python.
+    Sin 'inicial', el filtro empieza en el primer valor no nulo (y = x, como pandas ewm(adjust=False))
+    y las posiciones anteriores quedan a NaN; con 'inicial', este es el valor de y justo antes de x[0].
+    A partir del primer valor, un NaN en 'valores' se propaga al resto de la serie.
+
+    La serie se divide en bloques de 'bloque' valores. Dentro de cada bloque el filtro es una suma
+    acumulada ponderada por potencias de (1 - alfa); el valor con el que termina cada bloque sigue
+    el mismo filtro (con factor (1 - alfa)**bloque), que se resuelve recursivamente sobre una serie
+    'bloque' veces más corta.
+    """
+    x = np.asarray(valores, dtype=float)
+    y = np.full(len(x), np.nan)
+    if inicial is None:
+        validos = np.flatnonzero(~np.isnan(x))
+        if len(validos) == 0:
+            return y
+        primero = validos[0]
+        y[primero] = x[primero]
+        y[primero + 1:] = _filtro_lineal(alfa * x[primero + 1:], 1.0 - alfa, x[primero], bloque)
+    else:
+        y[:] = _filtro_lineal(alfa * x, 1.0 - alfa, inicial, bloque)
+    return y
+
+
+def _filtro_lineal(entrada, factor, inicial, bloque):
+    """Resuelve y[t] = factor * y[t-1] + entrada[t] con y[-1] = inicial (ver filtro_exponencial)."""
+    n = len(entrada)
+    if n == 0:
+        return entrada.copy()
+    if factor < 1e-50:
+        # factor**2 es despreciable: basta con el término de la fila anterior, sin dividir por potencias
+        # ínfimas del factor (que desbordan al llegar a los subnormales en la recursión)
+        salida = entrada.copy()
+        salida[0] += factor * inicial
+        salida[1:] += factor * entrada[:-1]
+        return salida
+
+    # Tamaño de bloque con el que factor**-bloque no supera 1e100 (sin desbordamiento ni pérdida de precisión);
+    # con factor >= 1e-50 es de al menos 2 filas
+    bloque = int(min(bloque, 100 * np.log(10) / -np.log(factor))) if factor < 1.0 else bloque
+    n_bloques = -(-n // bloque)
+    segmentos = np.zeros(n_bloques * bloque)
+    segmentos[:n] = entrada
+    segmentos = segmentos.reshape(n_bloques, bloque)
+
+    # Filtro dentro de cada bloque partiendo de 0 (operaciones en el mismo array para no copiar la serie)
+    potencias = factor ** np.arange(bloque)
+    segmentos /= potencias
+    np.cumsum(segmentos, axis=1, out=segmentos)
+    segmentos *= potencias
+
+    # Valor de y al final del bloque anterior a cada bloque, y su efecto sobre el bloque
+    if n_bloques > 1:
+        finales = _filtro_lineal(segmentos[:-1, -1], factor ** bloque, inicial, bloque)
+        anteriores = np.concatenate([[inicial], finales])
+    else:
+        anteriores = np.array([inicial], dtype=float)
+    segmentos += anteriores[:, None] * (factor * potencias)
+    return segmentos.ravel()[:n]
+
+
+def media_wilder(valores, periodo, anterior=None):
+    """
+    Media de Wilder de 'periodo' valores (media exponencial con alfa = 1 / periodo), usada por el RSI y el ATR.
+    Sin 'anterior', el primer valor es la media simple de los 'periodo' primeros valores no nulos y las
+    posiciones anteriores quedan a NaN; con 'anterior', se continúa la media desde ese valor.
+    """
+    x = np.asarray(valores, dtype=float)
+    if anterior is not None and not np.isnan(anterior):
+        return filtro_exponencial(x, 1.0 / periodo, inicial=anterior)
+
+    media = np.full(len(x), np.nan)
+    validos = np.flatnonzero(~np.isnan(x))
+    if len(validos) < periodo:
+        return media
+    semilla = validos[0] + periodo - 1
+    media[semilla] = x[validos[0]:semilla + 1].mean()
+    media[semilla + 1:] = filtro_exponencial(x[semilla + 1:], 1.0 / periodo, inicial=media[semilla])
+    return media
+
+
+def rango_verdadero(high, low, close):
+    """
+    True range de cada vela: el mayor de high - low, |high - cierre anterior| y |low - cierre anterior|.
+    La primera vela no tiene cierre anterior y queda a NaN.
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    rango = np.full(len(close), np.nan)
+    rango[1:] = np.maximum(high[1:] - low[1:], np.maximum(np.abs(high[1:] - close[:-1]), np.abs(low[1:] - close[:-1])))
+    return rango
+
+
+# Formas incrementales: cada función recibe el estado tras la vela anterior (los últimos valores de los
+# indicadores, ya fuera del periodo de calentamiento) y devuelve el estado tras una vela nueva.
+
+def paso_exponencial(anterior, valor, alfa):
+    """Un paso de filtro_exponencial (y de media_wilder, con alfa = 1 / periodo)."""
+    return anterior + alfa * (valor - anterior)
+
+
+def paso_ema(anterior, close, periodo=20):
+    """EMA de 'periodo' velas tras un cierre nuevo."""
+    return paso_exponencial(anterior, close, 2.0 / (periodo + 1))
+
+
+def paso_macd(ema_rapida, ema_lenta, senal, close, rapida=12, lenta=26, periodo_senal=9):
+    """Devuelve (EMA rápida, EMA lenta, MACD, señal, histograma) tras un cierre nuevo."""
+    ema_rapida = paso_ema(ema_rapida, close, rapida)
+    ema_lenta = paso_ema(ema_lenta, close, lenta)
+    macd = ema_rapida - ema_lenta
+    senal = paso_ema(senal, macd, periodo_senal)
+    return ema_rapida, ema_lenta, macd, senal, macd - senal
+
+
+def paso_rsi_wilder(ganancia_media, perdida_media, close_anterior, close, periodo=14):
+    """Devuelve (ganancia media, pérdida media, RSI de Wilder) tras un cierre nuevo."""
+    delta = close - close_anterior
+    ganancia_media = paso_exponencial(ganancia_media, max(delta, 0.0), 1.0 / periodo)
+    perdida_media = paso_exponencial(perdida_media, max(-delta, 0.0), 1.0 / periodo)
+    if perdida_media > 0:
+        rsi = 100 - 100 / (1 + ganancia_media / perdida_media)
+    else:
+        rsi = 100.0 if ganancia_media > 0 else np.nan
+    return ganancia_media, perdida_media, rsi
+
+
+def paso_atr(atr, high, low, close_anterior, periodo=14):
+    """ATR de Wilder de 'periodo' velas tras una vela nueva."""
+    rango = max(high - low, abs(high - close_anterior), abs(low - close_anterior))
+    return paso_exponencial(atr, rango, 1.0 / periodo)
+
+
+def paso_keltner(media, atr, high, low, close, close_anterior, periodo=20, periodo_atr=14, multiplicador=2.0):
+    """Devuelve (EMA central, ATR, canal superior, canal inferior) de Keltner tras una vela nueva."""
+    media = paso_ema(media, close, periodo)
+    atr = paso_atr(atr, high, low, close_anterior, periodo_atr)
+    return media, atr, media + multiplicador * atr, media - multiplicador * atr
+
+
+def rsi_simple(close, periodo=14):
+    """RSI de 'periodo' velas de una Serie de cierres, con medias simples de ganancias y pérdidas (array de NumPy)."""
+    # Calculamos la diferencia entre los precios de cierre consecutivos
+    delta = close.diff()
+
+    # Obtenemos las ganancias (diferencias positivas) y pérdidas (diferencias negativas)
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+
+    # Calculamos la media móvil de ganancias y pérdidas
+    avg_gain = gain.rolling(window=periodo).mean()
+    avg_loss = loss.rolling(window=periodo).mean()
+
+    # Calculamos la razón de ganancias/pérdidas y el RSI basado en ella
+    rs = avg_gain / avg_loss
+    return (100 - (100 / (1 + rs))).to_numpy()
+
+
+def senal_compra(close, close_anterior, banda_inferior, volumen, volumen_sma, rsi=None, rsi_compra=None, periodo_inicio=20):
+    """
+    Reglas de compra de Estrategia: cierre bajo la banda inferior con volumen alto y cierre al alza,
+    o cierre en la banda o por debajo con volumen bajo; con 'rsi_compra', además RSI por debajo de él.
+    Los argumentos son arrays con el tiempo en el último eje y se combinan por broadcasting, de modo que
+    se pueden evaluar varias combinaciones de parámetros a la vez (por ejemplo, bandas de
+    multiplicadores x tiempo). Las comparaciones con NaN son falsas; las 'periodo_inicio' primeras velas no tienen señal.
+    """
+    senal = ((close < banda_inferior) & (volumen > volumen_sma) & (close > close_anterior)) \
+        | ((close <= banda_inferior) & (volumen < volumen_sma))
+    if rsi_compra is not None:
+        senal = senal & (rsi < rsi_compra)
+    senal[..., :periodo_inicio] = False
+    return senal
+
+
+def senal_venta(close, close_anterior, banda_superior, volumen, volumen_sma, rsi=None, rsi_venta=None, periodo_inicio=20):
+    """
+    Reglas de venta de Estrategia, simétricas a las de senal_compra: cierre sobre la banda superior con
+    volumen alto y cierre a la baja, o cierre en la banda o por encima con volumen bajo; con 'rsi_venta',
+    además RSI por encima de él. Los argumentos se combinan por broadcasting como en senal_compra.
+    """
+    senal = ((close > banda_superior) & (volumen > volumen_sma) & (close < close_anterior)) \
+        | ((close >= banda_superior) & (volumen < volumen_sma))
+    if rsi_venta is not None:
+        senal = senal & (rsi > rsi_venta)
+    senal[..., :periodo_inicio] = False
+    return senal
+
+# Columnas de una vela OHLC tal y como las devuelve Kraken
+COLUMNAS = ["timestamp", "open", "high", "low", "close", "vwap", "volume", "count"]
+
+
+def remuestrear_ohlc(df, minutos):
+    """
+    Agrupa las velas de un DataFrame de Dataset en velas de 'minutos' minutos, alineadas con el
+    inicio de la época Unix (las velas diarias empiezan a las 00:00 UTC, como en Kraken).
+    Devuelve un DataFrame con las columnas de COLUMNAS: apertura de la primera vela, máximo, mínimo,
+    cierre de la última, vwap ponderado por volumen, y volumen y número de operaciones sumados.
+    """
+    if len(df) == 0:
+        return pd.DataFrame(columns=COLUMNAS)
+
+    periodo = minutos * 60
+    segundos = df['Date'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    grupos = segundos // periodo * periodo
+    # Primera fila de cada grupo (las velas están ordenadas por fecha)
+    inicios = np.flatnonzero(np.diff(grupos, prepend=grupos[0] - 1))
+    finales = np.append(inicios[1:], len(df)) - 1
+
+    close = df['close'].to_numpy(dtype=float)
+    volumen = df['volume'].to_numpy(dtype=float)
+    volumen_total = np.add.reduceat(volumen, inicios)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vwap = np.add.reduceat(df['vwap'].to_numpy(dtype=float) * volumen, inicios) / volumen_total
+    # Sin volumen no hay precio medio: usamos el cierre
+    vwap = np.where(volumen_total > 0, vwap, close[finales])
+
+    return pd.DataFrame({
+        'timestamp': grupos[inicios],
+        'open': df['open'].to_numpy(dtype=float)[inicios],
+        'high': np.maximum.reduceat(df['high'].to_numpy(dtype=float), inicios),
+        'low': np.minimum.reduceat(df['low'].to_numpy(dtype=float), inicios),
+        'close': close[finales],
+        'vwap': vwap,
+        'volume': volumen_total,
+        'count': np.add.reduceat(df['count'].to_numpy(dtype=np.int64), inicios),
+    })
+
 
 ### Clase Dataset
 class Dataset:
     """
     Clase que representa un conjunto de datos de precios de activos financieros.
-    Proporciona métodos para calcular indicadores técnicos como la SMA, Bandas de Bollinger y RSI.
+    Proporciona métodos para calcular indicadores técnicos como la SMA, Bandas de Bollinger y RSI,
+    y los exponenciales: EMA, MACD, ATR y canales de Keltner.
     """
 
-    def __init__(self, data):
+    # Parámetros por defecto de los indicadores
+    PARAMETROS = dict(ventana=20, multiplicador=1.8, ventana_volumen=20, periodo_rsi=14,
+                      rsi_compra=None, rsi_venta=None, periodo_ema=20, macd_rapida=12, macd_lenta=26,
+                      macd_senal=9, periodo_atr=14, periodo_keltner=20, multiplicador_keltner=2.0)
+
+    # Grafo de indicadores: para cada columna, el método que la calcula, los parámetros de los que
+    # depende su valor y los indicadores que necesita. Las dependencias 'opcionales' solo se calculan
+    # cuando el parámetro asociado tiene valor (el RSI de las señales, solo con filtro de RSI).
+    # Los indicadores 'recursivos' (medias exponenciales) continúan desde su último valor en caché
+    # cuando se añaden velas, en lugar de recalcularse desde el principio.
+    INDICADORES = {
+        'rsi': dict(metodo='_rsi', parametros=('periodo_rsi',), dependencias=()),
+        'SMA': dict(metodo='_sma', parametros=('ventana',), dependencias=()),
+        'desviacion': dict(metodo='_desviacion', parametros=('ventana',), dependencias=()),
+        'Banda_Superior': dict(metodo='_banda', parametros=('ventana', 'multiplicador'),
+                               dependencias=('SMA', 'desviacion')),
+        'Banda_Inferior': dict(metodo='_banda', parametros=('ventana', 'multiplicador'),
+                               dependencias=('SMA', 'desviacion')),
+        'Volume_SMA': dict(metodo='_volume_sma', parametros=('ventana_volumen',), dependencias=()),
+        'Buy_Signal': dict(metodo='_senal', parametros=('ventana', 'multiplicador', 'ventana_volumen',
+                                                        'periodo_rsi', 'rsi_compra'),
+                           dependencias=('Banda_Inferior', 'Volume_SMA'), opcionales={'rsi': 'rsi_compra'}),
+        'Sell_Signal': dict(metodo='_senal', parametros=('ventana', 'multiplicador', 'ventana_volumen',
+                                                         'periodo_rsi', 'rsi_venta'),
+                            dependencias=('Banda_Superior', 'Volume_SMA'), opcionales={'rsi': 'rsi_venta'}),
+        # Indicadores exponenciales
+        'EMA': dict(metodo='_ema', parametros=('periodo_ema',), dependencias=(), recursivo=True),
+        'ema_rapida': dict(metodo='_ema', parametros=('macd_rapida',), dependencias=(), recursivo=True),
+        'ema_lenta': dict(metodo='_ema', parametros=('macd_lenta',), dependencias=(), recursivo=True),
+        'MACD': dict(metodo='_diferencia', parametros=('macd_rapida', 'macd_lenta'),
+                     dependencias=('ema_rapida', 'ema_lenta')),
+        'MACD_Senal': dict(metodo='_ema', parametros=('macd_rapida', 'macd_lenta', 'macd_senal'),
+                           dependencias=('MACD',), recursivo=True),
+        'MACD_Histograma': dict(metodo='_diferencia', parametros=('macd_rapida', 'macd_lenta', 'macd_senal'),
+                                dependencias=('MACD', 'MACD_Senal')),
+        'ganancia_media': dict(metodo='_wilder', parametros=('periodo_rsi',), dependencias=(), recursivo=True),
+        'perdida_media': dict(metodo='_wilder', parametros=('periodo_rsi',), dependencias=(), recursivo=True),
+        'rsi_wilder': dict(metodo='_rsi_wilder', parametros=('periodo_rsi',),
+                           dependencias=('ganancia_media', 'perdida_media')),
+        'rango_verdadero': dict(metodo='_rango_verdadero', parametros=(), dependencias=()),
+        'ATR': dict(metodo='_wilder', parametros=('periodo_atr',), dependencias=('rango_verdadero',), recursivo=True),
+        'Keltner_Media': dict(metodo='_ema', parametros=('periodo_keltner',), dependencias=(), recursivo=True),
+        'Keltner_Superior': dict(metodo='_keltner', parametros=('periodo_keltner', 'periodo_atr', 'multiplicador_keltner'),
+                                 dependencias=('Keltner_Media', 'ATR')),
+        'Keltner_Inferior': dict(metodo='_keltner', parametros=('periodo_keltner', 'periodo_atr', 'multiplicador_keltner'),
+                                 dependencias=('Keltner_Media', 'ATR')),
+    }
+
+    # Columnas que añade get_metrics, en este orden
+    METRICAS = ['rsi', 'SMA', 'Banda_Superior', 'Banda_Inferior', 'Volume_SMA', 'Buy_Signal', 'Sell_Signal']
+
+    def __init__(self, data, precision='float64'):
         """
         Constructor de la clase Dataset.
-        Recibe una lista con datos financieros y la convierte en un DataFrame de pandas.
-        """
-        # Convertimos los datos en un DataFrame
-        df = pd.DataFrame(data)
-        
-        # Asignamos nombres a las columnas
-        columns = ["timestamp", "open", "high", "low", "close", "vwap", "volume", "count"]
-        df.columns = columns
-        
-        # Convertimos las columnas numéricas a tipo float
-        df.close = df.close.astype(float)
-        df.open = df.open.astype(float)
-        df.high = df.high.astype(float)
-        df.low = df.low.astype(float)
-        df.vwap = df.vwap.astype(float)
-        df.volume = df.volume.astype(float)
-        
-        # Convertimos el timestamp a formato de fecha
-        df["Date"] = pd.to_datetime(df.timestamp, unit='s')
-        
-        # Eliminamos la columna timestamp ya que no la necesitamos
-        df.drop('timestamp', axis=1, inplace=True)
-        
-        # Reiniciamos el índice para que sea consecutivo
-        df.reset_index(drop=True, inplace=True)
-        
+        Recibe una lista con datos financieros (o un DataFrame con las mismas columnas) y la convierte
+        en un DataFrame de pandas. Con precision='float32' los precios y el volumen ocupan la mitad de memoria.
+        """
+        self.precision = precision
+        self.parametros = {}
         # Guardamos el DataFrame en el atributo 'data'
-        self.data = df
+        self.data = self._preparar(data, precision)
+        self._iniciar_cache()
+
+    def _iniciar_cache(self):
+        """Estado de la caché de indicadores para los datos actuales de 'data'."""
+        # Caché de indicadores: (indicador, parámetros) -> (versión de los datos, valores)
+        self.version = 0
+        self._cache = {}
+        self._cambios = []  # (versión, primera fila modificada) de cada cambio de los datos
+        self._datos_cache = self.data
+        self._reservas = {}  # Arrays con sitio libre al final: columna de datos o clave de caché -> array
+        self._columnas = {}  # Parámetros con los que se calculó cada columna de indicador
+        self._temporalidades = {}  # Datasets remuestreados a partir de estas velas: minutos -> Dataset
+
+    @staticmethod
+    @medir('Dataset._preparar', filas=lambda data, precision='float64': len(data))
+    def _preparar(data, precision='float64'):
+        """
+        Convierte una lista de velas de Kraken en un DataFrame con columnas numéricas y fecha.
+        La lista se lee en una sola pasada a un array de NumPy con un tipo por columna
+        (int64 para el timestamp, 'precision' para precios y volumen, int32 para el número de operaciones).
+        """
+        if isinstance(data, pd.DataFrame):
+            # DataFrame con las columnas de Kraken (por ejemplo, leído del almacén local)
+            columnas = {nombre: data.iloc[:, i].to_numpy() for i, nombre in enumerate(COLUMNAS)}
+        else:
+            tipos = np.dtype([('timestamp', 'int64')] + [(nombre, precision) for nombre in COLUMNAS[1:7]]
+                             + [('count', 'int32')])
+            registros = np.fromiter(map(tuple, data), dtype=tipos, count=len(data))
+            columnas = {nombre: registros[nombre] for nombre in COLUMNAS}
+
+        # Construimos el DataFrame directamente con los tipos finales; el timestamp pasa a la columna 'Date'
+        df = pd.DataFrame({nombre: columnas[nombre].astype(precision, copy=False) for nombre in COLUMNAS[1:7]})
+        df['count'] = columnas['count'].astype('int32', copy=False)
+        df['Date'] = pd.to_datetime(columnas['timestamp'], unit='s')
+        return df
+
+    def publicar(self, ruta, columnas=None):
+        """
+        Publica las columnas de 'data' (todas o las indicadas) en un fichero Arrow IPC mapeable en memoria,
+        para que otros procesos las lean sin copiarlas con Dataset.adjuntar o compartido.adjuntar.
+        Devuelve la ruta. Ver compartido.FramesCompartidos para gestionar varios ficheros y su borrado.
+        """
+        return publicar(self.data if columnas is None else self.data[columnas], ruta)
+
+    @classmethod
+    def adjuntar(cls, ruta):
+        """
+        Devuelve un Dataset sobre un fichero publicado con publicar, sin copiar sus columnas: son vistas
+        de solo lectura del fichero mapeado en memoria. Los indicadores que se calculen y las velas que se
+        añadan con append crean columnas nuevas en memoria del proceso, sin modificar el fichero.
+        """
+        dataset = cls.__new__(cls)
+        dataset.data = adjuntar(ruta)
+        dataset.precision = dataset.data['close'].dtype.name
+        dataset.parametros = {}
+        dataset._iniciar_cache()
+        return dataset
+
+    def memoria_por_fila(self):
+        """
+        Devuelve los bytes que ocupa cada fila del DataFrame (columnas de datos, indicadores y señales).
+        """
+        if len(self.data) == 0:
+            return 0.0
+        return self.data.memory_usage(deep=True, index=False).sum() / len(self.data)
+
+    def append(self, data):
+        """
+        Añade velas nuevas o revisadas (Kraken vuelve a enviar la última vela, aún abierta)
+        y actualiza los indicadores y señales solo de esas filas.
+
+        Las velas con una fecha ya existente sustituyen a las guardadas a partir de esa fecha.
+        Los indicadores ya calculados se recalculan solo desde la primera fila modificada (más las filas
+        de contexto que necesita cada uno). Las columnas de datos e indicadores son vistas de arrays
+        con sitio libre al final (ver _escribir): las filas nuevas se escriben en su sitio y, cuando se
+        llenan, se copian a uno del doble de tamaño, de modo que el coste amortizado por vela no depende
+        de la longitud del histórico. Las filas revisadas se sobrescriben en el mismo array, así que
+        los DataFrames y arrays obtenidos antes de append pueden ver la vela revisada.
+        """
+        nuevos = self._preparar(data, self.precision)
+        if nuevos.empty:
+            return
+
+        # Posición desde la que cambian los datos (la primera vela recibida o el final)
+        inicio = int(self.data['Date'].searchsorted(nuevos['Date'].iloc[0]))
+        columnas = {columna: self._escribir(columna, self.data[columna].to_numpy(), inicio, nuevos[columna].to_numpy())
+                    for columna in nuevos.columns}
+        self.data = pd.DataFrame(columnas, copy=False)
+        self._datos_cache = self.data
+        self.invalidar(inicio)
+
+        # Rehacemos en cada temporalidad las velas desde el periodo que contiene la primera vela modificada
+        segundos = self.data['Date'].iloc[inicio].value // 10**9
+        for minutos, temporalidad in self._temporalidades.items():
+            fecha = pd.Timestamp(segundos // (minutos * 60) * (minutos * 60), unit='s')
+            fila = int(self.data['Date'].searchsorted(fecha))
+            temporalidad.append(remuestrear_ohlc(self.data.iloc[fila:], minutos))
+
+        # Volvemos a añadir las columnas de indicadores que ya existían, con los mismos parámetros
+        # (construyendo el DataFrame sobre los arrays: asignar cada columna la copiaría entera)
+        for columna, (nombre, parametros) in self._columnas.items():
+            columnas[columna] = self.indicador(nombre, **parametros)
+        self.data = pd.DataFrame(columnas, copy=False)
+        self._datos_cache = self.data
+
+    def _escribir(self, clave, valores, inicio, nuevos):
+        """
+        Devuelve un array con los 'inicio' primeros valores de 'valores' seguidos de 'nuevos'.
+        Si 'valores' es el principio de la reserva de 'clave' y esta tiene sitio, 'nuevos' se escribe
+        en ella sin copiar el resto; si no, se reserva un array del doble de tamaño.
+        """
+        filas = inicio + len(nuevos)
+        reserva = self._reservas.get(clave)
+        if (reserva is None or len(reserva) < filas or not reserva.flags.writeable
+                or reserva.dtype != valores.dtype or reserva.strides != valores.strides
+                or reserva.__array_interface__['data'][0] != valores.__array_interface__['data'][0]):
+            reserva = np.empty(max(filas, 2 * len(valores)), dtype=np.result_type(valores, nuevos))
+            reserva[:inicio] = valores[:inicio]
+            self._reservas[clave] = reserva
+        reserva[inicio:filas] = nuevos
+        return reserva[:filas]
+
+    def remuestrear(self, minutos):
+        """
+        Devuelve un Dataset con velas de 'minutos' minutos construidas localmente a partir de estas velas,
+        sin otra llamada a Kraken. 'minutos' debe ser múltiplo de la duración de las velas de 'data'.
+        El Dataset se conserva y append lo actualiza (velas e indicadores ya calculados) con cada vela nueva.
+        """
+        if minutos not in self._temporalidades:
+            segundos = np.diff(self.data['Date'].to_numpy().astype('datetime64[s]').astype(np.int64))
+            intervalo = segundos[segundos > 0].min() if (segundos > 0).any() else None
+            if intervalo is not None and (minutos * 60) % intervalo:
+                raise ValueError(f"No se pueden construir velas de {minutos} minutos a partir de velas "
+                                 f"de {intervalo // 60} minutos")
+            self._temporalidades[minutos] = Dataset(remuestrear_ohlc(self.data, minutos), self.precision)
+        return self._temporalidades[minutos]
+
+    def invalidar(self, desde=0):
+        """
+        Marca como modificadas las filas de 'data' a partir de 'desde'. Los indicadores en caché
+        se recalculan desde esa fila la próxima vez que se pidan. Hay que llamarlo si se modifica
+        'data' directamente sin sustituir el DataFrame.
+        """
+        self.version += 1
+        self._cambios.append((self.version, desde))
+
+        # Los cambios anteriores a la versión más antigua en caché ya no hacen falta
+        antigua = min((version for version, _ in self._cache.values()), default=self.version)
+        self._cambios = [(version, fila) for version, fila in self._cambios if version > antigua]
+
+    def recortar(self, filas):
+        """
+        Elimina las 'filas' primeras velas de 'data' conservando la caché de indicadores del resto, de modo
+        que los siguientes append continúan como si el histórico estuviera completo (los indicadores
+        recursivos, desde su último valor). Hay que conservar al menos filas_contexto() velas.
+        Las temporalidades de remuestrear no se recortan.
+        """
+        if filas <= 0:
+            return
+        # Copias (no vistas) para liberar la memoria de las filas eliminadas
+        self.data = self.data.iloc[filas:].reset_index(drop=True).copy()
+        self._datos_cache = self.data
+        self._reservas = {}
+        self._cache = {clave: (version, valores[filas:].copy()) for clave, (version, valores) in self._cache.items()}
+        self._cambios = [(version, max(fila - filas, 0)) for version, fila in self._cambios]
+
+    def filas_contexto(self):
+        """
+        Velas anteriores que necesitan los indicadores calculados para actualizar las siguientes:
+        la mayor ventana o periodo de sus parámetros más una (el cierre anterior), y como mínimo
+        las 20 velas de calentamiento de Estrategia más una.
+        """
+        periodos = [valor for _, parametros in self._columnas.values()
+                    for valor in {**self.PARAMETROS, **parametros}.values()
+                    if isinstance(valor, int) and not isinstance(valor, bool)]
+        return max(periodos + [20]) + 1
+
+    def indicador(self, nombre, **parametros):
+        """
+        Devuelve como array de NumPy el indicador 'nombre' (una clave de INDICADORES) con los parámetros
+        indicados; el resto toma el valor de PARAMETROS. El indicador y sus dependencias se calculan
+        la primera vez que se piden y se guardan en caché por (indicador, parámetros, versión de los datos).
+        Si los datos han cambiado desde entonces, solo se recalculan las filas afectadas.
+        """
+        if nombre not in self.INDICADORES:
+            raise ValueError(f"Indicador no válido: {nombre}. Opciones: {', '.join(self.INDICADORES)}")
+        parametros = {**self.PARAMETROS, **parametros}
+        nodo = self.INDICADORES[nombre]
+
+        # Si se ha sustituido el DataFrame desde fuera, la caché ya no corresponde a los datos
+        if self._datos_cache is not self.data:
+            self._cache.clear()
+            self._cambios.clear()
+            self._reservas.clear()
+            self._datos_cache = self.data
+
+        clave = (nombre,) + tuple(parametros[parametro] for parametro in nodo['parametros'])
+        version, valores = self._cache.get(clave, (None, None))
+        if version == self.version:
+            return valores
+
+        # Primera fila modificada desde que se calculó el indicador (0 si no estaba en caché)
+        inicio = 0 if version is None else min(fila for cambio, fila in self._cambios if cambio > version)
+
+        dependencias = {dependencia: self.indicador(dependencia, **parametros) for dependencia in nodo['dependencias']}
+        for dependencia, parametro in nodo.get('opcionales', {}).items():
+            if parametros[parametro] is not None:
+                dependencias[dependencia] = self.indicador(dependencia, **parametros)
+
+        # Los indicadores recursivos reciben su valor en la fila anterior a 'inicio'
+        if nodo.get('recursivo'):
+            parametros['anterior'] = valores[inicio - 1] if inicio > 0 else None
+
+        with etapa(f'Dataset.{nombre}', filas=len(self.data) - inicio):
+            nuevos = getattr(self, nodo['metodo'])(nombre, inicio, dependencias, **parametros)
+        if inicio > 0:
+            nuevos = self._escribir(clave, valores, inicio, nuevos)
+        self._cache[clave] = (self.version, nuevos)
+        return nuevos
+
+    def _asignar(self, nombre, columna=None, **parametros):
+        """
+        Añade a 'data' la columna del indicador 'nombre' (con otro nombre de columna si se indica 'columna')
+        y recuerda el indicador y sus parámetros para append.
+        """
+        columna = nombre if columna is None else columna
+        self.data[columna] = self.indicador(nombre, **parametros)
+        self._columnas[columna] = (nombre, parametros)
 
     def print_data(self, n=5):
         """
@@ -51,82 +600,181 @@ class Dataset:
         """
         print(self.data.head(n))
 
-    def calculate_sma_20(self):
+    def calculate_sma_20(self, ventana=20):
         """
-        Calcula la media móvil simple (SMA) de 20 periodos sobre la columna 'close'.
+        Calcula la media móvil simple (SMA) de 20 periodos (o de 'ventana' periodos) sobre la columna 'close'.
         """
-        self.data['SMA'] = self.data['close'].rolling(window=20).mean()
+        self._asignar('SMA', ventana=ventana)
     
-    def calculate_volume_sma_20(self):
-        """
-        Calcula la media móvil simple (SMA) de 20 periodos sobre la columna 'volume'.
-        """
-        self.data['Volume_SMA'] = self.data['volume'].rolling(window=20).mean()
-
-    def calculate_bollinger_bands(self):
-        """
-        Calcula las Bandas de Bollinger a partir de la SMA de 20 periodos.
-        Las bandas se calculan como 2 desviaciones estándar por encima y por debajo de la SMA.
-        """
-        # Asegurarse de que se haya calculado la SMA de 20 periodos
-        if 'SMA' not in self.data.columns:
-            self.calculate_sma_20()
-        
-        # Inicializamos arrays para las bandas superior e inferior
-        n = len(self.data)
-        banda_superior = np.zeros(n)
-        banda_inferior = np.zeros(n)
-        sma_20 = self.data['SMA']
-        
-        # Cálculo de las bandas de Bollinger
-        for i in range(20, n):
-            banda_superior[i] = sma_20[i] + 1.8 * np.std(self.data['close'][i-20:i])  # Banda superior
-            banda_inferior[i] = sma_20[i] - 1.8 * np.std(self.data['close'][i-20:i])  # Banda inferior   
-        
-        # Añadimos las bandas al DataFrame
-        self.data["Banda_Superior"] = banda_superior
-        self.data["Banda_Inferior"] = banda_inferior
-        # Establecemos las primeras 19 filas como None (por falta de datos suficientes)
-        self.data.loc[0:19, "Banda_Inferior"] = None
-        self.data.loc[0:19, "Banda_Superior"] = None
-
-    def calculate_RSI(self):
-        """
-        Calcula el Índice de Fuerza Relativa (RSI) con un periodo de 14.
-        """
-        periodo = 14
-        # Calculamos la diferencia entre los precios de cierre consecutivos
-        delta = self.data["close"].diff()
-        
-        # Obtenemos las ganancias (diferencias positivas) y pérdidas (diferencias negativas)
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        
-        # Calculamos la media móvil de ganancias y pérdidas
-        avg_gain = gain.rolling(window=periodo).mean()
-        avg_loss = loss.rolling(window=periodo).mean()
-        
-        # Calculamos la razón de ganancias/pérdidas
-        rs = avg_gain / avg_loss
-        
-        # Calculamos el RSI basado en la razón
-        self.data['rsi'] = 100 - (100 / (1 + rs))
-
-    def get_metrics(self):
+    def calculate_volume_sma_20(self, ventana=20):
+        """
+        Calcula la media móvil simple (SMA) de 20 periodos (o de 'ventana' periodos) sobre la columna 'volume'.
+        """
+        self._asignar('Volume_SMA', ventana_volumen=ventana)
+
+    def calculate_bollinger_bands(self, ventana=20, multiplicador=1.8):
+        """
+        Calcula las Bandas de Bollinger a partir de la SMA de 'ventana' periodos.
+        Las bandas se sitúan a 'multiplicador' desviaciones estándar (ddof=0) por encima y por debajo
+        de la SMA, usando la desviación de los 'ventana' cierres anteriores a cada fila (i-ventana a i-1).
+        """
+        self._asignar('Banda_Superior', ventana=ventana, multiplicador=multiplicador)
+        self._asignar('Banda_Inferior', ventana=ventana, multiplicador=multiplicador)
+
+    def calculate_RSI(self, periodo=14, metodo='simple'):
+        """
+        Calcula el Índice de Fuerza Relativa (RSI) con un periodo de 14 (o de 'periodo' velas).
+        Con metodo='simple' las ganancias y pérdidas se promedian con medias móviles simples (el RSI que
+        usan las señales); con metodo='wilder', con la media exponencial de Wilder (el RSI original).
+        """
+        if metodo not in ('simple', 'wilder'):
+            raise ValueError(f"Método de RSI no válido: {metodo}. Opciones: simple, wilder")
+        self._asignar('rsi' if metodo == 'simple' else 'rsi_wilder', columna='rsi', periodo_rsi=periodo)
+
+    def calculate_EMA(self, periodo=20):
+        """Calcula la media móvil exponencial (EMA) de 20 periodos (o de 'periodo' periodos) del cierre."""
+        self._asignar('EMA', periodo_ema=periodo)
+
+    def calculate_MACD(self, rapida=12, lenta=26, senal=9):
+        """
+        Calcula el MACD (EMA de 'rapida' periodos menos EMA de 'lenta' periodos del cierre), su línea
+        de señal (EMA de 'senal' periodos del MACD) y el histograma (MACD menos señal).
+        """
+        for nombre in ('MACD', 'MACD_Senal', 'MACD_Histograma'):
+            self._asignar(nombre, macd_rapida=rapida, macd_lenta=lenta, macd_senal=senal)
+
+    def calculate_ATR(self, periodo=14):
+        """Calcula el Average True Range (ATR) de Wilder de 14 periodos (o de 'periodo' periodos)."""
+        self._asignar('ATR', periodo_atr=periodo)
+
+    def calculate_keltner_channels(self, periodo=20, periodo_atr=14, multiplicador=2.0):
+        """
+        Calcula los canales de Keltner: una EMA de 'periodo' periodos del cierre y dos canales a
+        'multiplicador' veces el ATR de 'periodo_atr' periodos por encima y por debajo.
+        """
+        for nombre in ('Keltner_Media', 'Keltner_Superior', 'Keltner_Inferior'):
+            self._asignar(nombre, periodo_keltner=periodo, periodo_atr=periodo_atr, multiplicador_keltner=multiplicador)
+
+    def get_metrics(self, ventana=20, multiplicador=1.8, ventana_volumen=20, periodo_rsi=14,
+                    rsi_compra=None, rsi_venta=None, indicadores=None):
         """
         Calcula y devuelve las métricas clave del DataFrame:
         - Media Móvil Simple (SMA 20)
         - Bandas de Bollinger
         - Índice de Fuerza Relativa (RSI)
+        Los parámetros permiten cambiar las ventanas, el multiplicador de las bandas y el filtro de RSI
+        de Estrategia. Con 'indicadores' (lista de columnas de METRICAS) solo se calculan esas columnas
+        y las que necesitan; los indicadores ya calculados con los mismos parámetros se toman de la caché.
         """
-        self.calculate_RSI()
-        self.calculate_sma_20()
-        self.calculate_bollinger_bands()
-        self.calculate_volume_sma_20()
-        estrategia = Estrategia(self.data)
-        estrategia.buy_signal()
-        estrategia.sell_signal()
-                
+        self.parametros = dict(ventana=ventana, multiplicador=multiplicador, ventana_volumen=ventana_volumen,
+                               periodo_rsi=periodo_rsi, rsi_compra=rsi_compra, rsi_venta=rsi_venta)
+        for nombre in self.METRICAS if indicadores is None else indicadores:
+            self._asignar(nombre, **self.parametros)
+
+    # Nodos del grafo de indicadores. Cada método devuelve los valores de las filas desde 'inicio'
+    # hasta el final, leyendo solo las filas anteriores que necesita como contexto.
+
+    def _media_movil(self, columna, inicio, ventana):
+        """Media móvil de 'ventana' periodos de una columna, desde la fila 'inicio'."""
+        desde = max(inicio - ventana + 1, 0)
+        media = self.data[columna].iloc[desde:].rolling(window=ventana).mean().to_numpy()
+        return media[inicio - desde:]
+
+    def _sma(self, nombre, inicio, dependencias, ventana=20, **parametros):
+        """SMA de 'ventana' periodos del cierre."""
+        return self._media_movil('close', inicio, ventana)
+
+    def _volume_sma(self, nombre, inicio, dependencias, ventana_volumen=20, **parametros):
+        """SMA de 'ventana_volumen' periodos del volumen."""
+        return self._media_movil('volume', inicio, ventana_volumen)
+
+    def _desviacion(self, nombre, inicio, dependencias, ventana=20, **parametros):
+        """Desviación estándar (ddof=0) de los 'ventana' cierres anteriores a cada fila (i-ventana a i-1)."""
+        desde = max(inicio - ventana, 0)
+        varianza = media_varianza_movil(self.data['close'].to_numpy()[desde:], ventana)[1]
+
+        # Desplazamos la desviación una fila para que la ventana termine en i-1
+        desviacion = np.full(len(varianza), np.nan)
+        desviacion[1:] = np.sqrt(varianza[:-1])
+        return desviacion[inicio - desde:]
+
+    def _banda(self, nombre, inicio, dependencias, multiplicador=1.8, **parametros):
+        """Banda de Bollinger superior o inferior (las primeras 'ventana' filas quedan a NaN)."""
+        signo = 1 if nombre == 'Banda_Superior' else -1
+        return dependencias['SMA'][inicio:] + signo * multiplicador * dependencias['desviacion'][inicio:]
+
+    def _rsi(self, nombre, inicio, dependencias, periodo_rsi=14, **parametros):
+        """RSI de 'periodo_rsi' velas con medias simples de ganancias y pérdidas."""
+        desde = max(inicio - periodo_rsi, 0)
+        return rsi_simple(self.data["close"].iloc[desde:], periodo_rsi)[inicio - desde:]
+
+    def _senal(self, nombre, inicio, dependencias, rsi_compra=None, rsi_venta=None, **parametros):
+        """Señales de compra o venta de Estrategia, con el cierre anterior como contexto."""
+        desde = max(inicio - 1, 0)
+        df = pd.DataFrame({columna: self.data[columna].to_numpy()[desde:] for columna in ('close', 'volume')})
+        for dependencia, valores in dependencias.items():
+            df[dependencia] = valores[desde:]
+
+        # El periodo de calentamiento de Estrategia (20 filas) se cuenta desde el principio de 'data'
+        estrategia = Estrategia(df, periodo_inicio=max(20 - desde, 0), rsi_compra=rsi_compra, rsi_venta=rsi_venta)
+        if nombre == 'Buy_Signal':
+            estrategia.buy_signal()
+        else:
+            estrategia.sell_signal()
+        return df[nombre].to_numpy()[inicio - desde:]
+
+    def _ema(self, nombre, inicio, dependencias, anterior=None, **parametros):
+        """
+        EMA (alfa = 2 / (periodo + 1)) del cierre, o del indicador del que depende (la señal del MACD).
+        El periodo es el último parámetro del nodo. Empieza en el primer valor, como pandas ewm(adjust=False).
+        """
+        nodo = self.INDICADORES[nombre]
+        periodo = parametros[nodo['parametros'][-1]]
+        valores = dependencias[nodo['dependencias'][0]] if nodo['dependencias'] else self.data['close'].to_numpy()
+        if anterior is not None:
+            return filtro_exponencial(valores[inicio:], 2.0 / (periodo + 1), inicial=anterior)
+        return filtro_exponencial(valores, 2.0 / (periodo + 1))[inicio:]
+
+    def _diferencia(self, nombre, inicio, dependencias, **parametros):
+        """Diferencia entre las dos dependencias del nodo (MACD y su histograma)."""
+        primera, segunda = self.INDICADORES[nombre]['dependencias']
+        return dependencias[primera][inicio:] - dependencias[segunda][inicio:]
+
+    def _wilder(self, nombre, inicio, dependencias, anterior=None, **parametros):
+        """
+        Media de Wilder de las ganancias o pérdidas del cierre (RSI) o del true range (ATR).
+        Si aún no hay media anterior (periodo de calentamiento), se recalcula desde el principio.
+        """
+        nodo = self.INDICADORES[nombre]
+        periodo = parametros[nodo['parametros'][0]]
+        desde = inicio if anterior is not None and not np.isnan(anterior) else 0
+        if nodo['dependencias']:
+            valores = dependencias[nodo['dependencias'][0]][desde:]
+        else:
+            # Ganancias o pérdidas respecto al cierre anterior (NaN en la primera fila)
+            close = self.data['close'].to_numpy(dtype=float)
+            delta = np.diff(close, prepend=np.nan)[desde:] if desde == 0 else close[desde:] - close[desde - 1:-1]
+            valores = np.maximum(delta if nombre == 'ganancia_media' else -delta, 0.0)
+        if desde > 0:
+            return media_wilder(valores, periodo, anterior)
+        return media_wilder(valores, periodo)[inicio:]
+
+    def _rsi_wilder(self, nombre, inicio, dependencias, **parametros):
+        """RSI de Wilder a partir de las medias de Wilder de ganancias y pérdidas."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rs = dependencias['ganancia_media'][inicio:] / dependencias['perdida_media'][inicio:]
+            return 100 - (100 / (1 + rs))
+
+    def _rango_verdadero(self, nombre, inicio, dependencias, **parametros):
+        """True range de cada vela, con el cierre anterior como contexto."""
+        desde = max(inicio - 1, 0)
+        return rango_verdadero(*(self.data[columna].to_numpy()[desde:] for columna in ('high', 'low', 'close')))[inicio - desde:]
+
+    def _keltner(self, nombre, inicio, dependencias, multiplicador_keltner=2.0, **parametros):
+        """Canal de Keltner superior o inferior."""
+        signo = 1 if nombre == 'Keltner_Superior' else -1
+        return dependencias['Keltner_Media'][inicio:] + signo * multiplicador_keltner * dependencias['ATR'][inicio:]
+
 
 import seaborn as sns
 import matplotlib.pyplot as plt
@@ -139,11 +787,15 @@ class Grafico:
     Ofrece varios tipos de gráficos: gráficos de línea, gráficos de velas, y combinaciones con volumen.
     """
 
+    # Columnas de indicadores que usan los gráficos (para Dataset.get_metrics(indicadores=...))
+    COLUMNAS = ['SMA', 'Banda_Superior', 'Banda_Inferior', 'Volume_SMA', 'Buy_Signal', 'Sell_Signal']
+
     def __init__(self, df, pair):
         """Constructor de la clase. Recibe un DataFrame con los datos financieros."""
         self.df = df
         self.pair = pair    
     
+    @medir(filas=lambda self: len(self.df))
     def lineplot(self):
         """
         Genera un gráfico de líneas con:
@@ -161,10 +813,10 @@ class Grafico:
         plt.figure(figsize=(24, 12))
 
         # Añadir líneas al gráfico con colores más brillantes
-        sns.lineplot(x=self.df.Date, y=self.df['close'], color='#82CAFA', label='Precio de cierre')  # Azul claro
-        sns.lineplot(x=self.df.Date, y=self.df.SMA, label='SMA', color='#FF6F61', linewidth=2)  # Naranja claro
-        sns.lineplot(x=self.df.Date, y=self.df.Banda_Superior, label='Bandas de Bollinger superior e inferior', color='#FFD700', linewidth=2)  # Amarillo
-        sns.lineplot(x=self.df.Date, y=self.df.Banda_Inferior, color='#FFD700', linewidth=2)  # Amarillo
+        self._linea('close', color='#82CAFA', label='Precio de cierre')  # Azul claro
+        self._linea('SMA', label='SMA', color='#FF6F61', linewidth=2)  # Naranja claro
+        self._linea('Banda_Superior', label='Bandas de Bollinger superior e inferior', color='#FFD700', linewidth=2)  # Amarillo
+        self._linea('Banda_Inferior', color='#FFD700', linewidth=2)  # Amarillo
 
         # Representar señales de compra y venta con colores más visibles
         sns.scatterplot(x=self.df.Date[self.df['Buy_Signal'] == 1], y=self.df.close[self.df['Buy_Signal'] == 1], color='#00FF7F', s=100, marker='o', label='Compra')  # Verde brillante
@@ -186,6 +838,7 @@ class Grafico:
         # En lugar de guardar, devolvemos la figura
         return plt.gcf()
 
+    @medir(filas=lambda self: len(self.df))
     def lineplot_with_volume(self):
         """
         Genera un gráfico de líneas con dos subplots:
@@ -198,15 +851,15 @@ class Grafico:
         fig.suptitle(f'Evolución del precio y volumen de {self.pair} en Kraken', color='white')
 
         # Subplot 1: Gráfico de líneas del precio
-        sns.lineplot(ax=axs[0], x=self.df.Date, y=self.df['close'], color='#82CAFA', label='Precio de cierre', linewidth=2)
-        sns.lineplot(ax=axs[0], x=self.df.Date, y=self.df.SMA, label='SMA_20', color='#FF6F61', linewidth=2)
-        sns.lineplot(ax=axs[0], x=self.df.Date, y=self.df.Banda_Superior, label='Bandas de Bollinger superior e inferior', color='#FFD700', linewidth=2)
-        sns.lineplot(ax=axs[0], x=self.df.Date, y=self.df.Banda_Inferior, color='#FFD700', linewidth=2)
+        self._linea('close', ax=axs[0], color='#82CAFA', label='Precio de cierre', linewidth=2)
+        self._linea('SMA', ax=axs[0], label='SMA_20', color='#FF6F61', linewidth=2)
+        self._linea('Banda_Superior', ax=axs[0], label='Bandas de Bollinger superior e inferior', color='#FFD700', linewidth=2)
+        self._linea('Banda_Inferior', ax=axs[0], color='#FFD700', linewidth=2)
 
         # Subplot 2: Gráfico de barras del volumen
         axs[1].set_title('Volumen de operaciones', fontsize=20, color='white')
         axs[1].bar(self.df.Date, self.df.volume, color='#6495ED', label='Volumen', width=0.05)  # Azul
-        sns.lineplot(ax=axs[1], x=self.df.Date, y=self.df.Volume_SMA, label='SMA de volumen', color='red', linewidth=2)
+        self._linea('Volume_SMA', ax=axs[1], label='SMA de volumen', color='red', linewidth=2)
 
         # Representar señales de compra y venta en el subplot 1
         axs[0].scatter(self.df.Date[self.df['Buy_Signal'] == 1], self.df.close[self.df['Buy_Signal'] == 1], color='#00FF7F', marker='o', label='Compra')  # Verde brillante
@@ -233,6 +886,58 @@ class Grafico:
         return fig
 
 
+    def _linea(self, columna, ax=None, **estilo):
+        """
+        Dibuja una columna frente a la fecha con sns.lineplot y marca su línea con gid=columna, para que
+        PlantillaGrafico la encuentre por columna. seaborn no dibuja una serie sin ningún valor (menos velas
+        que la ventana del indicador): en ese caso se añade una línea vacía con el mismo estilo.
+        """
+        ax = plt.gca() if ax is None else ax
+        lineas = len(ax.lines)
+        sns.lineplot(ax=ax, x=self.df.Date, y=self.df[columna], **estilo)
+        if len(ax.lines) == lineas:
+            ax.plot([], [], **estilo)
+        ax.lines[-1].set_gid(columna)
+
+    def _segmentos_velas(self):
+        """
+        Devuelve los datos (x, y) de las tres líneas de las velas: cuerpos que suben, cuerpos que bajan y mechas.
+        Cada línea contiene todos los segmentos separados por huecos (NaT/NaN).
+        """
+        fechas = self.df.Date.to_numpy()
+        apertura = self.df.open.to_numpy()
+        cierre = self.df.close.to_numpy()
+        sube = cierre > apertura
+
+        def segmentos(x, y0, y1):
+            # Intercala un hueco tras cada segmento vertical: (x, y0) -> (x, y1), (NaT, NaN)
+            xs = np.column_stack([x, x, np.full(len(x), np.datetime64('NaT'), dtype=x.dtype)]).ravel()
+            ys = np.column_stack([y0, y1, np.full(len(x), np.nan)]).ravel()
+            return xs, ys
+
+        return [
+            # Cuerpos: de la apertura al cierre
+            segmentos(fechas[sube], apertura[sube], cierre[sube]),
+            segmentos(fechas[~sube], apertura[~sube], cierre[~sube]),
+            # Mechas: del mínimo a la apertura y del máximo al cierre
+            segmentos(np.concatenate([fechas, fechas]),
+                      np.concatenate([self.df.low.to_numpy(), self.df.high.to_numpy()]),
+                      np.concatenate([apertura, cierre])),
+        ]
+
+    def _dibujar_velas(self, ax):
+        """
+        Dibuja todas las velas en el eje indicado con tres líneas en total (cuerpos verdes, cuerpos rojos y mechas),
+        de modo que el número de artistas no depende del número de velas.
+        """
+        suben, bajan, mechas = self._segmentos_velas()
+
+        # Cuerpos verde brillante si sube y rojo tomate si baja; mechas blancas
+        ax.plot(*suben, color='#00FF7F', linewidth=0.5, gid='velas_suben')
+        ax.plot(*bajan, color='#FF6347', linewidth=0.5, gid='velas_bajan')
+        ax.plot(*mechas, color='white', linewidth=0.1, gid='velas_mechas')
+
+    @medir(filas=lambda self: len(self.df))
     def candlestick(self):
         """
         Genera un gráfico de velas japonés (candlestick chart), mostrando:
@@ -244,17 +949,13 @@ class Grafico:
         plt.style.use("dark_background")
         plt.figure(figsize=(24, 12))
 
-        # Dibujar cada vela con colores brillantes
-        for i in range(len(self.df)):
-            color = '#00FF7F' if self.df.close[i] > self.df.open[i] else '#FF6347'  # Verde brillante o rojo tomate
-            plt.plot([self.df.Date[i], self.df.Date[i]], [self.df.open[i], self.df.close[i]], color=color, linewidth=0.5)
-            plt.plot([self.df.Date[i], self.df.Date[i]], [self.df.low[i], self.df.open[i]], color='white', linewidth=0.1)
-            plt.plot([self.df.Date[i], self.df.Date[i]], [self.df.high[i], self.df.close[i]], color='white', linewidth=0.1)
+        # Dibujar las velas con colores brillantes
+        self._dibujar_velas(plt.gca())
 
         # Añadir líneas de SMA y Bandas de Bollinger
-        sns.lineplot(x=self.df.Date, y=self.df.SMA, label='SMA', color='#FF6F61', linewidth=2)  # Naranja claro
-        sns.lineplot(x=self.df.Date, y=self.df.Banda_Superior, label='Bandas de Bollinger superior e inferior', color='#FFD700', linewidth=2)  # Amarillo
-        sns.lineplot(x=self.df.Date, y=self.df.Banda_Inferior, color='#FFD700', linewidth=2)  # Amarillo
+        self._linea('SMA', label='SMA', color='#FF6F61', linewidth=2)  # Naranja claro
+        self._linea('Banda_Superior', label='Bandas de Bollinger superior e inferior', color='#FFD700', linewidth=2)  # Amarillo
+        self._linea('Banda_Inferior', color='#FFD700', linewidth=2)  # Amarillo
 
         # Representar señales de compra y venta
         sns.scatterplot(x=self.df.Date[self.df['Buy_Signal'] == 1], y=self.df.close[self.df['Buy_Signal'] == 1], color='#00FF7F', s=100, marker='o', label='Compra')  # Verde brillante
@@ -276,6 +977,7 @@ class Grafico:
         # En lugar de guardar, devolvemos la figura
         return plt.gcf()
 
+    @medir(filas=lambda self: len(self.df))
     def candlestick_with_volume(self):
         """
         Genera un gráfico de velas japonés con volumen en dos subplots:
@@ -287,21 +989,17 @@ class Grafico:
         fig, axs = plt.subplots(2, figsize=(24, 12))
 
         # Dibujar las velas en el subplot 1
-        for i in range(len(self.df)):
-            color = '#00FF7F' if self.df.close[i] > self.df.open[i] else '#FF6347'  # Verde brillante o rojo tomate
-            axs[0].plot([self.df.Date[i], self.df.Date[i]], [self.df.open[i], self.df.close[i]], color=color, linewidth=0.5)
-            axs[0].plot([self.df.Date[i], self.df.Date[i]], [self.df.low[i], self.df.open[i]], color='white', linewidth=0.1)
-            axs[0].plot([self.df.Date[i], self.df.Date[i]], [self.df.high[i], self.df.close[i]], color='white', linewidth=0.1)
+        self._dibujar_velas(axs[0])
 
         # Añadir líneas de SMA y Bandas de Bollinger en el subplot 1
-        sns.lineplot(x=self.df.Date, y=self.df.SMA, label='SMA', color='#FF6F61', linewidth=2, ax=axs[0])  # Naranja claro
-        sns.lineplot(x=self.df.Date, y=self.df.Banda_Superior, label='Bandas de Bollinger superior e inferior', color='#FFD700', linewidth=2, ax=axs[0])  # Amarillo
-        sns.lineplot(x=self.df.Date, y=self.df.Banda_Inferior, color='#FFD700', linewidth=2, ax=axs[0])  # Amarillo
+        self._linea('SMA', ax=axs[0], label='SMA', color='#FF6F61', linewidth=2)  # Naranja claro
+        self._linea('Banda_Superior', ax=axs[0], label='Bandas de Bollinger superior e inferior', color='#FFD700', linewidth=2)  # Amarillo
+        self._linea('Banda_Inferior', ax=axs[0], color='#FFD700', linewidth=2)  # Amarillo
 
         # Subplot 2: Volumen en gráfico de barras con SMA de volumen
         axs[1].set_title('Volumen de operaciones', fontsize=20, color='white')
         axs[1].bar(self.df.Date, self.df.volume, color='#6495ED', label='Volumen', width=0.05)  # Azul
-        sns.lineplot(x=self.df.Date, y=self.df.Volume_SMA, label='SMA de volumen', color='red', linewidth=2, ax=axs[1])
+        self._linea('Volume_SMA', ax=axs[1], label='SMA de volumen', color='red', linewidth=2)
 
         # Mostrar señales de compra y venta en el subplot 1
         axs[0].scatter(self.df.Date[self.df['Buy_Signal'] == 1], self.df.close[self.df['Buy_Signal'] == 1], color='#00FF7F', marker='o', label='Compra')  # Verde brillante
@@ -338,33 +1036,64 @@ class Estrategia:
     Cada uno de estos métodos genera señales de compra o venta basadas en indicadores técnicos clave como las **Bandas de Bollinger** y el **Volumen**.
     """
 
-    def __init__(self, df):
-        """Constructor de la clase. Recibe un DataFrame con los datos financieros."""
+    def __init__(self, df, periodo_inicio=20, factor_banda=1.0, factor_volumen=1.0, rsi_compra=None, rsi_venta=None):
+        """
+        Constructor de la clase. Recibe un DataFrame con los datos financieros.
+        - periodo_inicio: número de filas iniciales sin señales (periodo de calentamiento).
+        - factor_banda: escala la distancia de las Bandas de Bollinger respecto a la SMA.
+        - factor_volumen: multiplicador de la SMA de volumen con la que se compara el volumen.
+        - rsi_compra, rsi_venta: si se indican, solo hay señal de compra con RSI por debajo de rsi_compra
+          y de venta con RSI por encima de rsi_venta.
+        """
         self.df = df
+        self.periodo_inicio = periodo_inicio
+        self.factor_banda = factor_banda
+        self.factor_volumen = factor_volumen
+        self.rsi_compra = rsi_compra
+        self.rsi_venta = rsi_venta
 
+    def _columnas(self, banda):
+        """
+        Devuelve como arrays de NumPy el cierre, el cierre anterior, la banda indicada
+        (escalada por factor_banda), el volumen y la SMA de volumen (escalada por factor_volumen).
+        """
+        close = self.df['close'].to_numpy(dtype=float)
+        close_anterior = np.empty_like(close)
+        close_anterior[:1] = np.nan
+        close_anterior[1:] = close[:-1]
+
+        banda = self.df[banda].to_numpy(dtype=float)
+        if self.factor_banda != 1.0:
+            sma = self.df['SMA'].to_numpy(dtype=float)
+            banda = sma + self.factor_banda * (banda - sma)
+
+        volumen = self.df['volume'].to_numpy(dtype=float)
+        volumen_sma = self.factor_volumen * self.df['Volume_SMA'].to_numpy(dtype=float)
+        return close, close_anterior, banda, volumen, volumen_sma
+
+    @medir(filas=lambda self: len(self.df))
     def buy_signal(self):
         """
         Estrategia de Compra: 
         Genera señales de compra basadas en las Bandas de Bollinger y el volumen.
+        La columna 'Buy_Signal' es booleana (True en las filas con señal).
         """
-        n = len(self.df)
-        self.df['Buy_Signal'] = None
+        close, close_anterior, banda_inferior, volumen, volumen_sma = self._columnas('Banda_Inferior')
+        rsi = self.df['rsi'].to_numpy(dtype=float) if self.rsi_compra is not None else None
 
-        for i in range(20, n):
-            if self.df['close'][i] < self.df['Banda_Inferior'][i] and self.df['volume'][i] > self.df['Volume_SMA'][i] and self.df['close'][i] > self.df['close'][i-1]:
-                self.df['Buy_Signal'][i] = 1
-            elif self.df['close'][i] <= self.df['Banda_Inferior'][i] and self.df['volume'][i] < self.df['Volume_SMA'][i]:
-                self.df['Buy_Signal'][i] = 1
+        # Las comparaciones con NaN son falsas, igual que en el recorrido fila a fila
+        self.df['Buy_Signal'] = senal_compra(close, close_anterior, banda_inferior, volumen, volumen_sma,
+                                             rsi, self.rsi_compra, self.periodo_inicio)
 
+    @medir(filas=lambda self: len(self.df))
     def sell_signal(self):
         """
         Estrategia de Venta: 
         Genera señales de venta basadas en las Bandas de Bollinger y el volumen.
+        La columna 'Sell_Signal' es booleana (True en las filas con señal).
         """
-        n = len(self.df)
-        self.df['Sell_Signal'] = None
-        for i in range(20, n):
-            if self.df['close'][i] > self.df['Banda_Superior'][i] and self.df['volume'][i] > self.df['Volume_SMA'][i] and self.df['close'][i] < self.df['close'][i-1]:
-                self.df['Sell_Signal'][i] = 1
-            elif self.df['close'][i] >= self.df['Banda_Superior'][i] and self.df['volume'][i] < self.df['Volume_SMA'][i]:
-                self.df['Sell_Signal'][i] = 1
+        close, close_anterior, banda_superior, volumen, volumen_sma = self._columnas('Banda_Superior')
+        rsi = self.df['rsi'].to_numpy(dtype=float) if self.rsi_venta is not None else None
+
+        self.df['Sell_Signal'] = senal_venta(close, close_anterior, banda_superior, volumen, volumen_sma,
+                                             rsi, self.rsi_venta, self.periodo_inicio)
@@ -1,193 +1,256 @@
+import argparse
+import cProfile
+import pstats
 import pandas as pd
-import krakenex
-import matplotlib.pyplot as plt
 from Clase import Dataset, Grafico
+from almacen import AlmacenOHLC
+from barras import TIPOS_BARRA, UMBRALES_POR_DEFECTO, construir_barras, descargar_trades, leer_trades
+from escaner import Escaner, descubrir_pares
+from exportador import ExportadorGraficos
+from historico import ProcesadorHistorico, leer_ohlcvt
+from kraken_cliente import ClienteKraken
+from panel import PanelPares
+from cache_figuras import CacheFiguras, figura_a_bytes, huella
+from instrumentacion import etapa, instrumentacion
 import os
 import dotenv
 
 # Conectar a la API de Kraken
 dotenv.load_dotenv()
-k = krakenex.API(os.getenv('KRAKEN_KEY'))
-i = True
+# (con KRAKEN_URI se puede usar un ServidorReplay local en lugar de Kraken)
+k = ClienteKraken(os.getenv('KRAKEN_KEY'), uri=os.getenv('KRAKEN_URI'))
+
+# Almacén local de velas: solo se descargan las velas nuevas en cada ejecución
+almacen = AlmacenOHLC()
+
+# Pares disponibles en el menú: opción -> (código de Kraken, nombre del par)
+PARES = {
+    1: ('XXBTZUSD', 'BTC/USD'),
+    2: ('XETHZUSD', 'ETH/USD'),
+    3: ('XETHXXBT', 'ETH/BTC'),
+    4: ('ADAUSD', 'ADA/USD'),
+    5: ('DOTUSD', 'DOT/USD'),
+    6: ('SOLUSD', 'SOL/USD'),
+    7: ('XXRPZUSD', 'XRP/USD'),
+    8: ('XLTCZUSD', 'LTC/USD'),
+}
+
+# Gráficos ya dibujados, conservados en disco entre ejecuciones
+cache_figuras = CacheFiguras(directorio='.cache_graficos')
 
 # Función para guardar gráficos
-def guardar_grafico(figura, nombre):
-    """Guarda una figura en un archivo con el nombre dado."""
-    figura.savefig(f"{nombre}.png", dpi=300)
-    plt.close(figura)  # Cerramos la figura para evitar acumulación de memoria
-
-while i == True:
-    print("Selecciona la moneda que quiere representar:\n"
-          "1. BTC / USD\n"
-          "2. ETH / USD\n"
-          "3. ETH / BTC\n"
-          "4. ADA / USD\n"
-          "5. DOT / USD\n"
-          "6. SOL / USD\n"
-          "7. XRP / USD\n"
-          "8. LTC / USD\n")
+def guardar_grafico(grafico, metodo, nombre, version, dpi=300):
+    """
+    Guarda el gráfico 'metodo' de 'grafico' en un archivo PNG con el nombre dado.
+    Si ya se dibujó con los mismos datos ('version') y resolución, solo se copian los bytes.
+    """
+    clave = (grafico.pair, metodo, version, 'png', dpi)
+    with etapa('guardar_grafico', filas=len(grafico.df)):
+        imagen = cache_figuras.obtener(clave, lambda: figura_a_bytes(getattr(grafico, metodo)(), 'png', dpi))
+        with open(f"{nombre}.png", 'wb') as fichero:
+            fichero.write(imagen)
+
+
+def cargar_par(codigo, minutos=60):
+    """
+    Sincroniza el par con Kraken (velas de 1 hora) y devuelve un Dataset con las 720 últimas velas
+    de 'minutos' minutos, construidas localmente a partir de las velas de 1 hora del almacén.
+    """
+    almacen.sincronizar(k, codigo, 60)
+    base = almacen.cargar(codigo, 60, ultimas=720 * minutos // 60)
+    return base if minutos == 60 else base.remuestrear(minutos)
+
+
+def menu_interactivo(minutos=60):
+    """Menú interactivo: descarga un par, calcula sus métricas y guarda sus cuatro gráficos."""
+    i = True
+    while i == True:
+        print("Selecciona la moneda que quiere representar:\n"
+              "1. BTC / USD\n"
+              "2. ETH / USD\n"
+              "3. ETH / BTC\n"
+              "4. ADA / USD\n"
+              "5. DOT / USD\n"
+              "6. SOL / USD\n"
+              "7. XRP / USD\n"
+              "8. LTC / USD\n")
     
-    opcion = int(input("Introduce el número de la moneda que quieres representar: "))
-
-    if opcion == 1:
-        data = k.query_public('OHLC', {'pair': 'XXBTZUSD', 'interval': 60})
-        datos = data['result']['XXBTZUSD']  
-        pair = 'BTC/USD'
-        df = Dataset(datos)
-        df.get_metrics()
-        df.print_data(200)
-        
-        # Generar gráficos
-        grafico = Grafico(df.data, pair)
-        fig = grafico.lineplot()
-        guardar_grafico(fig, 'BTCUSD_Lineplot')
-        fig = grafico.lineplot_with_volume()
-        guardar_grafico(fig, 'BTCUSD_Lineplot_Volumen')
-        fig = grafico.candlestick()
-        guardar_grafico(fig, 'BTCUSD_Candlestick')
-        fig = grafico.candlestick_with_volume()
-        guardar_grafico(fig, 'BTCUSD_Candlestick_Volumen')
-        break
-
-    elif opcion == 2:
-        data = k.query_public('OHLC', {'pair': 'XETHZUSD', 'interval': 60})
-        datos = data['result']['XETHZUSD']
-        pair = 'ETH/USD'
-        df = Dataset(datos)
-        df.get_metrics()
-        df.print_data(200)
-        
-        # Generar gráficos
-        grafico = Grafico(df.data, pair)
-        fig = grafico.lineplot()
-        guardar_grafico(fig, 'ETHUSD_Lineplot')
-        fig = grafico.lineplot_with_volume()
-        guardar_grafico(fig, 'ETHUSD_Lineplot_Volumen')
-        fig = grafico.candlestick()
-        guardar_grafico(fig, 'ETHUSD_Candlestick')
-        fig = grafico.candlestick_with_volume()
-        guardar_grafico(fig, 'ETHUSD_Candlestick_Volumen')
-        break
-
-    elif opcion == 3:
-        data = k.query_public('OHLC', {'pair': 'XETHXXBT', 'interval': 60})
-        datos = data['result']['XETHXXBT']
-        pair = 'ETH/BTC'
-        df = Dataset(datos)
-        df.get_metrics()
-        df.print_data(200)
-        
-        # Generar gráficos
-        grafico = Grafico(df.data, pair)
-        fig = grafico.lineplot()
-        guardar_grafico(fig, 'ETHBTC_Lineplot')
-        fig = grafico.lineplot_with_volume()
-        guardar_grafico(fig, 'ETHBTC_Lineplot_Volumen')
-        fig = grafico.candlestick()
-        guardar_grafico(fig, 'ETHBTC_Candlestick')
-        fig = grafico.candlestick_with_volume()
-        guardar_grafico(fig, 'ETHBTC_Candlestick_Volumen')
-        break
-
-    elif opcion == 4:
-        data = k.query_public('OHLC', {'pair': 'ADAUSD', 'interval': 60})
-        datos = data['result']['ADAUSD']
-        pair = 'ADA/USD'
-        df = Dataset(datos)
-        df.get_metrics()
-        df.print_data(200)
-        
-        # Generar gráficos
-        grafico = Grafico(df.data, pair)
-        fig = grafico.lineplot()
-        guardar_grafico(fig, 'ADAUSD_Lineplot')
-        fig = grafico.lineplot_with_volume()
-        guardar_grafico(fig, 'ADAUSD_Lineplot_Volumen')
-        fig = grafico.candlestick()
-        guardar_grafico(fig, 'ADAUSD_Candlestick')
-        fig = grafico.candlestick_with_volume()
-        guardar_grafico(fig, 'ADAUSD_Candlestick_Volumen')
-        break
-
-    elif opcion == 5:
-        data = k.query_public('OHLC', {'pair': 'DOTUSD', 'interval': 60})
-        datos = data['result']['DOTUSD']
-        pair = 'DOT/USD'
-        df = Dataset(datos)
-        df.get_metrics()
-        df.print_data(200)
-        
-        # Generar gráficos
-        grafico = Grafico(df.data, pair)
-        fig = grafico.lineplot()
-        guardar_grafico(fig, 'DOTUSD_Lineplot')
-        fig = grafico.lineplot_with_volume()
-        guardar_grafico(fig, 'DOTUSD_Lineplot_Volumen')
-        fig = grafico.candlestick()
-        guardar_grafico(fig, 'DOTUSD_Candlestick')
-        fig = grafico.candlestick_with_volume()
-        guardar_grafico(fig, 'DOTUSD_Candlestick_Volumen')
-        break
-
-    elif opcion == 6:
-        data = k.query_public('OHLC', {'pair': 'SOLUSD', 'interval': 60})
-        datos = data['result']['SOLUSD']
-        pair = 'SOL/USD'
-        df = Dataset(datos)
-        df.get_metrics()
-        df.print_data(200)
-        
-        # Generar gráficos
-        grafico = Grafico(df.data, pair)
-        fig = grafico.lineplot()
-        guardar_grafico(fig, 'SOLUSD_Lineplot')
-        fig = grafico.lineplot_with_volume()
-        guardar_grafico(fig, 'SOLUSD_Lineplot_Volumen')
-        fig = grafico.candlestick()
-        guardar_grafico(fig, 'SOLUSD_Candlestick')
-        fig = grafico.candlestick_with_volume()
-        guardar_grafico(fig, 'SOLUSD_Candlestick_Volumen')
-        break
-
-    elif opcion == 7:
-        data = k.query_public('OHLC', {'pair': 'XXRPZUSD', 'interval': 60})
-        datos = data['result']['XXRPZUSD']
-        pair = 'XRP/USD'
-        df = Dataset(datos)
-        df.get_metrics()
-        df.print_data(200)
-        
-        # Generar gráficos
-        grafico = Grafico(df.data, pair)
-        fig = grafico.lineplot()
-        guardar_grafico(fig, 'XRPUSD_Lineplot')
-        fig = grafico.lineplot_with_volume()
-        guardar_grafico(fig, 'XRPUSD_Lineplot_Volumen')
-        fig = grafico.candlestick()
-        guardar_grafico(fig, 'XRPUSD_Candlestick')
-        fig = grafico.candlestick_with_volume()
-        guardar_grafico(fig, 'XRPUSD_Candlestick_Volumen')
-        break
-
-    elif opcion == 8:
-        data = k.query_public('OHLC', {'pair': 'XLTCZUSD', 'interval': 60})
-        datos = data['result']['XLTCZUSD']
-        pair = 'LTC/USD'
-        df = Dataset(datos)
-        df.get_metrics()
-        df.print_data(200)
+        opcion = int(input("Introduce el número de la moneda que quieres representar: "))
+
+        if opcion in PARES:
+            codigo, pair = PARES[opcion]
+            # Descargamos solo las velas nuevas y cargamos las 720 últimas desde el disco
+            df = cargar_par(codigo, minutos)
+            df.get_metrics()
+            df.print_data(200)
         
-        # Generar gráficos
-        grafico = Grafico(df.data, pair)
-        fig = grafico.lineplot()
-        guardar_grafico(fig, 'LTCUSD_Lineplot')
-        fig = grafico.lineplot_with_volume()
-        guardar_grafico(fig, 'LTCUSD_Lineplot_Volumen')
-        fig = grafico.candlestick()
-        guardar_grafico(fig, 'LTCUSD_Candlestick')
-        fig = grafico.candlestick_with_volume()
-        guardar_grafico(fig, 'LTCUSD_Candlestick_Volumen')
-        break
+            # Generar gráficos
+            prefijo = pair.replace('/', '') + ('' if minutos == 60 else f'_{minutos}')
+            grafico = Grafico(df.data, pair)
+            version = huella(df.data)
+            guardar_grafico(grafico, 'lineplot', f'{prefijo}_Lineplot', version)
+            guardar_grafico(grafico, 'lineplot_with_volume', f'{prefijo}_Lineplot_Volumen', version)
+            guardar_grafico(grafico, 'candlestick', f'{prefijo}_Candlestick', version)
+            guardar_grafico(grafico, 'candlestick_with_volume', f'{prefijo}_Candlestick_Volumen', version)
+            break
+
+        else:
+            print("Opción no válida")
 
+
+def modo_escaner(args):
+    """Modo por lotes: analiza muchos pares en paralelo y muestra la tabla de señales."""
+    if args.pares:
+        pares = args.pares
+    elif args.config:
+        # Un par por línea; se ignoran las líneas vacías y los comentarios
+        with open(args.config) as fichero:
+            pares = [linea.strip() for linea in fichero if linea.strip() and not linea.startswith('#')]
     else:
-        print("Opción no válida")
+        pares = descubrir_pares(k, args.cotizacion)
+
+    cliente = ClienteKraken(os.getenv('KRAKEN_KEY'), llamadas_por_segundo=args.llamadas_por_segundo,
+                            conexiones=args.workers, uri=os.getenv('KRAKEN_URI'))
+    escaner = Escaner(workers=args.workers, ventana_senal=args.ventana_senal, cliente=cliente)
+    tabla = escaner.escanear(pares)
+    print(cliente.metricas())
+    print(tabla.to_string())
+    if args.salida:
+        tabla.to_csv(args.salida, index=False)
+
+
+def modo_exportar(args):
+    """Modo por lotes: exporta los cuatro gráficos de cada par repartidos en varios procesos."""
+    # Por defecto se exportan los pares del menú; con --pares, los códigos indicados
+    pares = [(codigo, codigo) for codigo in args.pares] if args.pares else list(PARES.values())
+
+    datos = {}
+    for codigo, pair in pares:
+        df = cargar_par(codigo, args.temporalidad)
+        # Solo los indicadores que se dibujan (sin RSI)
+        df.get_metrics(indicadores=Grafico.COLUMNAS)
+        datos[pair] = df.data
+
+    exportador = ExportadorGraficos(workers=args.procesos, directorio=args.directorio,
+                                    formato=args.formato, dpi=args.dpi)
+    for ruta in exportador.exportar(datos):
+        print(ruta)
+
+
+def modo_correlaciones(args):
+    """Modo por lotes: correlaciones y betas entre pares con las velas de 1 hora del almacén."""
+    codigos = args.pares or [codigo for codigo, _ in PARES.values()]
+    for codigo in codigos:
+        almacen.sincronizar(k, codigo, 60)
+    panel = PanelPares.desde_almacen(almacen, codigos)
+    correlaciones = panel.correlacion(args.ventana)
+    print(correlaciones.round(3).to_string())
+    print(panel.beta(args.ventana).round(3).to_string())
+    if args.salida:
+        correlaciones.to_csv(args.salida)
+
+
+def modo_historico(args):
+    """Modo por lotes: indicadores y señales de un CSV histórico de Kraken procesado por bloques."""
+    if not args.salida:
+        raise ValueError("El modo --historico necesita un fichero de --salida (.parquet o .csv)")
+    bloques = leer_ohlcvt(args.historico, args.miembro, args.filas_por_bloque)
+    filas = ProcesadorHistorico().procesar(bloques, args.salida)
+    print(f"{filas} velas procesadas en {args.salida}")
+
+
+def modo_barras(args):
+    """
+    Modo por lotes: construye barras de tiempo, operaciones, volumen o importe a partir de las operaciones
+    de un par (descargadas desde --desde o leídas de --trades) y guarda sus cuatro gráficos.
+    """
+    if not args.pares:
+        raise ValueError("El modo --barras necesita un par en --pares")
+    codigo = args.pares[0]
+    umbral = args.umbral if args.umbral is not None else UMBRALES_POR_DEFECTO.get(args.barras)
+    if umbral is None:
+        raise ValueError(f"Las barras de {args.barras} necesitan un --umbral")
+    if args.trades:
+        trades = leer_trades(args.trades)
+    else:
+        # Las fechas sin zona horaria se leen como UTC
+        desde = args.desde or pd.Timestamp.now(tz='UTC') - pd.Timedelta(hours=24)
+        trades = descargar_trades(k, codigo, desde)
+
+    df = Dataset(construir_barras(trades, args.barras, umbral))
+    df.get_metrics()
+    df.print_data(20)
+
+    prefijo = f"{codigo}_{args.barras}_{umbral:g}"
+    grafico = Grafico(df.data, codigo)
+    version = huella(df.data)
+    guardar_grafico(grafico, 'lineplot', f'{prefijo}_Lineplot', version)
+    guardar_grafico(grafico, 'lineplot_with_volume', f'{prefijo}_Lineplot_Volumen', version)
+    guardar_grafico(grafico, 'candlestick', f'{prefijo}_Candlestick', version)
+    guardar_grafico(grafico, 'candlestick_with_volume', f'{prefijo}_Candlestick_Volumen', version)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Análisis técnico de pares de Kraken.")
+    parser.add_argument('--escanear', action='store_true', help="Analiza muchos pares sin menú interactivo")
+    parser.add_argument('--pares', nargs='+', help="Códigos de Kraken de los pares a analizar")
+    parser.add_argument('--config', help="Fichero con un código de par por línea")
+    parser.add_argument('--cotizacion', help="Con AssetPairs, solo pares cotizados en esta moneda (p. ej. ZUSD)")
+    parser.add_argument('--workers', type=int, default=8, help="Descargas simultáneas")
+    parser.add_argument('--llamadas-por-segundo', type=float, default=1.0, help="Ritmo máximo de llamadas a la API")
+    parser.add_argument('--ventana-senal', type=int, default=1, help="Velas finales en las que se buscan señales")
+    parser.add_argument('--salida', help="Fichero CSV donde guardar la tabla de señales o de correlaciones (o el resultado de --historico)")
+    parser.add_argument('--exportar', action='store_true', help="Exporta los gráficos de todos los pares en paralelo")
+    parser.add_argument('--correlaciones', action='store_true', help="Muestra las correlaciones y betas entre los pares")
+    parser.add_argument('--ventana', type=int, default=720, help="Velas de 1 hora de la ventana de correlaciones")
+    parser.add_argument('--historico', help="CSV histórico OHLCVT de Kraken (o ZIP con --miembro) a procesar por bloques")
+    parser.add_argument('--miembro', help="Nombre del CSV dentro del ZIP de --historico")
+    parser.add_argument('--filas-por-bloque', type=int, default=1_000_000, help="Velas de cada bloque de --historico")
+    parser.add_argument('--barras', choices=TIPOS_BARRA, help="Construye barras de este tipo a partir de las operaciones")
+    parser.add_argument('--umbral', type=float, help="Minutos, operaciones, unidades o importe de cada barra "
+                                                        "(por defecto, 60 minutos o 1000 operaciones; obligatorio con volumen y dolares)")
+    parser.add_argument('--trades', help="Fichero CSV de operaciones (fecha, precio, volumen) en lugar de la API")
+    parser.add_argument('--desde', help="Fecha (UTC) desde la que se descargan las operaciones (por defecto, hace 24 horas)")
+    parser.add_argument('--procesos', type=int, default=None, help="Procesos para exportar (por defecto, uno por núcleo)")
+    parser.add_argument('--directorio', default='.', help="Directorio de los gráficos exportados")
+    parser.add_argument('--formato', default='png', help="Formato de los gráficos exportados (png, svg, pdf...)")
+    parser.add_argument('--dpi', type=int, default=300, help="Resolución de los gráficos exportados")
+    parser.add_argument('--temporalidad', type=int, default=60, choices=[60, 240, 1440, 10080],
+                        help="Minutos por vela, construidas a partir de las velas de 1 hora")
+    parser.add_argument('--metricas', help="Fichero JSONL donde añadir el tiempo, CPU, filas y memoria de cada etapa")
+    parser.add_argument('--prometheus', help="Fichero donde escribir el resumen por etapa en formato Prometheus")
+    parser.add_argument('--profile', help="Fichero donde guardar el perfil de cProfile de la ejecución")
+    args = parser.parse_args()
+
+    # Instrumentación por etapas (solo si se pide algún fichero de salida)
+    if args.metricas or args.prometheus:
+        instrumentacion.activar()
+    perfil = cProfile.Profile() if args.profile else None
+    if perfil is not None:
+        perfil.enable()
+
+    try:
+        if args.escanear:
+            modo_escaner(args)
+        elif args.exportar:
+            modo_exportar(args)
+        elif args.correlaciones:
+            modo_correlaciones(args)
+        elif args.historico:
+            modo_historico(args)
+        elif args.barras:
+            modo_barras(args)
+        else:
+            menu_interactivo(args.temporalidad)
+    finally:
+        if perfil is not None:
+            perfil.disable()
+            perfil.dump_stats(args.profile)
+            pstats.Stats(perfil).sort_stats('cumulative').print_stats(25)
+        if instrumentacion.activa:
+            resumen = pd.DataFrame(instrumentacion.resumen()).T.sort_values('segundos', ascending=False)
+            print(resumen.to_string())
+            if args.metricas:
+                instrumentacion.guardar_jsonl(args.metricas)
+            if args.prometheus:
+                instrumentacion.guardar_prometheus(args.prometheus)
@@ -0,0 +1,114 @@
+# Importamos las librerías necesarias
+import json
+import os
+
+import pandas as pd
+
+from Clase import COLUMNAS, Dataset
+from instrumentacion import medir
+
+
+### Clase AlmacenOHLC
+class AlmacenOHLC:
+    """
+    Almacén local de velas OHLC en formato columnar (Parquet), con un fichero por par e intervalo.
+    Guarda junto a cada fichero el cursor 'last' de Kraken para descargar solo las velas nuevas
+    en cada sincronización y construir históricos más largos que las 720 velas de la API.
+    """
+
+    def __init__(self, directorio='datos'):
+        """Constructor de la clase. Recibe el directorio donde se guardan los ficheros."""
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, pair, interval, extension):
+        """Devuelve la ruta del fichero de un par e intervalo con la extensión indicada."""
+        return os.path.join(self.directorio, f"{pair}_{interval}.{extension}")
+
+    def cursor(self, pair, interval=60):
+        """Devuelve el último cursor 'last' guardado para el par, o None si no hay datos."""
+        ruta = self._ruta(pair, interval, 'json')
+        if not os.path.exists(ruta):
+            return None
+        with open(ruta) as fichero:
+            return json.load(fichero)['last']
+
+    @medir()
+    def sincronizar(self, k, pair, interval=60):
+        """
+        Descarga de Kraken las velas posteriores al cursor guardado, las fusiona con las
+        almacenadas (las velas repetidas se sustituyen por la versión más reciente) y
+        actualiza el cursor. Devuelve el número de velas recibidas.
+        """
+        consulta = {'pair': pair, 'interval': interval}
+        cursor = self.cursor(pair, interval)
+        if cursor is not None:
+            consulta['since'] = cursor
+
+        data = k.query_public('OHLC', consulta)
+        if data.get('error'):
+            raise ValueError(f"Error de Kraken al obtener {pair}: {', '.join(data['error'])}")
+
+        # El resultado contiene la lista de velas (con el nombre canónico del par) y el cursor 'last'
+        resultado = data['result']
+        filas = next(valor for clave, valor in resultado.items() if clave != 'last')
+        nuevos = self._tipar(pd.DataFrame(filas, columns=COLUMNAS))
+
+        ruta = self._ruta(pair, interval, 'parquet')
+        if os.path.exists(ruta):
+            nuevos = pd.concat([pd.read_parquet(ruta), nuevos], ignore_index=True)
+        nuevos = nuevos.drop_duplicates('timestamp', keep='last').sort_values('timestamp', ignore_index=True)
+
+        # Escribimos en un fichero temporal y lo renombramos para no dejar ficheros a medias
+        self._escribir(nuevos, ruta)
+        temporal = self._ruta(pair, interval, 'json.tmp')
+        with open(temporal, 'w') as fichero:
+            json.dump({'last': resultado['last']}, fichero)
+        os.replace(temporal, self._ruta(pair, interval, 'json'))
+        return len(filas)
+
+    @staticmethod
+    def _tipar(df):
+        """Convierte las columnas de velas de Kraken (texto) a tipos numéricos."""
+        df = df.astype({columna: float for columna in COLUMNAS[1:7]})
+        return df.astype({'timestamp': 'int64', 'count': 'int64'})
+
+    @staticmethod
+    def _escribir(df, ruta):
+        """Escribe el DataFrame en Parquet de forma atómica."""
+        temporal = ruta + '.tmp'
+        df.to_parquet(temporal, index=False)
+        os.replace(temporal, ruta)
+
+    @medir()
+    def leer(self, pair, interval=60, desde=None, hasta=None, ultimas=None):
+        """
+        Lee del disco las velas de un par en el rango [desde, hasta] (fechas o timestamps Unix)
+        y, opcionalmente, solo las 'ultimas' velas de ese rango.
+        """
+        ruta = self._ruta(pair, interval, 'parquet')
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(f"No hay datos almacenados para {pair} con intervalo {interval}")
+
+        # Los filtros se aplican al leer el Parquet, sin cargar el resto del fichero
+        filtros = []
+        if desde is not None:
+            filtros.append(('timestamp', '>=', self._a_timestamp(desde)))
+        if hasta is not None:
+            filtros.append(('timestamp', '<=', self._a_timestamp(hasta)))
+        df = pd.read_parquet(ruta, filters=filtros or None)
+
+        if ultimas is not None:
+            df = df.iloc[-ultimas:]
+        return df.reset_index(drop=True)
+
+    @staticmethod
+    def _a_timestamp(fecha):
+        """Convierte una fecha (o un timestamp Unix) en segundos desde 1970."""
+        if isinstance(fecha, (int, float)):
+            return int(fecha)
+        return int(pd.Timestamp(fecha).timestamp())
+
+    def cargar(self, pair, interval=60, desde=None, hasta=None, ultimas=None):
+        """Devuelve un Dataset con las velas almacenadas del par en el rango indicado."""
+        return Dataset(self.leer(pair, interval, desde, hasta, ultimas))
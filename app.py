@@ -1,9 +1,12 @@
 import streamlit as st
-import pandas as pd
-import krakenex
-from Clase import Dataset, Grafico  # Asegúrate de tener las clases actualizadas
-import plotly.express as px
-import plotly.graph_objects as go
+from Clase import Dataset  # Asegúrate de tener las clases actualizadas
+from almacen import AlmacenOHLC
+from kraken_cliente import ClienteKraken
+from ingesta import IngestaOHLC, URI_KRAKEN_WS
+from cache_datos import CacheDatos
+from cache_figuras import CacheFiguras
+from graficos_plotly import GraficoPlotly
+from plantillas import Plantillas
 import dotenv
 import os
 
@@ -74,32 +77,73 @@ st.markdown("<h1 style='text-align: center; color: #BB86FC;'>Visualización de P
 
 # Conectar a la API de Kraken
 dotenv.load_dotenv()
-k = krakenex.API(os.getenv('KRAKEN_KEY'))
-
-# Inicializar el estado de la sesión
-if 'data' not in st.session_state:
-    st.session_state['data'] = None
-
-# Función para obtener datos
-@st.cache_data
+# Un solo cliente para todas las sesiones y reejecuciones: reutiliza conexiones, limita el ritmo
+# de llamadas y reintenta los errores transitorios
+@st.cache_resource
+def cliente_kraken():
+    return ClienteKraken(os.getenv('KRAKEN_KEY'), uri=os.getenv('KRAKEN_URI'))
+
+k = cliente_kraken()
+
+# Almacén local de velas: solo se descargan las velas nuevas desde el último cursor
+almacen = AlmacenOHLC()
+
+# Gráficos estáticos ya dibujados, compartidos por todas las sesiones (límite en CACHE_FIGURAS_MB)
+@st.cache_resource
+def cache_figuras():
+    return CacheFiguras(max_bytes=int(os.getenv('CACHE_FIGURAS_MB', 256)) * 2**20)
+
+# Figuras de matplotlib construidas una vez por tipo de gráfico y compartidas por todas las sesiones:
+# cada gráfico nuevo solo sustituye los datos de la figura
+@st.cache_resource
+def plantillas():
+    return Plantillas()
+
+# Resolución de los gráficos estáticos (la misma que usa st.pyplot)
+DPI = 200
+
+# Pares disponibles (con los nombres de la API WebSocket de Kraken)
+PARES = ["BTC/USD", "ETH/USD", "ETH/BTC", "ADA/USD", "DOT/USD", "SOL/USD", "XRP/USD", "LTC/USD"]
+
+# Temporalidades disponibles: todas se construyen a partir de las velas de 1 hora (minutos por vela)
+TEMPORALIDADES = {"1 hora": 60, "4 horas": 240, "1 día": 1440, "1 semana": 10080}
+
+# Ingesta en segundo plano de las velas por WebSocket, compartida por todas las sesiones
+# (con KRAKEN_WS_URI se puede usar un ServidorWebSocket local en lugar de Kraken)
+@st.cache_resource
+def ingesta_ohlc():
+    return IngestaOHLC(PARES, uri=os.getenv('KRAKEN_WS_URI', URI_KRAKEN_WS)).iniciar()
+
+# Códigos de Kraken de cada par
+PAIR_MAPPING = {
+    "BTC/USD": 'XXBTZUSD',
+    "ETH/USD": 'XETHZUSD',
+    "ETH/BTC": 'XETHXXBT',
+    "ADA/USD": 'ADAUSD',
+    "DOT/USD": 'DOTUSD',
+    "SOL/USD": 'SOLUSD',
+    "XRP/USD": 'XXRPZUSD',
+    "LTC/USD": 'XLTCZUSD'
+}
+
+# Funciones para obtener datos
 def fetch_data(pair):
-    pair_mapping = {
-        "BTC/USD": 'XXBTZUSD',
-        "ETH/USD": 'XETHZUSD',
-        "ETH/BTC": 'XETHXXBT',
-        "ADA/USD": 'ADAUSD',
-        "DOT/USD": 'DOTUSD',
-        "SOL/USD": 'SOLUSD',
-        "XRP/USD": 'XXRPZUSD',
-        "LTC/USD": 'XLTCZUSD'
-    }
-    # Realizar la consulta a la API de Kraken
-    data = k.query_public('OHLC', {'pair': pair_mapping[pair], 'interval': 60})
-    datos = data['result'][pair_mapping[pair]]
-    # Procesar los datos con la clase Dataset
-    df = Dataset(datos)
-    df.get_metrics()
-    return df.data
+    """Sincroniza el almacén local con Kraken y carga las velas de 1 hora necesarias para tener
+    720 velas de la temporalidad más larga."""
+    almacen.sincronizar(k, PAIR_MAPPING[pair], 60)
+    return Dataset(almacen.leer(PAIR_MAPPING[pair], 60, ultimas=720 * max(TEMPORALIDADES.values()) // 60))
+
+def update_data(pair, dataset):
+    """Descarga las velas nuevas y las añade al Dataset (solo se recalculan esas filas)."""
+    almacen.sincronizar(k, PAIR_MAPPING[pair], 60)
+    dataset.append(almacen.leer(PAIR_MAPPING[pair], 60, desde=dataset.data['Date'].iloc[-1]))
+
+# Caché de datos compartida por todas las sesiones: un hilo en segundo plano actualiza los pares
+# consultados cada CACHE_TTL segundos y las sesiones leen vistas de solo lectura sin copiarlas
+@st.cache_resource
+def cache_datos():
+    return CacheDatos(fetch_data, update_data, ttl=float(os.getenv('CACHE_TTL', 300)), ultimas=720,
+                      periodo=0.5).iniciar()
 
 # Barra lateral con diseño estético minimalista
 st.sidebar.markdown("<h3 style='color: #BB86FC;'>Controles</h3>", unsafe_allow_html=True)
@@ -107,7 +151,7 @@ st.sidebar.markdown("<h3 style='color: #BB86FC;'>Controles</h3>", unsafe_allow_h
 # Selector de par de monedas
 pair = st.sidebar.selectbox(
     "Selecciona la moneda que quieres representar",
-    ["BTC/USD", "ETH/USD", "ETH/BTC", "ADA/USD", "DOT/USD", "SOL/USD", "XRP/USD", "LTC/USD"]
+    PARES
 )
 
 # Botón para obtener datos y graficar
@@ -115,50 +159,81 @@ if st.sidebar.button('Obtener datos'):
     try:
         # Mostrar mensaje de carga mientras se obtiene el gráfico
         with st.spinner("Obteniendo datos..."):
-            st.session_state['data'] = fetch_data(pair)
+            # Solo espera a Kraken la primera vez que alguien pide el par; después se sirve de la caché
+            cache_datos().obtener(pair)
             st.session_state['pair'] = pair
         st.success('Datos obtenidos exitosamente.')
     except Exception as e:
         st.error(f"Ocurrió un error al obtener los datos: {e}")
 
-# Mostrar datos y gráficos si los datos están disponibles
-if st.session_state['data'] is not None:
+# Gráficos disponibles: (método de Grafico y GraficoPlotly, texto de la casilla, mensaje de carga)
+GRAFICOS = [
+    ('lineplot', 'Gráfico de líneas', "Generando gráfico de líneas..."),
+    ('lineplot_with_volume', 'Gráfico de líneas con volumen', "Generando gráfico de líneas con volumen..."),
+    ('candlestick', 'Gráfico de velas', "Generando gráfico de velas..."),
+    ('candlestick_with_volume', 'Gráfico de velas con volumen', "Generando gráfico de velas con volumen..."),
+]
+
+
+def panel(minutos, modo, seleccion, en_directo):
+    """
+    Muestra los datos y los gráficos seleccionados. En directo se ejecuta como fragmento cada segundo,
+    sin recargar el resto de la página, y dibuja la última versión de la caché, a la que el hilo
+    de actualización añade las velas recibidas por WebSocket.
+    """
+    # Vista de solo lectura compartida con las demás sesiones (últimas 720 velas con sus métricas)
+    data = cache_datos().obtener(st.session_state['pair'], minutos)
+
     # Mostrar datos en un expansor
     with st.expander("Mostrar datos en bruto", expanded=False):  # Mantenemos este menú colapsado por defecto
-        st.write(st.session_state['data'].head(200))
+        st.write(data.head(200))
 
-    # Crear instancia de la clase Grafico
-    grafico = Grafico(st.session_state['data'], st.session_state['pair'])
+    # Crear instancia de la clase GraficoPlotly
+    grafico_plotly = GraficoPlotly(data, st.session_state['pair'])
 
     st.subheader('Gráficos')
+    if en_directo:
+        st.caption(f"Última vela: {data['Date'].iloc[-1]} · cierre {data['close'].iloc[-1]}")
+
+    for metodo, _, mensaje in GRAFICOS:
+        if metodo not in seleccion:
+            continue
+        with st.spinner(mensaje):  # Mostrar spinner mientras se carga el gráfico
+            if modo == 'Interactivos (Plotly)':
+                # Figura interactiva WebGL, con los datos ya reducidos en el servidor
+                st.plotly_chart(getattr(grafico_plotly, metodo)(), use_container_width=True)
+            else:
+                # Imagen de la caché si ya se dibujó con la misma versión de los datos; si no,
+                # se sustituyen los datos en la figura reutilizable de ese tipo y se dibuja una sola vez
+                clave = (st.session_state['pair'], metodo, minutos, data.attrs.get('version'), 'png', DPI)
+                imagen = cache_figuras().obtener(
+                    clave, lambda: plantillas().a_bytes(metodo, data, st.session_state['pair'], 'png', DPI,
+                                                        bbox_inches='tight'))
+                st.image(imagen, use_column_width=True)
+
+
+# Mostrar datos y gráficos si los datos están disponibles
+if 'pair' in st.session_state:
+    # Temporalidad: los indicadores y señales de cada una se calculan una vez y quedan en caché en el Dataset
+    temporalidad = st.sidebar.selectbox('Temporalidad', list(TEMPORALIDADES))
 
     # Opciones de gráficos en la barra lateral
     st.sidebar.markdown("<h4 style='color: #BB86FC;'>Opciones de gráficos</h4>", unsafe_allow_html=True)
-    show_lineplot = st.sidebar.checkbox('Gráfico de líneas')
-    show_lineplot_volume = st.sidebar.checkbox('Gráfico de líneas con volumen')
-    show_candlestick = st.sidebar.checkbox('Gráfico de velas')
-    show_candlestick_volume = st.sidebar.checkbox('Gráfico de velas con volumen')
-
-    # Botón para generar los gráficos
-    if st.sidebar.button('Generar gráficos'):
-        if show_lineplot:
-            with st.spinner("Generando gráfico de líneas..."):  # Mostrar spinner mientras se carga el gráfico
-                fig = grafico.lineplot()  # Obtener la figura de la clase Grafico
-                st.pyplot(fig)  # Mostrar la figura directamente en Streamlit
-
-        if show_lineplot_volume:
-            with st.spinner("Generando gráfico de líneas con volumen..."):  # Mostrar spinner mientras se carga el gráfico
-                fig = grafico.lineplot_with_volume()  # Obtener la figura de la clase Grafico
-                st.pyplot(fig)  # Mostrar la figura directamente en Streamlit
-
-        if show_candlestick:
-            with st.spinner("Generando gráfico de velas..."):  # Mostrar spinner mientras se carga el gráfico
-                fig = grafico.candlestick()  # Obtener la figura de la clase Grafico
-                st.pyplot(fig)  # Mostrar la figura directamente en Streamlit
-
-        if show_candlestick_volume:
-            with st.spinner("Generando gráfico de velas con volumen..."):  # Mostrar spinner mientras se carga el gráfico
-                fig = grafico.candlestick_with_volume()  # Obtener la figura de la clase Grafico
-                st.pyplot(fig)  # Mostrar la figura directamente en Streamlit
+    modo = st.sidebar.radio('Tipo de gráficos', ['Estáticos (matplotlib)', 'Interactivos (Plotly)'])
+    marcados = [metodo for metodo, texto, _ in GRAFICOS if st.sidebar.checkbox(texto)]
+    en_directo = st.sidebar.checkbox('Actualización en directo (WebSocket)')
+    if en_directo:
+        # A partir de ahora el hilo de la caché añade también las velas recibidas por WebSocket
+        cache_datos().ingesta = ingesta_ohlc()
+
+    # Botón para generar los gráficos; en directo se muestran los marcados sin pulsarlo
+    generar = st.sidebar.button('Generar gráficos')
+    seleccion = marcados if generar or en_directo else []
+
+    argumentos = (TEMPORALIDADES[temporalidad], modo, seleccion, en_directo)
+    if en_directo:
+        st.fragment(panel, run_every=1)(*argumentos)
+    else:
+        panel(*argumentos)
 else:
     st.info('Selecciona un par de monedas y presiona "Obtener datos" en la barra lateral.')
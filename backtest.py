@@ -0,0 +1,174 @@
+# Importamos las librerías necesarias
+import numpy as np
+import pandas as pd
+
+
+def posiciones(compra, venta, cortos=False):
+    """
+    Convierte las señales de compra y venta en la posición mantenida tras el cierre de cada vela:
+    1 tras una señal de compra, 0 (o -1 si 'cortos') tras una señal de venta, y la posición anterior
+    si no hay señal. Las velas con ambas señales a la vez se ignoran. Sin bucles por vela.
+    Las señales pueden ser arrays 2-D (combinaciones x tiempo): cada fila se trata por separado.
+    """
+    compra = np.asarray(compra, dtype=bool)
+    venta = np.asarray(venta, dtype=bool)
+    n = compra.shape[-1]
+
+    objetivo = np.where(compra & ~venta, 1.0, np.where(venta & ~compra, -1.0 if cortos else 0.0, np.nan))
+
+    # Propagamos hacia delante la última señal: índice de la última vela con señal (0 = sin señal todavía)
+    con_senal = ~np.isnan(objetivo)
+    ultima = np.maximum.accumulate(np.where(con_senal, np.arange(1, n + 1), 0), axis=-1)
+    objetivo = np.concatenate([np.zeros(objetivo.shape[:-1] + (1,)), objetivo], axis=-1)
+    return np.take_along_axis(objetivo, ultima, axis=-1)
+
+
+def simular(close, posicion, coste=0.0):
+    """
+    Devuelve la rentabilidad neta por vela de mantener 'posicion' (decidida al cierre de cada vela
+    y aplicada desde la vela siguiente), descontando 'coste' (comisión + deslizamiento, en tanto por uno)
+    cada vez que cambia la posición. 'posicion' puede ser 2-D (combinaciones x tiempo).
+    """
+    close = np.asarray(close, dtype=float)
+    rentabilidad = np.zeros(len(close))
+    rentabilidad[1:] = close[1:] / close[:-1] - 1
+
+    # La posición del cierre i-1 es la que se mantiene durante la vela i
+    mantenida = np.concatenate([np.zeros(posicion.shape[:-1] + (1,)), posicion[..., :-1]], axis=-1)
+    cambios = np.abs(np.diff(posicion, axis=-1, prepend=0.0))
+    return (1 + mantenida * rentabilidad) * (1 - coste * cambios) - 1
+
+
+def tramos(posicion):
+    """
+    Localiza las operaciones de 'posicion' (1-D, o 2-D con una fila por combinación): cada tramo consecutivo
+    con la misma posición distinta de 0. Devuelve la fila, la vela de entrada y la de salida de cada
+    operación, y si sigue abierta (entonces la salida es la última vela).
+    """
+    posicion = np.atleast_2d(posicion)
+    k, n = posicion.shape
+    cambios = np.diff(posicion, axis=1, prepend=0.0) != 0
+
+    # Primer cambio posterior a cada vela (n si no hay más cambios)
+    proximo = np.minimum.accumulate(np.where(cambios, np.arange(n), n)[:, ::-1], axis=1)[:, ::-1]
+    proximo = np.concatenate([proximo[:, 1:], np.full((k, 1), n)], axis=1)
+
+    # Cada cambio cierra el tramo anterior y abre uno nuevo; nos quedamos con los tramos con posición
+    filas, entradas = np.nonzero(cambios & (posicion != 0))
+    salidas = proximo[filas, entradas]
+    abiertas = salidas >= n
+    return filas, entradas, np.where(abiertas, n - 1, salidas), abiertas
+
+
+def rentabilidad_tramos(close, posicion, coste=0.0):
+    """
+    Rentabilidad neta de cada operación de tramos(posicion), en el mismo orden: la bruta entre la entrada
+    y la salida, menos el coste de entrada y, si la operación está cerrada, el de salida.
+    Las operaciones abiertas se valoran al último cierre.
+    """
+    filas, entradas, salidas, abiertas = tramos(posicion)
+    # Rentabilidad bruta de cada tramo a partir del crecimiento logarítmico acumulado por vela
+    crecimiento = np.cumsum(np.log1p(np.atleast_2d(simular(close, posicion))), axis=1)
+    bruta = np.exp(crecimiento[filas, salidas] - crecimiento[filas, entradas])
+    return bruta * (1 - coste) * np.where(abiertas, 1.0, 1 - coste) - 1
+
+
+def metricas(close, posicion, coste=0.0, periodos_por_anio=24 * 365):
+    """
+    Métricas del backtest de 'posicion' (1-D, o 2-D con una fila por combinación de parámetros):
+    rentabilidad total, máximo drawdown, ratio de Sharpe anualizado, número de operaciones,
+    tasa de acierto y exposición. Con 'posicion' 2-D cada métrica es un array con un valor por fila.
+    """
+    posicion = np.asarray(posicion, dtype=float)
+    forma, n = posicion.shape[:-1], posicion.shape[-1]
+    if n == 0:
+        return {'rentabilidad_total': np.zeros(forma)[()], 'max_drawdown': np.zeros(forma)[()],
+                'sharpe': np.full(forma, np.nan)[()], 'operaciones': np.zeros(forma, dtype=int)[()],
+                'tasa_acierto': np.full(forma, np.nan)[()], 'exposicion': np.zeros(forma)[()]}
+
+    rentabilidad = simular(close, posicion, coste)
+    capital = np.cumprod(1 + rentabilidad, axis=-1)
+    desviacion = rentabilidad.std(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(desviacion > 0, rentabilidad.mean(axis=-1) / desviacion * np.sqrt(periodos_por_anio), np.nan)
+
+    filas = tramos(posicion)[0]
+    resultados = rentabilidad_tramos(close, posicion, coste)
+    operaciones = np.bincount(filas, minlength=int(np.prod(forma))).reshape(forma)
+    aciertos = np.bincount(filas, weights=resultados > 0, minlength=int(np.prod(forma))).reshape(forma)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tasa_acierto = np.where(operaciones > 0, aciertos / operaciones, np.nan)
+
+    return {
+        'rentabilidad_total': capital[..., -1] - 1,
+        'max_drawdown': (capital / np.maximum.accumulate(capital, axis=-1) - 1).min(axis=-1),
+        'sharpe': sharpe[()],
+        'operaciones': operaciones[()],
+        'tasa_acierto': tasa_acierto[()],
+        'exposicion': (posicion != 0).mean(axis=-1),
+    }
+
+
+### Clase Backtest
+class Backtest:
+    """
+    Clase que evalúa una estrategia a partir de las señales Buy_Signal y Sell_Signal de get_metrics.
+    Todas las operaciones se hacen sobre arrays completos, sin bucles por vela, por lo que
+    millones de velas se procesan en segundos.
+    """
+
+    def __init__(self, df, comision=0.0026, deslizamiento=0.0, periodos_por_anio=24 * 365, cortos=False, capital=1.0):
+        """
+        Constructor de la clase. Recibe un DataFrame con las señales calculadas.
+        - comision, deslizamiento: costes por operación, en tanto por uno del importe.
+        - periodos_por_anio: velas por año para anualizar el ratio de Sharpe (8760 con velas de 1 hora).
+        - cortos: si es True, las señales de venta abren posiciones cortas en lugar de cerrar la posición.
+        """
+        self.df = df
+        self.coste = comision + deslizamiento
+        self.periodos_por_anio = periodos_por_anio
+        self.cortos = cortos
+        self.capital = capital
+
+    def ejecutar(self):
+        """
+        Ejecuta el backtest y devuelve un diccionario con las métricas principales.
+        Deja en 'curva' la posición, la rentabilidad, el capital y el drawdown de cada vela,
+        y en 'operaciones' la lista de operaciones.
+        """
+        close = self.df['close'].to_numpy(dtype=float)
+        posicion = posiciones(self.df['Buy_Signal'].to_numpy(), self.df['Sell_Signal'].to_numpy(), self.cortos)
+        rentabilidad = simular(close, posicion, self.coste)
+
+        capital = self.capital * np.cumprod(1 + rentabilidad)
+        drawdown = capital / np.maximum.accumulate(capital) - 1
+
+        self.curva = pd.DataFrame({
+            'Date': self.df['Date'].to_numpy(),
+            'posicion': posicion,
+            'rentabilidad': rentabilidad,
+            'capital': capital,
+            'drawdown': drawdown,
+        })
+        self.operaciones = self._operaciones(close, posicion)
+        return metricas(close, posicion, self.coste, self.periodos_por_anio)
+
+    def _operaciones(self, close, posicion):
+        """
+        Construye la lista de operaciones: cada tramo consecutivo con la misma posición distinta de 0.
+        La última operación, si sigue abierta, se valora al último cierre.
+        """
+        fechas = self.df['Date'].to_numpy()
+        _, entradas, salidas, abiertas = tramos(posicion)
+        lado = posicion[entradas]
+
+        return pd.DataFrame({
+            'entrada': fechas[entradas],
+            'salida': fechas[salidas],
+            'lado': np.where(lado > 0, 'largo', 'corto'),
+            'precio_entrada': close[entradas],
+            'precio_salida': close[salidas],
+            'velas': salidas - entradas,
+            'rentabilidad': rentabilidad_tramos(close, posicion, self.coste),
+            'abierta': abiertas,
+        })
@@ -0,0 +1,178 @@
+# Importamos las librerías necesarias
+import numpy as np
+import pandas as pd
+
+from Clase import COLUMNAS, Dataset
+from instrumentacion import etapa
+
+# Tipos de barra: cada barra se cierra al completar 'umbral' minutos, operaciones, unidades negociadas
+# o importe negociado (precio x volumen) respectivamente
+TIPOS_BARRA = ('tiempo', 'ticks', 'volumen', 'dolares')
+
+# Umbral por defecto de cada tipo de barra: 60 minutos u 1000 operaciones. Las barras de volumen e importe
+# no tienen uno razonable para todos los pares (depende del precio y la liquidez): hay que indicarlo
+UMBRALES_POR_DEFECTO = {'tiempo': 60, 'ticks': 1000}
+
+# Columnas de las operaciones: fecha en segundos (con decimales), precio y volumen
+COLUMNAS_TRADES = ['time', 'price', 'volume']
+
+
+def trades_desde_kraken(filas):
+    """
+    Convierte las operaciones de la API de Kraken ([precio, volumen, fecha, lado, tipo, varios, id])
+    en un DataFrame con las columnas de COLUMNAS_TRADES.
+    """
+    if not filas:
+        return pd.DataFrame({columna: np.empty(0) for columna in COLUMNAS_TRADES})
+    # Kraken envía el precio y el volumen como texto
+    columnas = np.array([fila[:3] for fila in filas], dtype=float)
+    return pd.DataFrame({'time': columnas[:, 2], 'price': columnas[:, 0], 'volume': columnas[:, 1]})
+
+
+def _segundos(fecha):
+    """Convierte una fecha (o un timestamp Unix) en segundos desde 1970, con decimales."""
+    if isinstance(fecha, (int, float)):
+        return float(fecha)
+    return pd.Timestamp(fecha).value / 1e9
+
+
+def descargar_trades(k, pair, desde, hasta=None, max_paginas=None):
+    """
+    Descarga con 'k' (ClienteKraken) las operaciones de 'pair' desde 'desde' (fecha o timestamp Unix)
+    hasta 'hasta' (por defecto, hasta la última), página a página con el cursor 'last' de Kraken
+    (nanosegundos). Devuelve un DataFrame con las columnas de COLUMNAS_TRADES ordenado por fecha.
+    """
+    hasta = None if hasta is None else _segundos(hasta)
+    cursor = str(round(_segundos(desde) * 1e9) - 1)
+    paginas = []
+    while max_paginas is None or len(paginas) < max_paginas:
+        data = k.query_public('Trades', {'pair': pair, 'since': cursor})
+        if data.get('error'):
+            raise ValueError(f"Error de Kraken al obtener las operaciones de {pair}: {', '.join(data['error'])}")
+        resultado = data['result']
+        pagina = trades_desde_kraken(next(valor for clave, valor in resultado.items() if clave != 'last'))
+        paginas.append(pagina)
+
+        # Sin operaciones nuevas, o ya pasado 'hasta', no hay más páginas
+        if pagina.empty or str(resultado['last']) == cursor or (hasta is not None and pagina['time'].iloc[-1] > hasta):
+            break
+        cursor = str(resultado['last'])
+
+    trades = pd.concat(paginas, ignore_index=True)
+    if hasta is not None:
+        trades = trades[trades['time'] <= hasta]
+    return trades.sort_values('time', kind='stable', ignore_index=True)
+
+
+def leer_trades(ruta):
+    """Lee un fichero de operaciones grabado o descargado de Kraken (CSV sin cabecera: fecha, precio, volumen)."""
+    return pd.read_csv(ruta, header=None, names=COLUMNAS_TRADES, dtype=float)
+
+
+def _cantidad(trades, tipo):
+    """Cantidad que acumulan las barras de volumen (unidades) o de importe (precio x volumen)."""
+    cantidad = trades['volume'].to_numpy(dtype=float)
+    if tipo == 'dolares':
+        cantidad = cantidad * trades['price'].to_numpy(dtype=float)
+    return cantidad
+
+
+def _grupos(trades, tipo, umbral, acumulado=0.0):
+    """
+    Posición de la primera operación de cada barra. En las barras de volumen e importe, una operación
+    pertenece a la barra k si lo acumulado antes de ella (más 'acumulado', lo de operaciones anteriores)
+    está en [k*umbral, (k+1)*umbral): la barra se cierra con la operación que alcanza el umbral.
+    """
+    if tipo not in TIPOS_BARRA:
+        raise ValueError(f"Tipo de barra no válido: {tipo}. Opciones: {', '.join(TIPOS_BARRA)}")
+    if umbral <= 0:
+        raise ValueError("El umbral de las barras debe ser positivo")
+    n = len(trades)
+    if tipo == 'tiempo':
+        clave = np.floor(trades['time'].to_numpy() / (umbral * 60))
+    elif tipo == 'ticks':
+        clave = np.arange(n) // int(umbral)
+    else:
+        cantidad = _cantidad(trades, tipo)
+        clave = np.floor((acumulado + np.cumsum(cantidad) - cantidad) / umbral)
+    return np.flatnonzero(np.diff(clave, prepend=clave[0] - 1))
+
+
+def construir_barras(trades, tipo='tiempo', umbral=60, acumulado=0.0):
+    """
+    Agrega las operaciones (DataFrame con las columnas de COLUMNAS_TRADES, ordenado por fecha) en barras
+    con las columnas de COLUMNAS, listas para Dataset: apertura, máximo, mínimo, cierre, vwap, volumen y
+    número de operaciones. 'tipo' es uno de TIPOS_BARRA y 'umbral' los minutos, operaciones, unidades o
+    importe de cada barra. Las barras de tiempo empiezan en su intervalo (sin barras vacías, como en Kraken);
+    las demás, en la fecha de su primera operación, con decimales para no repetir fechas.
+    'acumulado' es el volumen o importe de operaciones anteriores, para continuar la misma rejilla de umbrales.
+    """
+    if len(trades) == 0:
+        return pd.DataFrame(columns=COLUMNAS)
+
+    with etapa(f'construir_barras.{tipo}', filas=len(trades)):
+        inicios = _grupos(trades, tipo, umbral, acumulado)
+        finales = np.append(inicios[1:], len(trades)) - 1
+
+        fecha = trades['time'].to_numpy(dtype=float)
+        precio = trades['price'].to_numpy(dtype=float)
+        volumen = trades['volume'].to_numpy(dtype=float)
+        volumen_total = np.add.reduceat(volumen, inicios)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vwap = np.add.reduceat(precio * volumen, inicios) / volumen_total
+        vwap = np.where(volumen_total > 0, vwap, precio[finales])
+
+        if tipo == 'tiempo':
+            periodo = umbral * 60
+            timestamp = (fecha[inicios] // periodo * periodo).astype(np.int64)
+        else:
+            timestamp = fecha[inicios]
+
+        return pd.DataFrame({
+            'timestamp': timestamp,
+            'open': precio[inicios],
+            'high': np.maximum.reduceat(precio, inicios),
+            'low': np.minimum.reduceat(precio, inicios),
+            'close': precio[finales],
+            'vwap': vwap,
+            'volume': volumen_total,
+            'count': np.diff(np.append(inicios, len(trades))),
+        })
+
+
+### Clase BarrasTrades
+class BarrasTrades:
+    """
+    Construye barras de un tipo a medida que llegan operaciones (páginas de la API o de un fichero).
+    La última barra queda abierta: se guardan sus operaciones y, con las siguientes, se vuelve a construir
+    desde su inicio. Las barras devueltas se pueden pasar a Dataset.append, que sustituye la barra abierta
+    y actualiza sus indicadores.
+    """
+
+    def __init__(self, tipo='tiempo', umbral=60):
+        """Constructor de la clase. 'tipo' y 'umbral' como en construir_barras."""
+        if tipo not in TIPOS_BARRA:
+            raise ValueError(f"Tipo de barra no válido: {tipo}. Opciones: {', '.join(TIPOS_BARRA)}")
+        self.tipo = tipo
+        self.umbral = umbral
+        self._abierta = pd.DataFrame({columna: np.empty(0) for columna in COLUMNAS_TRADES})
+        self._acumulado = 0.0  # Volumen o importe de las operaciones anteriores a la barra abierta
+
+    def anadir(self, trades):
+        """
+        Añade operaciones posteriores a las anteriores y devuelve las barras desde la que estaba abierta
+        (sustituida) hasta la nueva barra abierta, con las columnas de COLUMNAS.
+        """
+        trades = pd.concat([self._abierta, trades[COLUMNAS_TRADES]], ignore_index=True)
+        if trades.empty:
+            return pd.DataFrame(columns=COLUMNAS)
+        barras = construir_barras(trades, self.tipo, self.umbral, self._acumulado)
+        inicio = len(trades) - barras['count'].iloc[-1]
+        if self.tipo in ('volumen', 'dolares'):
+            self._acumulado += _cantidad(trades.iloc[:inicio], self.tipo).sum()
+        self._abierta = trades.iloc[inicio:].reset_index(drop=True)
+        return barras
+
+    def dataset(self, trades, precision='float64'):
+        """Devuelve un Dataset con las barras de las operaciones, que después se actualiza con append(anadir(...))."""
+        return Dataset(self.anadir(trades), precision)
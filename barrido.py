@@ -0,0 +1,91 @@
+# Importamos las librerías necesarias
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest import metricas, posiciones
+from Clase import media_varianza_movil, rsi_simple, senal_compra, senal_venta
+from compartido import FramesCompartidos, adjuntar
+
+# Métricas por las que se pueden ordenar las combinaciones (de mayor a mejor)
+METRICAS = ['senales', 'rentabilidad_total', 'sharpe', 'max_drawdown', 'tasa_acierto']
+
+
+def _evaluar_ventana_compartida(ruta, ventana, *argumentos):
+    """Evalúa una ventana en un proceso trabajador leyendo el cierre y el volumen del fichero compartido."""
+    datos = adjuntar(ruta)
+    return _evaluar_ventana(datos['close'].to_numpy(), datos['volume'].to_numpy(), ventana, *argumentos)
+
+
+def _evaluar_ventana(close, volumen, ventana, multiplicadores, ventanas_volumen, periodos_rsi,
+                     rsi_compra, rsi_venta, coste, periodos_por_anio, periodo_inicio=20):
+    """
+    Evalúa todas las combinaciones con una misma ventana de Bollinger.
+    Los indicadores se calculan como arrays 2-D (parámetros x tiempo) y las señales como un array
+    (multiplicador x ventana de volumen x periodo RSI x tiempo), sin recalcular un DataFrame por combinación.
+    """
+    serie_close = pd.Series(close)
+    serie_volumen = pd.Series(volumen)
+    n = len(close)
+
+    # Bandas: (multiplicadores x tiempo), con la desviación de la ventana que termina en i-1
+    sma = serie_close.rolling(window=ventana).mean().to_numpy()
+    desviacion = np.full(n, np.nan)
+    desviacion[1:] = np.sqrt(media_varianza_movil(close, ventana)[1][:-1])
+    multiplicadores = np.asarray(multiplicadores, dtype=float)[:, None]
+    banda_superior = (sma + multiplicadores * desviacion)[:, None, None, :]
+    banda_inferior = (sma - multiplicadores * desviacion)[:, None, None, :]
+
+    # SMA de volumen: (ventanas de volumen x tiempo); RSI: (periodos x tiempo)
+    volumen_sma = np.stack([serie_volumen.rolling(window=v).mean().to_numpy() for v in ventanas_volumen])[None, :, None, :]
+    rsi = np.stack([rsi_simple(serie_close, p) for p in periodos_rsi])[None, None, :, :]
+    close_anterior = np.concatenate([[np.nan], close[:-1]])
+
+    # Las reglas de Estrategia, para todas las combinaciones a la vez
+    compra = senal_compra(close, close_anterior, banda_inferior, volumen, volumen_sma, rsi, rsi_compra, periodo_inicio)
+    venta = senal_venta(close, close_anterior, banda_superior, volumen, volumen_sma, rsi, rsi_venta, periodo_inicio)
+
+    forma = (len(multiplicadores), len(ventanas_volumen), len(periodos_rsi), n)
+    compra = np.broadcast_to(compra, forma).reshape(-1, n)
+    venta = np.broadcast_to(venta, forma).reshape(-1, n)
+
+    tabla = pd.DataFrame(list(itertools.product(multiplicadores.ravel(), ventanas_volumen, periodos_rsi)),
+                         columns=['multiplicador', 'ventana_volumen', 'periodo_rsi'])
+    tabla.insert(0, 'ventana', ventana)
+    tabla['compras'] = compra.sum(axis=1)
+    tabla['ventas'] = venta.sum(axis=1)
+    tabla['senales'] = tabla['compras'] + tabla['ventas']
+    # Mismo backtest que Backtest.ejecutar (solo largos), con una fila por combinación
+    for clave, valores in metricas(close, posiciones(compra, venta), coste, periodos_por_anio).items():
+        tabla[clave] = valores
+    return tabla
+
+
+def barrido(df, ventanas=(20,), multiplicadores=(1.8,), ventanas_volumen=(20,), periodos_rsi=(14,),
+            rsi_compra=None, rsi_venta=None, metrica='senales', procesos=None,
+            comision=0.0026, deslizamiento=0.0, periodos_por_anio=24 * 365):
+    """
+    Evalúa todas las combinaciones de parámetros sobre un DataFrame con las columnas 'close' y 'volume'
+    y devuelve una tabla ordenada por 'metrica' (una de METRICAS).
+    Cada ventana de Bollinger se evalúa en un proceso distinto, que lee el cierre y el volumen de un
+    fichero en memoria compartida (sin copiarlos con pickle en cada tarea); dentro de cada proceso todas las
+    combinaciones se calculan a la vez. Sin rsi_compra ni rsi_venta el periodo del RSI no influye
+    en las señales, por lo que solo se evalúa el primero.
+    """
+    if metrica not in METRICAS:
+        raise ValueError(f"Métrica no válida: {metrica}. Opciones: {', '.join(METRICAS)}")
+    if rsi_compra is None and rsi_venta is None:
+        periodos_rsi = list(periodos_rsi)[:1]
+
+    datos = pd.DataFrame({'close': df['close'].to_numpy(dtype=float), 'volume': df['volume'].to_numpy(dtype=float)})
+    argumentos = (list(multiplicadores), list(ventanas_volumen), list(periodos_rsi),
+                  rsi_compra, rsi_venta, comision + deslizamiento, periodos_por_anio)
+
+    with FramesCompartidos() as compartidos, ProcessPoolExecutor(max_workers=procesos) as executor:
+        ruta = compartidos.publicar('barrido', datos)
+        tareas = [executor.submit(_evaluar_ventana_compartida, ruta, ventana, *argumentos) for ventana in ventanas]
+        tabla = pd.concat([tarea.result() for tarea in tareas], ignore_index=True)
+
+    return tabla.sort_values(metrica, ascending=False, na_position='last', ignore_index=True)
@@ -0,0 +1,159 @@
+# Importamos las librerías necesarias
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import matplotlib
+matplotlib.use('Agg')  # Renderizado sin ventana
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from Clase import Dataset, Estrategia, Grafico
+from kraken_cliente import ClienteKraken, ServidorReplay
+from plantillas import PlantillaGrafico
+
+
+def generar_ohlc(n, semilla=0, intervalo=60, inicio=1700000000):
+    """
+    Genera n velas sintéticas con el formato de filas de Kraken:
+    [timestamp, open, high, low, close, vwap, volume, count], con precios y volumen como texto.
+    Los precios siguen un paseo aleatorio geométrico, por lo que no hace falta acceso a Kraken.
+    """
+    rng = np.random.default_rng(semilla)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    apertura = np.concatenate([close[:1], close[:-1]])
+    high = np.maximum(apertura, close) * (1 + rng.random(n) * 0.005)
+    low = np.minimum(apertura, close) * (1 - rng.random(n) * 0.005)
+    vwap = (high + low + close) / 3
+    volumen = rng.lognormal(1, 1, n)
+    operaciones = rng.integers(1, 500, n).tolist()
+    timestamps = (inicio + np.arange(n, dtype=np.int64) * intervalo * 60).tolist()
+
+    # Kraken envía los precios y el volumen como cadenas de texto
+    columnas = [np.round(x, 1).astype(str) for x in (apertura, high, low, close, vwap)]
+    columnas.append(np.round(volumen, 8).astype(str))
+    return [list(fila) for fila in zip(timestamps, *columnas, operaciones)]
+
+
+def medir(funcion, repeticiones=1):
+    """
+    Ejecuta 'funcion' y devuelve (segundos, pico_bytes).
+    El tiempo es el mejor de 'repeticiones' ejecuciones sin tracemalloc; el pico de memoria
+    se mide en una ejecución aparte para que tracemalloc no altere los tiempos.
+    """
+    segundos = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        segundos = min(segundos, time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    try:
+        funcion()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return segundos, pico
+
+
+def _commit():
+    """Devuelve el commit actual del repositorio, o None si no se puede obtener."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(tamanos, repeticiones=1, max_filas_graficos=100000, dpi=100):
+    """
+    Mide la descarga de 720 velas desde un ServidorReplay local y cada etapa de la cadena
+    Dataset -> Estrategia -> Grafico para cada tamaño.
+    Los gráficos solo se miden hasta 'max_filas_graficos' filas. Devuelve una lista de resultados.
+    """
+    resultados = []
+
+    def registrar(etapa, n, funcion):
+        segundos, pico = medir(funcion, repeticiones)
+        resultados.append({'etapa': etapa, 'filas': n, 'segundos': segundos, 'pico_bytes': pico})
+        print(f"{etapa:<40} n={n:<9} {segundos:10.4f} s {pico / 2**20:10.1f} MiB")
+
+    # Descarga de velas con el cliente de Kraken contra respuestas servidas en local
+    filas = generar_ohlc(720)
+    respuestas = {'OHLC_XXBTZUSD_60': {'error': [], 'result': {'XXBTZUSD': filas, 'last': filas[-1][0]}}}
+    with ServidorReplay(respuestas=respuestas) as servidor:
+        cliente = ClienteKraken(llamadas_por_segundo=1000, uri=servidor.uri)
+        registrar('ClienteKraken.query_public(OHLC)', len(filas),
+                  lambda: cliente.query_public('OHLC', {'pair': 'XXBTZUSD', 'interval': 60}))
+        cliente.close()
+
+    for n in tamanos:
+        datos = generar_ohlc(n)
+        registrar('Dataset.__init__', n, lambda: Dataset(datos))
+
+        df = Dataset(datos)
+        del datos
+        # Invalidamos la caché de indicadores antes de cada ejecución para medir el cálculo completo
+        def sin_cache(metodo):
+            return lambda: (df.invalidar(), metodo())
+
+        for metodo in ['calculate_sma_20', 'calculate_volume_sma_20', 'calculate_bollinger_bands', 'calculate_RSI',
+                       'calculate_EMA', 'calculate_MACD', 'calculate_ATR', 'calculate_keltner_channels']:
+            registrar(f'Dataset.{metodo}', n, sin_cache(getattr(df, metodo)))
+        registrar('Dataset.get_metrics', n, sin_cache(df.get_metrics))
+
+        estrategia = Estrategia(df.data)
+        registrar('Estrategia.buy_signal', n, estrategia.buy_signal)
+        registrar('Estrategia.sell_signal', n, estrategia.sell_signal)
+
+        if n > max_filas_graficos:
+            continue
+        grafico = Grafico(df.data, 'BTC/USD')
+        for metodo in ['lineplot', 'lineplot_with_volume', 'candlestick', 'candlestick_with_volume']:
+            def renderizar():
+                plt.close(getattr(grafico, metodo)())
+
+            def guardar():
+                figura = getattr(grafico, metodo)()
+                figura.savefig(io.BytesIO(), format='png', dpi=dpi)
+                plt.close(figura)
+
+            registrar(f'Grafico.{metodo}', n, renderizar)
+            registrar(f'Grafico.{metodo}+savefig', n, guardar)
+
+            # Misma figura reutilizada: solo se sustituyen los datos
+            plantilla = PlantillaGrafico(metodo, df.data, 'BTC/USD')
+            registrar(f'PlantillaGrafico.{metodo}.actualizar', n, lambda: plantilla.actualizar(df.data, 'BTC/USD'))
+            plt.close(plantilla.figura)
+
+    return resultados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark sin conexión de Dataset, Estrategia y Grafico.")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[720, 100000, 5000000], help="Número de velas")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Ejecuciones por etapa (se guarda la mejor)")
+    parser.add_argument('--max-filas-graficos', type=int, default=100000, help="Tamaño máximo para medir gráficos")
+    parser.add_argument('--dpi', type=int, default=100, help="Resolución al guardar los gráficos")
+    parser.add_argument('--salida', default='resultados_benchmark.json', help="Fichero JSON con los resultados")
+    args = parser.parse_args()
+
+    resultados = ejecutar(args.tamanos, args.repeticiones, args.max_filas_graficos, args.dpi)
+    informe = {
+        'commit': _commit(),
+        'fecha': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'plataforma': platform.platform(),
+        'resultados': resultados,
+    }
+    with open(args.salida, 'w') as fichero:
+        json.dump(informe, fichero, indent=2)
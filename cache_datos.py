@@ -0,0 +1,178 @@
+# Importamos las librerías necesarias
+import itertools
+import threading
+import time
+
+import pandas as pd
+
+# Versiones de las vistas publicadas, únicas en todo el proceso: un par que sale de la caché y se vuelve
+# a cargar no repite una versión anterior (la versión forma parte de las claves de CacheFiguras)
+_versiones = itertools.count(1)
+
+
+def vista_solo_lectura(df):
+    """
+    Copia el DataFrame una sola vez en arrays de NumPy de solo lectura y devuelve un DataFrame sobre ellos.
+    Se puede compartir entre hilos sin copiarlo en cada lectura: cualquier intento de modificar
+    sus valores lanza ValueError.
+    """
+    columnas = {}
+    for columna in df.columns:
+        valores = df[columna].to_numpy(copy=True)
+        valores.flags.writeable = False
+        columnas[columna] = valores
+    return pd.DataFrame(columnas, copy=False)
+
+
+class _Entrada:
+    """Estado de un par en la caché: su Dataset privado y las vistas publicadas por temporalidad."""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.vistas = {}  # minutos -> DataFrame de solo lectura
+        self.version = 0
+        self.actualizado = time.monotonic()
+        self.usado = time.monotonic()
+        self.secuencia = 0  # Última secuencia de la ingesta por WebSocket aplicada
+        self.error = None
+        self.reintento = 0.0  # Momento a partir del cual se puede reintentar tras un error
+        self.lock = threading.Lock()
+
+
+### Clase CacheDatos
+class CacheDatos:
+    """
+    Caché de datos calculados (velas, indicadores y señales) por par, compartida por todos los hilos
+    del proceso (por ejemplo, todas las sesiones de Streamlit).
+
+    Solo la primera petición de un par espera a la descarga. Después, un hilo en segundo plano
+    actualiza cada 'ttl' segundos los pares usados recientemente y, si hay ingesta por WebSocket,
+    les añade las velas recibidas. Cada actualización publica vistas nuevas de solo lectura, por lo
+    que las lecturas devuelven siempre el mismo DataFrame sin copiarlo y sin esperar a Kraken.
+    """
+
+    def __init__(self, cargar, actualizar=None, ttl=300, inactividad=900, ultimas=None, ingesta=None, periodo=1.0):
+        """
+        Constructor de la clase.
+        - cargar: función pair -> Dataset con el histórico del par (velas de 1 hora).
+        - actualizar: función (pair, dataset) que añade al Dataset las velas nuevas; sin ella se vuelve
+          a llamar a 'cargar'.
+        - ttl: segundos entre actualizaciones de cada par.
+        - inactividad: segundos sin peticiones tras los que un par deja de actualizarse y sale de la caché.
+        - ultimas: velas que se publican de cada temporalidad (todas si es None).
+        - ingesta: IngestaOHLC opcional con las velas en directo.
+        - periodo: segundos entre revisiones del hilo de actualización.
+        """
+        self.cargar = cargar
+        self.actualizar = actualizar
+        self.ttl = ttl
+        self.inactividad = inactividad
+        self.ultimas = ultimas
+        self.ingesta = ingesta
+        self.periodo = periodo
+
+        self._entradas = {}
+        self._lock = threading.Lock()
+        self._cargas = {}  # pair -> lock de la primera carga (una sola descarga por par)
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        """Arranca el hilo de actualización en segundo plano y devuelve la propia caché."""
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        """Detiene el hilo de actualización."""
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join()
+
+    def obtener(self, pair, minutos=60):
+        """
+        Devuelve el DataFrame de solo lectura del par en la temporalidad indicada, con las métricas calculadas.
+        Solo se espera a Kraken la primera vez que se pide el par; 'attrs' del DataFrame contiene su
+        versión (cambia en cada actualización) y la fecha de la última vela.
+        """
+        entrada = self._entradas.get(pair)
+        if entrada is None:
+            entrada = self._primera_carga(pair)
+        entrada.usado = time.monotonic()
+
+        vista = entrada.vistas.get(minutos)
+        if vista is None:
+            # Primera petición de esta temporalidad: se calcula en local a partir del Dataset del par
+            with entrada.lock:
+                if minutos not in entrada.vistas:
+                    self._publicar(entrada, [minutos])
+                vista = entrada.vistas[minutos]
+        return vista
+
+    def _primera_carga(self, pair):
+        """Carga un par que no está en la caché; si otro hilo ya lo está cargando, espera a ese resultado."""
+        with self._lock:
+            lock = self._cargas.setdefault(pair, threading.Lock())
+        with lock:
+            entrada = self._entradas.get(pair)
+            if entrada is None:
+                entrada = _Entrada(self.cargar(pair))
+                self._publicar(entrada, [60])
+                self._entradas[pair] = entrada
+        return entrada
+
+    def _publicar(self, entrada, temporalidades):
+        """Calcula las métricas de cada temporalidad y publica vistas nuevas (con el lock de la entrada)."""
+        entrada.version = next(_versiones)
+        vistas = dict(entrada.vistas)
+        for minutos in temporalidades:
+            dataset = entrada.dataset if minutos == 60 else entrada.dataset.remuestrear(minutos)
+            dataset.get_metrics()
+            datos = dataset.data if self.ultimas is None else dataset.data.iloc[-self.ultimas:]
+            vista = vista_solo_lectura(datos)
+            vista.attrs = {'version': entrada.version, 'ultima_vela': datos['Date'].iloc[-1] if len(datos) else None}
+            vistas[minutos] = vista
+        # Sustituimos el diccionario completo: los lectores ven las vistas anteriores o las nuevas
+        entrada.vistas = vistas
+
+    def _refrescar(self, pair, entrada, ahora):
+        """Actualiza un par desde Kraken (si ha vencido su ttl) y con las velas de la ingesta."""
+        with entrada.lock:
+            dataset, version = entrada.dataset, entrada.dataset.version
+            if ahora - entrada.actualizado >= self.ttl and ahora >= entrada.reintento:
+                if self.actualizar is not None:
+                    self.actualizar(pair, entrada.dataset)
+                else:
+                    entrada.dataset = self.cargar(pair)
+                entrada.actualizado = ahora
+                entrada.error = None
+            if self.ingesta is not None:
+                velas, entrada.secuencia = self.ingesta.velas_desde(pair, entrada.secuencia)
+                if velas:
+                    entrada.dataset.append(velas)
+            # Solo se publican vistas nuevas si han cambiado los datos
+            if entrada.dataset is not dataset or entrada.dataset.version != version:
+                self._publicar(entrada, list(entrada.vistas))
+
+    def _bucle(self):
+        """Revisa periódicamente los pares de la caché y actualiza los que se usan."""
+        while not self._parar.wait(self.periodo):
+            ahora = time.monotonic()
+            for pair, entrada in list(self._entradas.items()):
+                if ahora - entrada.usado > self.inactividad:
+                    # Nadie lo ha pedido en un tiempo: deja de ocupar memoria
+                    self._entradas.pop(pair, None)
+                    continue
+                try:
+                    self._refrescar(pair, entrada, ahora)
+                except Exception as e:
+                    # Se siguen sirviendo los últimos datos y se reintenta al cabo de un rato
+                    entrada.error = str(e)
+                    entrada.reintento = ahora + min(self.ttl, 30)
+
+    def estado(self):
+        """Devuelve, para cada par en caché, la versión, la antigüedad en segundos y el último error."""
+        ahora = time.monotonic()
+        return {pair: {'version': entrada.version, 'antiguedad': ahora - entrada.actualizado,
+                       'temporalidades': sorted(entrada.vistas), 'error': entrada.error}
+                for pair, entrada in list(self._entradas.items())}
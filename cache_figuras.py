@@ -0,0 +1,126 @@
+# Importamos las librerías necesarias
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from instrumentacion import etapa
+
+
+def figura_a_bytes(figura, formato='png', dpi=100, **opciones):
+    """Dibuja la figura en memoria con el formato y la resolución indicados, la cierra y devuelve los bytes."""
+    buffer = io.BytesIO()
+    try:
+        with etapa(f'figura_a_bytes.{formato}'):
+            figura.savefig(buffer, format=formato, dpi=dpi, **opciones)
+    finally:
+        plt.close(figura)  # Cerramos la figura para evitar acumulación de memoria
+    return buffer.getvalue()
+
+
+def huella(df):
+    """
+    Devuelve un identificador del contenido del DataFrame (cambia si cambia cualquier valor).
+    Sirve como versión de los datos cuando no hay otra, por ejemplo entre ejecuciones de Main.py.
+    """
+    return hashlib.blake2b(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes(), digest_size=16).hexdigest()
+
+
+### Clase CacheFiguras
+class CacheFiguras:
+    """
+    Caché LRU de gráficos ya dibujados (bytes de la imagen), segura entre hilos y con un límite de memoria.
+    La clave debe identificar el par, el tipo de gráfico, la versión de los datos y el tamaño o la
+    resolución; una vista repetida es solo una copia de bytes. Con 'directorio', las imágenes se
+    guardan también en disco y se reutilizan entre ejecuciones.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20, directorio=None):
+        """
+        Constructor de la clase.
+        - max_bytes: tamaño máximo de las imágenes en memoria (y en disco, si se usa 'directorio').
+        - directorio: carpeta opcional donde se conservan las imágenes entre ejecuciones.
+        """
+        self.max_bytes = max_bytes
+        self.directorio = directorio
+        if directorio is not None:
+            os.makedirs(directorio, exist_ok=True)
+
+        self._imagenes = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave, generar):
+        """
+        Devuelve los bytes de la imagen de 'clave'. Si no están en la caché, llama a 'generar'
+        (una función sin argumentos que devuelve los bytes, por ejemplo con figura_a_bytes) y los guarda.
+        """
+        with self._lock:
+            imagen = self._imagenes.get(clave)
+            if imagen is not None:
+                self._imagenes.move_to_end(clave)
+                self.aciertos += 1
+                return imagen
+
+        ruta = self._ruta(clave)
+        if ruta is not None and os.path.exists(ruta):
+            with open(ruta, 'rb') as fichero:
+                imagen = fichero.read()
+            os.utime(ruta)  # Marca de uso para la limpieza del directorio
+            with self._lock:
+                self.aciertos += 1
+        else:
+            # El dibujo se hace fuera del lock para no bloquear a los demás hilos
+            imagen = generar()
+            with self._lock:
+                self.fallos += 1
+            if ruta is not None:
+                self._guardar(ruta, imagen)
+
+        self._anadir(clave, imagen)
+        return imagen
+
+    def _anadir(self, clave, imagen):
+        """Guarda la imagen en memoria y elimina las menos usadas hasta respetar el límite."""
+        with self._lock:
+            if clave in self._imagenes:
+                self._bytes -= len(self._imagenes.pop(clave))
+            if len(imagen) > self.max_bytes:
+                return
+            self._imagenes[clave] = imagen
+            self._bytes += len(imagen)
+            while self._bytes > self.max_bytes:
+                _, antigua = self._imagenes.popitem(last=False)
+                self._bytes -= len(antigua)
+
+    def _ruta(self, clave):
+        """Ruta del fichero de la clave en el directorio (None si la caché es solo en memoria)."""
+        if self.directorio is None:
+            return None
+        return os.path.join(self.directorio, hashlib.sha1(repr(clave).encode()).hexdigest() + '.bin')
+
+    def _guardar(self, ruta, imagen):
+        """Escribe la imagen en disco de forma atómica y borra las menos usadas si se supera el límite."""
+        temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as fichero:
+            fichero.write(imagen)
+        os.replace(temporal, ruta)
+
+        ficheros = [entrada for entrada in os.scandir(self.directorio) if entrada.name.endswith('.bin')]
+        total = sum(entrada.stat().st_size for entrada in ficheros)
+        for entrada in sorted(ficheros, key=lambda entrada: entrada.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            total -= entrada.stat().st_size
+            os.remove(entrada.path)
+
+    def memoria(self):
+        """Devuelve el número de imágenes y los bytes que ocupan en memoria."""
+        with self._lock:
+            return len(self._imagenes), self._bytes
@@ -0,0 +1,124 @@
+# Importamos las librerías necesarias
+import json
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Directorio de memoria compartida (tmpfs) donde se crean por defecto los ficheros; si no existe, el temporal
+DIRECTORIO_MEMORIA = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def publicar(df, ruta):
+    """
+    Escribe las columnas de 'df' en 'ruta' como un fichero Arrow IPC sin comprimir (de forma atómica),
+    para que otros procesos las lean mapeadas en memoria con adjuntar, sin copiarlas ni serializarlas
+    con pickle. Las columnas deben ser numéricas, booleanas o fechas; el índice no se guarda.
+    Los booleanos y las fechas se guardan como enteros del mismo tamaño (Arrow empaqueta los booleanos
+    en bits) y su tipo original queda en los metadatos. Devuelve la ruta.
+    """
+    arrays, tipos = [], {}
+    for columna in df.columns:
+        valores = df[columna].to_numpy()
+        if valores.dtype.kind not in 'biufM':
+            raise ValueError(f"No se puede compartir la columna '{columna}' de tipo {valores.dtype}")
+        tipos[str(columna)] = valores.dtype.str
+        if valores.dtype.kind in 'bM':
+            valores = valores.view(f'u{valores.dtype.itemsize}' if valores.dtype.kind == 'b' else 'i8')
+        arrays.append(pa.array(np.ascontiguousarray(valores)))
+
+    tabla = pa.table(arrays, names=[str(columna) for columna in df.columns],
+                     metadata={'tipos': json.dumps(tipos)})
+    temporal = f"{ruta}.{threading.get_ident()}.tmp"
+    with pa.OSFile(temporal, 'wb') as fichero, pa.ipc.new_file(fichero, tabla.schema) as escritor:
+        escritor.write_table(tabla, max_chunksize=max(len(df), 1))
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def adjuntar(ruta):
+    """
+    Devuelve un DataFrame de solo lectura cuyas columnas son vistas del fichero publicado en 'ruta',
+    mapeado en memoria: no se copia ni se lee nada hasta que se usan los valores, y todos los procesos
+    que lo adjuntan comparten las mismas páginas. Cualquier intento de modificar sus valores lanza ValueError.
+    El fichero se puede borrar mientras el DataFrame sigue en uso.
+    """
+    tabla = pa.ipc.open_file(pa.memory_map(ruta, 'r')).read_all()
+    tipos = json.loads(tabla.schema.metadata[b'tipos'])
+    columnas = {}
+    for nombre in tabla.column_names:
+        columna = tabla.column(nombre)
+        if columna.num_chunks:
+            valores = columna.chunk(0).to_numpy(zero_copy_only=True)
+        else:
+            valores = np.empty(0, dtype=columna.type.to_pandas_dtype())
+        valores = valores.view(np.dtype(tipos[nombre]))
+        valores.flags.writeable = False
+        columnas[nombre] = valores
+    return pd.DataFrame(columnas, copy=False)
+
+
+def _borrar(directorio):
+    """Borra el directorio de una FramesCompartidos (también al recolectarla o al salir del proceso)."""
+    shutil.rmtree(directorio, ignore_errors=True)
+
+
+### Clase FramesCompartidos
+class FramesCompartidos:
+    """
+    Conjunto de DataFrames publicados para otros procesos (trabajadores de exportación o de barrido,
+    otros procesos de Streamlit) en un directorio propio, en memoria compartida si el sistema la ofrece.
+    Cada publicación de una clave crea una versión nueva y borra la anterior: los procesos que ya la
+    tenían adjunta la siguen leyendo hasta que la sueltan. Al cerrar (o al terminar el proceso) se borra todo.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_MEMORIA):
+        """Constructor de la clase. 'directorio' es donde se crea la carpeta de los ficheros compartidos."""
+        self.directorio = tempfile.mkdtemp(prefix='kraken_frames_', dir=directorio)
+        self._rutas = {}
+        self._versiones = 0
+        self._lock = threading.Lock()
+        self._finalizador = weakref.finalize(self, _borrar, self.directorio)
+
+    def publicar(self, clave, df):
+        """Publica el DataFrame con la clave indicada y devuelve la ruta que hay que pasar a adjuntar."""
+        with self._lock:
+            self._versiones += 1
+            ruta = os.path.join(self.directorio, f"{self._versiones}.arrow")
+        publicar(df, ruta)
+        with self._lock:
+            anterior = self._rutas.get(clave)
+            self._rutas[clave] = ruta
+        if anterior is not None:
+            os.remove(anterior)
+        return ruta
+
+    def ruta(self, clave):
+        """Ruta de la última versión publicada de la clave (KeyError si no se ha publicado)."""
+        with self._lock:
+            return self._rutas[clave]
+
+    def retirar(self, clave):
+        """Deja de publicar la clave y borra su fichero."""
+        with self._lock:
+            ruta = self._rutas.pop(clave, None)
+        if ruta is not None:
+            os.remove(ruta)
+
+    def cerrar(self):
+        """Borra todos los ficheros publicados."""
+        with self._lock:
+            self._rutas.clear()
+        self._finalizador()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+        return False
@@ -0,0 +1,106 @@
+# Importamos las librerías necesarias
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from Clase import Dataset
+from kraken_cliente import ClienteKraken
+
+
+def descubrir_pares(k, cotizacion=None):
+    """
+    Devuelve los códigos de los pares activos en Kraken (endpoint AssetPairs).
+    Si se indica 'cotizacion' (p. ej. 'ZUSD'), solo se devuelven los pares cotizados en esa moneda.
+    """
+    data = k.query_public('AssetPairs')
+    if data.get('error'):
+        raise ValueError(f"Error de Kraken al obtener los pares: {', '.join(data['error'])}")
+
+    pares = []
+    for codigo, info in data['result'].items():
+        # Los pares '.d' son los del libro oscuro y no tienen velas propias
+        if codigo.endswith('.d') or info.get('status', 'online') != 'online':
+            continue
+        if cotizacion is not None and info.get('quote') != cotizacion:
+            continue
+        pares.append(codigo)
+    return sorted(pares)
+
+
+### Clase Escaner
+class Escaner:
+    """
+    Analiza muchos pares de Kraken en paralelo sin interacción del usuario.
+    Descarga las velas de cada par con un grupo acotado de hilos que respeta el límite de llamadas,
+    calcula las métricas con Dataset.get_metrics y devuelve una tabla ordenada con las señales actuales.
+    """
+
+    def __init__(self, clave=None, workers=8, llamadas_por_segundo=1.0, interval=60, ventana_senal=1, cliente=None):
+        """
+        Constructor de la clase.
+        - workers: número máximo de descargas simultáneas.
+        - llamadas_por_segundo: ritmo máximo de llamadas a la API entre todos los hilos.
+        - ventana_senal: número de velas finales en las que se buscan señales.
+        - cliente: ClienteKraken a usar; por defecto se crea uno con una conexión por hilo.
+        """
+        self.workers = workers
+        self.cliente = cliente or ClienteKraken(clave, llamadas_por_segundo=llamadas_por_segundo, conexiones=workers)
+        self.interval = interval
+        self.ventana_senal = ventana_senal
+
+    def analizar(self, pair):
+        """Descarga las velas de un par, calcula sus métricas y resume el estado de la última vela."""
+        data = self.cliente.query_public('OHLC', {'pair': pair, 'interval': self.interval})
+        if data.get('error'):
+            raise ValueError(', '.join(data['error']))
+        filas = next(valor for clave, valor in data['result'].items() if clave != 'last')
+
+        df = Dataset(filas)
+        # Solo los indicadores del resumen (las señales añaden sus dependencias)
+        df.get_metrics(indicadores=['rsi', 'SMA', 'Banda_Superior', 'Buy_Signal', 'Sell_Signal'])
+        ultima = df.data.iloc[-1]
+        recientes = df.data.iloc[-self.ventana_senal:]
+
+        # Posición del cierre entre las bandas: -1 en la banda inferior, 1 en la superior
+        ancho = ultima['Banda_Superior'] - ultima['SMA']
+        posicion = (ultima['close'] - ultima['SMA']) / ancho if ancho > 0 else np.nan
+
+        return {
+            'pair': pair,
+            'Date': ultima['Date'],
+            'close': ultima['close'],
+            'rsi': ultima['rsi'],
+            'posicion_bandas': posicion,
+            'Buy_Signal': bool(recientes['Buy_Signal'].any()),
+            'Sell_Signal': bool(recientes['Sell_Signal'].any()),
+        }
+
+    def escanear(self, pares):
+        """
+        Analiza todos los pares en paralelo y devuelve un DataFrame ordenado:
+        primero los pares con señal y, dentro de cada grupo, los más alejados de la SMA.
+        Los pares que fallan aparecen al final con el mensaje de error.
+        """
+        def tarea(pair):
+            try:
+                return self.analizar(pair)
+            except Exception as e:
+                return {'pair': pair, 'error': str(e)}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            resultados = list(executor.map(tarea, pares))
+
+        tabla = pd.DataFrame(resultados)
+        for columna in ['Buy_Signal', 'Sell_Signal']:
+            if columna not in tabla.columns:
+                tabla[columna] = False
+            # Los pares con error no tienen señal (NaN); eq evita rellenar una columna de objetos con fillna
+            tabla[columna] = tabla[columna].eq(True)
+        if 'posicion_bandas' not in tabla.columns:
+            tabla['posicion_bandas'] = np.nan
+
+        tabla['Senal'] = np.select([tabla['Buy_Signal'], tabla['Sell_Signal']], ['Compra', 'Venta'], default='')
+        tabla['_orden'] = tabla['posicion_bandas'].abs()
+        tabla = tabla.sort_values(['Senal', '_orden'], ascending=[False, False], na_position='last')
+        return tabla.drop(columns='_orden').reset_index(drop=True)
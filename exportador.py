@@ -0,0 +1,86 @@
+# Importamos las librerías necesarias
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+from compartido import FramesCompartidos, adjuntar
+
+# Tipos de gráfico: sufijo del fichero -> método de Grafico
+TIPOS = {
+    'Lineplot': 'lineplot',
+    'Lineplot_Volumen': 'lineplot_with_volume',
+    'Candlestick': 'candlestick',
+    'Candlestick_Volumen': 'candlestick_with_volume',
+}
+
+# DataFrames ya leídos por el proceso trabajador, por ruta del fichero compartido
+_frames = {}
+
+# Figuras del proceso trabajador, construidas una vez por tipo de gráfico y reutilizadas para cada par
+_plantillas = None
+
+
+def _iniciar_trabajador():
+    """Prepara cada proceso trabajador: backend sin ventana para renderizar en segundo plano."""
+    matplotlib.use('Agg')
+
+
+def _renderizar(ruta_datos, pair, tipo, ruta_salida, formato, dpi):
+    """Renderiza y guarda un gráfico en un proceso trabajador. Devuelve la ruta del fichero."""
+    global _plantillas
+    from plantillas import Plantillas
+
+    # El DataFrame se adjunta una sola vez por proceso: sus columnas son vistas del fichero compartido
+    if ruta_datos not in _frames:
+        _frames[ruta_datos] = adjuntar(ruta_datos)
+
+    # Solo el primer gráfico de cada tipo construye la figura; los demás sustituyen sus datos
+    if _plantillas is None:
+        _plantillas = Plantillas()
+    figura = _plantillas.figura(TIPOS[tipo], _frames[ruta_datos], pair)
+    figura.savefig(ruta_salida, dpi=dpi, format=formato)
+    return ruta_salida
+
+
+### Clase ExportadorGraficos
+class ExportadorGraficos:
+    """
+    Exporta los gráficos de varios pares repartiendo cada combinación (par, tipo de gráfico)
+    entre un grupo de procesos, de modo que la exportación escala con el número de núcleos.
+    Los DataFrames se publican una vez en ficheros Arrow en memoria compartida (FramesCompartidos) que
+    los procesos adjuntan sin copiarlos, en lugar de serializarlos con pickle en cada tarea.
+    """
+
+    def __init__(self, workers=None, directorio='.', formato='png', dpi=300):
+        """
+        Constructor de la clase.
+        - workers: número de procesos (por defecto, uno por núcleo).
+        - directorio, formato, dpi: destino y formato de los ficheros generados.
+        """
+        self.workers = workers
+        self.directorio = directorio
+        self.formato = formato
+        self.dpi = dpi
+
+    def exportar(self, datos, tipos=None):
+        """
+        Exporta los gráficos indicados (por defecto, los cuatro tipos) de cada par.
+        Recibe un diccionario par -> DataFrame con las métricas calculadas y devuelve las rutas generadas.
+        """
+        tipos = list(TIPOS) if tipos is None else tipos
+        os.makedirs(self.directorio, exist_ok=True)
+
+        with FramesCompartidos() as compartidos:
+            # Cada DataFrame se publica una sola vez para todos los procesos
+            rutas_datos = {pair: compartidos.publicar(pair, df) for pair, df in datos.items()}
+
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_iniciar_trabajador) as executor:
+                tareas = []
+                for pair in datos:
+                    prefijo = pair.replace('/', '')
+                    for tipo in tipos:
+                        ruta_salida = os.path.join(self.directorio, f"{prefijo}_{tipo}.{self.formato}")
+                        tareas.append(executor.submit(_renderizar, rutas_datos[pair], pair, tipo,
+                                                      ruta_salida, self.formato, self.dpi))
+                return [tarea.result() for tarea in tareas]
@@ -0,0 +1,142 @@
+# Importamos las librerías necesarias
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+
+def indices_minmax(valores, max_puntos):
+    """
+    Devuelve los índices de las filas a conservar para dibujar una serie con como mucho 'max_puntos' puntos.
+    La serie se divide en max_puntos / 2 tramos y de cada tramo se conservan el mínimo y el máximo,
+    de modo que los picos siguen visibles tras la reducción.
+    """
+    valores = np.asarray(valores, dtype=float)
+    n = len(valores)
+    if n <= max_puntos:
+        return np.arange(n)
+
+    tramos = max(max_puntos // 2, 1)
+    tamano = -(-n // tramos)
+    relleno = np.full(tramos * tamano, np.nan)
+    relleno[:n] = valores
+    # Los NaN se sustituyen por +-inf para que no se elijan como mínimo o máximo
+    bloques = relleno.reshape(tramos, tamano)
+    desplazamiento = np.arange(tramos) * tamano
+    minimos = np.argmin(np.where(np.isnan(bloques), np.inf, bloques), axis=1) + desplazamiento
+    maximos = np.argmax(np.where(np.isnan(bloques), -np.inf, bloques), axis=1) + desplazamiento
+    indices = np.unique(np.concatenate([minimos, maximos]))
+    return indices[indices < n]
+
+
+def agregar_velas(df, max_puntos):
+    """
+    Agrupa filas consecutivas para que el DataFrame tenga como mucho 'max_puntos' velas:
+    apertura de la primera fila, máximo, mínimo, cierre de la última, volumen sumado
+    e indicadores de la última fila de cada grupo.
+    """
+    n = len(df)
+    if n <= max_puntos:
+        return df
+
+    tamano = -(-n // max_puntos)
+    grupos = df.groupby(np.arange(n) // tamano)
+    agregados = {'Date': 'first', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+    for columna in ['SMA', 'Banda_Superior', 'Banda_Inferior', 'Volume_SMA']:
+        agregados[columna] = 'last'
+    return grupos.agg(agregados).reset_index(drop=True)
+
+
+### Clase GraficoPlotly
+class GraficoPlotly:
+    """
+    Versión interactiva de la clase Grafico con Plotly y trazas WebGL.
+    Ofrece los mismos cuatro gráficos y reduce en el servidor los históricos largos
+    para que el navegador reciba como mucho 'max_puntos' puntos por serie.
+    """
+
+    def __init__(self, df, pair, max_puntos=2000):
+        """Constructor de la clase. Recibe un DataFrame con los datos financieros y las métricas."""
+        self.df = df
+        self.pair = pair
+        self.max_puntos = max_puntos
+
+    def _lineas(self, fig, fila=None):
+        """Añade el precio de cierre, la SMA, las Bandas de Bollinger y las señales."""
+        subplot = {} if fila is None else {'row': fila, 'col': 1}
+        df = self.df.iloc[indices_minmax(self.df['close'], self.max_puntos)]
+
+        fig.add_trace(go.Scattergl(x=df.Date, y=df.close, name='Precio de cierre', line=dict(color='#82CAFA')), **subplot)
+        self._indicadores(fig, df, subplot)
+        self._senales(fig, subplot)
+
+    def _velas(self, fig, fila=None):
+        """Añade las velas (agregadas si hay demasiadas), la SMA, las Bandas de Bollinger y las señales."""
+        subplot = {} if fila is None else {'row': fila, 'col': 1}
+        df = agregar_velas(self.df, self.max_puntos)
+
+        fig.add_trace(go.Candlestick(x=df.Date, open=df.open, high=df.high, low=df.low, close=df.close, name='Velas',
+                                     increasing_line_color='#00FF7F', decreasing_line_color='#FF6347'), **subplot)
+        self._indicadores(fig, df, subplot)
+        self._senales(fig, subplot)
+
+    @staticmethod
+    def _indicadores(fig, df, subplot):
+        """Añade la SMA y las Bandas de Bollinger."""
+        fig.add_trace(go.Scattergl(x=df.Date, y=df.SMA, name='SMA', line=dict(color='#FF6F61', width=2)), **subplot)
+        fig.add_trace(go.Scattergl(x=df.Date, y=df.Banda_Superior, name='Bandas de Bollinger superior e inferior',
+                                   line=dict(color='#FFD700', width=2), legendgroup='bandas'), **subplot)
+        fig.add_trace(go.Scattergl(x=df.Date, y=df.Banda_Inferior, showlegend=False,
+                                   line=dict(color='#FFD700', width=2), legendgroup='bandas'), **subplot)
+
+    def _senales(self, fig, subplot):
+        """Añade las señales de compra y venta, como mucho una por grupo de velas si hay demasiadas."""
+        n = len(self.df)
+        tamano = max(-(-n // self.max_puntos), 1)
+        for columna, nombre, color in [('Buy_Signal', 'Compra', '#00FF7F'), ('Sell_Signal', 'Venta', '#FF6347')]:
+            filas = np.flatnonzero(self.df[columna].to_numpy() == 1)
+            # Primera señal de cada grupo de 'tamano' velas
+            filas = filas[np.unique(filas // tamano, return_index=True)[1]]
+            senales = self.df.iloc[filas]
+            fig.add_trace(go.Scattergl(x=senales.Date, y=senales.close, mode='markers', name=nombre,
+                                       marker=dict(color=color, size=10)), **subplot)
+
+    def _volumen(self, fig):
+        """Añade el volumen (sumado por grupos si hay demasiadas velas) y su SMA en el segundo subplot."""
+        df = agregar_velas(self.df, self.max_puntos)
+        fig.add_trace(go.Bar(x=df.Date, y=df.volume, name='Volumen', marker_color='#6495ED'), row=2, col=1)
+        fig.add_trace(go.Scattergl(x=df.Date, y=df.Volume_SMA, name='SMA de volumen',
+                                   line=dict(color='red', width=2)), row=2, col=1)
+
+    def _estilo(self, fig, titulo):
+        """Aplica el modo oscuro de los gráficos de la aplicación."""
+        fig.update_layout(title=titulo, template='plotly_dark', plot_bgcolor='#2E2E2E', height=700,
+                          xaxis_rangeslider_visible=False)
+        fig.update_xaxes(gridcolor='grey')
+        fig.update_yaxes(gridcolor='grey')
+        return fig
+
+    def lineplot(self):
+        """Gráfico de líneas con precio de cierre, SMA, Bandas de Bollinger y señales."""
+        fig = go.Figure()
+        self._lineas(fig)
+        return self._estilo(fig, f'Evolución del precio de {self.pair} en Kraken')
+
+    def lineplot_with_volume(self):
+        """Gráfico de líneas con un segundo subplot de volumen."""
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, subplot_titles=('', 'Volumen de operaciones'))
+        self._lineas(fig, fila=1)
+        self._volumen(fig)
+        return self._estilo(fig, f'Evolución del precio y volumen de {self.pair} en Kraken')
+
+    def candlestick(self):
+        """Gráfico de velas con SMA, Bandas de Bollinger y señales."""
+        fig = go.Figure()
+        self._velas(fig)
+        return self._estilo(fig, f'Evolución del precio de {self.pair} en Kraken')
+
+    def candlestick_with_volume(self):
+        """Gráfico de velas con un segundo subplot de volumen."""
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, subplot_titles=('', 'Volumen de operaciones'))
+        self._velas(fig, fila=1)
+        self._volumen(fig)
+        return self._estilo(fig, f'Evolución del precio de {self.pair} en Kraken')
@@ -0,0 +1,100 @@
+# Importamos las librerías necesarias
+import contextlib
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from Clase import COLUMNAS, Dataset
+from instrumentacion import etapa
+
+# Columnas de los CSV históricos de Kraken (OHLCVT): sin cabecera, sin vwap y con el número de operaciones
+COLUMNAS_OHLCVT = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'count']
+
+
+def leer_ohlcvt(ruta, miembro=None, filas_por_bloque=1_000_000):
+    """
+    Lee un CSV histórico OHLCVT de Kraken por bloques de 'filas_por_bloque' velas y devuelve un iterador
+    de DataFrames con las columnas de COLUMNAS (el formato de Dataset). Con 'miembro', 'ruta' es el
+    ZIP descargado de Kraken y se lee el CSV de ese nombre sin descomprimirlo en disco.
+    Los CSV no incluyen el vwap: se deja a NaN.
+    """
+    tipos = {columna: 'float64' for columna in COLUMNAS_OHLCVT[1:6]}
+    tipos.update(timestamp='int64', count='int64')
+    with contextlib.ExitStack() as pila:
+        fichero = ruta
+        if miembro is not None:
+            # Se cierran tanto el CSV como el ZIP (y su descriptor de fichero) al terminar o abandonar la lectura
+            fichero = pila.enter_context(pila.enter_context(zipfile.ZipFile(ruta)).open(miembro))
+        for bloque in pd.read_csv(fichero, header=None, names=COLUMNAS_OHLCVT, dtype=tipos, chunksize=filas_por_bloque):
+            bloque['vwap'] = np.nan
+            yield bloque[COLUMNAS].reset_index(drop=True)
+
+
+### Clase ProcesadorHistorico
+class ProcesadorHistorico:
+    """
+    Calcula indicadores y señales de Dataset sobre históricos que no caben en memoria (años de velas
+    de 1 minuto) procesándolos por bloques. Un único Dataset guarda solo el bloque actual y las
+    velas de contexto del anterior: cada bloque se añade con append, que calcula los indicadores de las
+    filas nuevas con ese contexto (y los recursivos desde su último valor), y después se recorta.
+    El resultado es el mismo que con todo el histórico en un Dataset, con memoria acotada por el bloque.
+    """
+
+    def __init__(self, calcular=None, precision='float64'):
+        """
+        Constructor de la clase.
+        - calcular: función que recibe el Dataset del primer bloque y añade las columnas deseadas
+          (por defecto, get_metrics: SMA, bandas, RSI, SMA de volumen y señales). Los bloques siguientes
+          actualizan las mismas columnas con los mismos parámetros.
+        - precision: precisión de los precios y el volumen del Dataset.
+        """
+        self.calcular = calcular or (lambda dataset: dataset.get_metrics())
+        self.precision = precision
+
+    def resultados(self, bloques):
+        """
+        Procesa un iterador de bloques de velas consecutivas (listas de Kraken o DataFrames con las
+        columnas de COLUMNAS, por ejemplo de leer_ohlcvt) y devuelve un iterador con un DataFrame por
+        bloque: sus velas con las columnas de indicadores y señales.
+        """
+        dataset = None
+        for bloque in bloques:
+            with etapa('ProcesadorHistorico.bloque', filas=len(bloque)):
+                if dataset is None:
+                    dataset = Dataset(bloque, self.precision)
+                    self.calcular(dataset)
+                else:
+                    dataset.append(bloque)
+                resultado = dataset.data.iloc[len(dataset.data) - len(bloque):].reset_index(drop=True)
+                # Solo se conservan las velas de contexto para el siguiente bloque
+                dataset.recortar(len(dataset.data) - dataset.filas_contexto())
+            yield resultado
+
+    def procesar(self, bloques, salida):
+        """
+        Procesa los bloques y escribe cada resultado en 'salida' en cuanto está calculado, en Parquet
+        (extensión .parquet) o CSV. Devuelve el número de velas escritas.
+        """
+        temporal = salida + '.tmp'
+        escritor = None
+        filas = 0
+        try:
+            for resultado in self.resultados(bloques):
+                if salida.endswith('.parquet'):
+                    tabla = pa.Table.from_pandas(resultado, preserve_index=False)
+                    if escritor is None:
+                        escritor = pq.ParquetWriter(temporal, tabla.schema)
+                    escritor.write_table(tabla)
+                else:
+                    resultado.to_csv(temporal, mode='w' if filas == 0 else 'a', header=filas == 0, index=False)
+                filas += len(resultado)
+        finally:
+            if escritor is not None:
+                escritor.close()
+        # El fichero solo aparece con su nombre definitivo cuando está completo
+        os.replace(temporal, salida)
+        return filas
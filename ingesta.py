@@ -0,0 +1,274 @@
+# Importamos las librerías necesarias
+import asyncio
+import json
+import random
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import tornado.httpserver
+import tornado.netutil
+import tornado.web
+import tornado.websocket
+import websocket
+
+# API WebSocket v2 de Kraken (los pares se identifican como 'BTC/USD')
+URI_KRAKEN_WS = 'wss://ws.kraken.com/v2'
+
+
+def fila_desde_vela(vela):
+    """Convierte una vela del canal 'ohlc' de la API WebSocket v2 en una fila con el formato de COLUMNAS."""
+    inicio = int(pd.Timestamp(vela['interval_begin']).timestamp())
+    return [inicio, vela['open'], vela['high'], vela['low'], vela['close'], vela['vwap'], vela['volume'], vela['trades']]
+
+
+def vela_desde_fila(fila, symbol, interval=60):
+    """Convierte una fila con el formato de COLUMNAS en una vela del canal 'ohlc' (para el servidor local)."""
+    inicio = pd.Timestamp(int(fila[0]), unit='s', tz='UTC')
+    return {
+        'symbol': symbol, 'open': float(fila[1]), 'high': float(fila[2]), 'low': float(fila[3]),
+        'close': float(fila[4]), 'vwap': float(fila[5]), 'volume': float(fila[6]), 'trades': int(fila[7]),
+        'interval_begin': inicio.isoformat().replace('+00:00', 'Z'), 'interval': interval,
+        'timestamp': pd.Timestamp.now(tz='UTC').isoformat().replace('+00:00', 'Z'),
+    }
+
+
+### Clase IngestaOHLC
+class IngestaOHLC:
+    """
+    Recibe en segundo plano las velas del canal 'ohlc' de la API WebSocket de Kraken para varios pares.
+    Guarda la última versión de las velas más recientes de cada par con un número de secuencia, de modo
+    que cada consumidor (por ejemplo, cada sesión de Streamlit) pide solo lo que ha cambiado desde su
+    última lectura y lo añade a su Dataset con append. Si se pierde la conexión, vuelve a conectarse
+    con esperas exponenciales aleatorizadas y repite la suscripción.
+    """
+
+    def __init__(self, pares, interval=60, uri=URI_KRAKEN_WS, espera_base=1.0, espera_maxima=30.0, historico=50):
+        """
+        Constructor de la clase.
+        - pares: nombres de los pares en la API WebSocket ('BTC/USD', 'ETH/BTC'...).
+        - interval: minutos por vela.
+        - espera_base, espera_maxima: la espera antes de la reconexión n es aleatoria entre 0 y
+          min(espera_maxima, espera_base * 2**n) segundos.
+        - historico: velas recientes que se conservan por par.
+        """
+        self.pares = list(pares)
+        self.interval = interval
+        self.uri = uri
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.historico = historico
+
+        self.lock = threading.Lock()
+        self.secuencia = 0
+        self._velas = {pair: {} for pair in self.pares}  # pair -> inicio de la vela -> (secuencia, fila)
+        self.conectado = threading.Event()
+        self._parar = threading.Event()
+        self._ws = None
+        self._hilo = None
+        self._intento = 0
+
+        # Métricas
+        self.reconexiones = 0
+        self.mensajes = 0
+        self.latencias = deque(maxlen=1000)
+
+    def iniciar(self):
+        """Arranca la conexión en un hilo en segundo plano y devuelve la propia ingesta."""
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        """Cierra la conexión y espera a que termine el hilo."""
+        self._parar.set()
+        if self._ws is not None:
+            self._ws.close()
+        if self._hilo is not None:
+            self._hilo.join()
+
+    def _bucle(self):
+        """Mantiene la conexión abierta, reconectando tras cada desconexión hasta que se llama a detener."""
+        while not self._parar.is_set():
+            self._ws = websocket.WebSocketApp(self.uri, on_open=self._al_abrir, on_message=self._al_recibir)
+            self._ws.run_forever(ping_interval=20, ping_timeout=10)
+            self.conectado.clear()
+            if self._parar.is_set():
+                break
+
+            # Espera exponencial aleatorizada (se reinicia tras cada conexión correcta)
+            self.reconexiones += 1
+            espera = random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** self._intento))
+            self._intento += 1
+            self._parar.wait(espera)
+
+    def _al_abrir(self, ws):
+        """Se suscribe al canal 'ohlc' de todos los pares en cada conexión (también tras reconectar)."""
+        self._intento = 0
+        ws.send(json.dumps({'method': 'subscribe', 'params': {
+            'channel': 'ohlc', 'symbol': self.pares, 'interval': self.interval, 'snapshot': True}}))
+        self.conectado.set()
+
+    def _al_recibir(self, ws, mensaje):
+        """Guarda las velas de los mensajes 'snapshot' y 'update' del canal 'ohlc'."""
+        datos = json.loads(mensaje)
+        if datos.get('channel') != 'ohlc' or datos.get('type') not in ('snapshot', 'update'):
+            return
+        ahora = pd.Timestamp.now(tz='UTC')
+        with self.lock:
+            self.mensajes += 1
+            for vela in datos.get('data', []):
+                velas = self._velas.get(vela.get('symbol'))
+                if velas is None:
+                    continue
+                fila = fila_desde_vela(vela)
+                self.secuencia += 1
+                velas[fila[0]] = (self.secuencia, fila)
+                if 'timestamp' in vela:
+                    # Tiempo desde la última operación de la vela en Kraken hasta su recepción
+                    self.latencias.append((ahora - pd.Timestamp(vela['timestamp'])).total_seconds())
+
+                # Solo conservamos las velas más recientes
+                if len(velas) > self.historico:
+                    for inicio in sorted(velas)[:len(velas) - self.historico]:
+                        del velas[inicio]
+
+    def velas_desde(self, pair, secuencia=0):
+        """
+        Devuelve (filas, secuencia): las velas del par desde la primera que ha cambiado después de
+        'secuencia', ordenadas por fecha y listas para Dataset.append, y la secuencia actual para
+        la siguiente llamada. Si no ha cambiado nada, la lista está vacía.
+        """
+        with self.lock:
+            velas = self._velas.get(pair, {})
+            cambiadas = [inicio for inicio, (numero, _) in velas.items() if numero > secuencia]
+            if not cambiadas:
+                return [], self.secuencia
+            desde = min(cambiadas)
+            filas = [fila for inicio, (_, fila) in sorted(velas.items()) if inicio >= desde]
+            return filas, self.secuencia
+
+    def metricas(self):
+        """Devuelve el número de mensajes y reconexiones y la latencia desde Kraken en segundos."""
+        with self.lock:
+            latencias = np.array(self.latencias)
+            resumen = {'conectado': self.conectado.is_set(), 'mensajes': self.mensajes,
+                       'reconexiones': self.reconexiones}
+        if len(latencias):
+            resumen.update({'latencia_media': float(latencias.mean()),
+                            'latencia_p95': float(np.percentile(latencias, 95))})
+        return resumen
+
+
+### Clase ServidorWebSocket
+class ServidorWebSocket:
+    """
+    Servidor WebSocket local que imita el canal 'ohlc' de la API v2 de Kraken, para probar la ingesta
+    sin conexión. Responde a las suscripciones con las velas iniciales de cada par, publica las velas
+    que se le pasan con publicar y puede cortar todas las conexiones para probar la reconexión.
+    """
+
+    def __init__(self, velas=None, puerto=0):
+        """
+        Constructor de la clase.
+        - velas: diccionario par -> lista de velas del canal 'ohlc' (ver vela_desde_fila) para el snapshot.
+        - puerto: puerto local (0 = uno libre cualquiera).
+        """
+        self.velas = {pair: list(lista) for pair, lista in (velas or {}).items()}
+        self.puerto = puerto
+        self.clientes = {}  # conexión -> pares suscritos
+        self.suscripciones = 0
+        self._loop = None
+        self._hilo = None
+        self._listo = threading.Event()
+
+    @property
+    def uri(self):
+        """Dirección del servidor, para IngestaOHLC(uri=...)."""
+        return f"ws://127.0.0.1:{self.puerto}/v2"
+
+    def iniciar(self):
+        """Arranca el servidor en un hilo con su propio bucle de eventos y devuelve su dirección."""
+        self._hilo = threading.Thread(target=self._ejecutar, daemon=True)
+        self._hilo.start()
+        self._listo.wait()
+        return self.uri
+
+    def _ejecutar(self):
+        """Bucle de eventos del servidor (en el hilo en segundo plano)."""
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        # Sin una línea de registro por conexión en la consola
+        aplicacion = tornado.web.Application([(r'/v2', _ManejadorWebSocket, {'servidor': self})],
+                                             log_function=lambda manejador: None)
+        sockets = tornado.netutil.bind_sockets(self.puerto, '127.0.0.1')
+        self.puerto = sockets[0].getsockname()[1]
+        self._http = tornado.httpserver.HTTPServer(aplicacion)
+        self._http.add_sockets(sockets)
+        self._listo.set()
+        self._loop.run_forever()
+
+    def publicar(self, vela):
+        """Envía una vela (actualización) a los clientes suscritos a su par y la guarda para nuevos snapshots."""
+        self._loop.call_soon_threadsafe(self._publicar, vela)
+
+    def _publicar(self, vela):
+        lista = self.velas.setdefault(vela['symbol'], [])
+        if lista and lista[-1]['interval_begin'] == vela['interval_begin']:
+            lista[-1] = vela
+        else:
+            lista.append(vela)
+        mensaje = json.dumps({'channel': 'ohlc', 'type': 'update', 'data': [vela]})
+        for cliente, pares in list(self.clientes.items()):
+            if vela['symbol'] in pares:
+                cliente.write_message(mensaje)
+
+    def desconectar(self):
+        """Cierra todas las conexiones abiertas (los clientes deben reconectarse y volver a suscribirse)."""
+        self._loop.call_soon_threadsafe(lambda: [cliente.close() for cliente in list(self.clientes)])
+
+    def detener(self):
+        """Detiene el servidor y su bucle de eventos."""
+        def parar():
+            self._http.stop()
+            for cliente in list(self.clientes):
+                cliente.close()
+            self._loop.stop()
+        self._loop.call_soon_threadsafe(parar)
+        self._hilo.join()
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.detener()
+
+
+class _ManejadorWebSocket(tornado.websocket.WebSocketHandler):
+    """Atiende una conexión del ServidorWebSocket."""
+
+    def initialize(self, servidor):
+        self.servidor = servidor
+
+    def open(self):
+        self.servidor.clientes[self] = set()
+
+    def on_message(self, mensaje):
+        peticion = json.loads(mensaje)
+        if peticion.get('method') != 'subscribe':
+            return
+        parametros = peticion.get('params', {})
+        pares = parametros.get('symbol', [])
+        self.servidor.clientes[self].update(pares)
+        self.servidor.suscripciones += 1
+        for pair in pares:
+            self.write_message(json.dumps({'method': 'subscribe', 'success': True, 'result': {
+                'channel': 'ohlc', 'symbol': pair, 'interval': parametros.get('interval')}}))
+            if parametros.get('snapshot', True):
+                self.write_message(json.dumps({'channel': 'ohlc', 'type': 'snapshot',
+                                               'data': self.servidor.velas.get(pair, [])}))
+
+    def on_close(self):
+        self.servidor.clientes.pop(self, None)
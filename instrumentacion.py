@@ -0,0 +1,191 @@
+# Importamos las librerías necesarias
+import functools
+import json
+import threading
+import time
+import tracemalloc
+
+
+class _EtapaNula:
+    """Contexto sin efecto que se devuelve cuando la instrumentación está desactivada."""
+
+    filas = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+
+_ETAPA_NULA = _EtapaNula()
+
+
+class _Etapa:
+    """Medición de una ejecución de una etapa (ver Instrumentacion.etapa)."""
+
+    def __init__(self, instrumentacion, nombre, filas):
+        self.instrumentacion = instrumentacion
+        self.nombre = nombre
+        self.filas = filas  # Se puede asignar dentro del bloque, cuando se conoce
+
+    def __enter__(self):
+        self.memoria = self.instrumentacion.memoria and tracemalloc.is_tracing()
+        if self.memoria:
+            # tracemalloc guarda un único pico por proceso: antes de reiniciarlo para esta etapa
+            # pasamos el pico actual a la etapa que la contiene
+            pilas = self.instrumentacion._pilas
+            pila = pilas.__dict__.setdefault('pila', [])
+            actual, pico = tracemalloc.get_traced_memory()
+            if pila:
+                pila[-1][1] = max(pila[-1][1], pico)
+            tracemalloc.reset_peak()
+            pila.append([actual, actual])
+        self.fecha = time.time()
+        self.cpu = time.process_time()
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        segundos = time.perf_counter() - self.inicio
+        cpu = time.process_time() - self.cpu
+        registro = {'etapa': self.nombre, 'fecha': self.fecha, 'segundos': segundos, 'cpu_segundos': cpu,
+                    'filas': self.filas, 'hilo': threading.current_thread().name, 'error': tipo is not None}
+        if self.memoria:
+            pila = self.instrumentacion._pilas.pila
+            base, pico_hijas = pila.pop()
+            pico = max(tracemalloc.get_traced_memory()[1], pico_hijas)
+            registro['pico_bytes'] = pico - base
+            if pila:
+                pila[-1][1] = max(pila[-1][1], pico)
+        self.instrumentacion._registrar(registro)
+        return False
+
+
+### Clase Instrumentacion
+class Instrumentacion:
+    """
+    Mide etapas de una ejecución (descarga de Kraken, preparación del Dataset, cada indicador, las
+    señales, el dibujo de los gráficos y su codificación en PNG): tiempo real, tiempo de CPU, filas
+    procesadas y, opcionalmente, el pico de memoria. Se usa como contexto (etapa) o como decorador
+    (medir) y, mientras está desactivada, cada medición cuesta solo una comprobación.
+    Los resultados se exportan como líneas JSON (una por ejecución) o en el formato de texto de Prometheus.
+    """
+
+    def __init__(self):
+        """Constructor de la clase. La instrumentación empieza desactivada."""
+        self.activa = False
+        self.memoria = False
+        self.registros = []
+        self._lock = threading.Lock()
+        self._pilas = threading.local()  # Etapas abiertas de cada hilo (para el pico de memoria)
+
+    def activar(self, memoria=True):
+        """
+        Activa la instrumentación. Con 'memoria', se mide también el pico de memoria de cada etapa
+        con tracemalloc, lo que ralentiza la ejecución; con varios hilos el pico es aproximado.
+        """
+        self.memoria = memoria
+        if memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.activa = True
+
+    def desactivar(self):
+        """Desactiva la instrumentación (los registros se conservan)."""
+        self.activa = False
+        if self.memoria and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.memoria = False
+
+    def etapa(self, nombre, filas=None):
+        """
+        Contexto que mide el bloque como una ejecución de la etapa 'nombre'.
+        El número de filas se puede indicar aquí o asignar después: with etapa('x') as e: e.filas = n.
+        """
+        if not self.activa:
+            return _ETAPA_NULA
+        return _Etapa(self, nombre, filas)
+
+    def medir(self, nombre=None, filas=None):
+        """
+        Decorador que mide cada llamada a la función como una ejecución de la etapa 'nombre'
+        (por defecto, el nombre cualificado de la función). 'filas' es una función opcional que recibe
+        los mismos argumentos que la función decorada y devuelve el número de filas procesadas.
+        """
+        def decorador(funcion):
+            etiqueta = nombre or funcion.__qualname__
+
+            @functools.wraps(funcion)
+            def envoltorio(*args, **kwargs):
+                if not self.activa:
+                    return funcion(*args, **kwargs)
+                with _Etapa(self, etiqueta, filas(*args, **kwargs) if filas is not None else None):
+                    return funcion(*args, **kwargs)
+            return envoltorio
+        return decorador
+
+    def _registrar(self, registro):
+        with self._lock:
+            self.registros.append(registro)
+
+    def reiniciar(self):
+        """Borra los registros acumulados."""
+        with self._lock:
+            self.registros = []
+
+    def resumen(self):
+        """Devuelve, por etapa, el número de ejecuciones, los totales de tiempo, CPU y filas y el mayor pico de memoria."""
+        with self._lock:
+            registros = list(self.registros)
+        resumen = {}
+        for registro in registros:
+            etapa = resumen.setdefault(registro['etapa'], {'ejecuciones': 0, 'segundos': 0.0, 'cpu_segundos': 0.0,
+                                                            'filas': 0, 'errores': 0, 'pico_bytes': None})
+            etapa['ejecuciones'] += 1
+            etapa['segundos'] += registro['segundos']
+            etapa['cpu_segundos'] += registro['cpu_segundos']
+            etapa['filas'] += registro['filas'] or 0
+            etapa['errores'] += registro['error']
+            if registro.get('pico_bytes') is not None:
+                etapa['pico_bytes'] = max(etapa['pico_bytes'] or 0, registro['pico_bytes'])
+        return resumen
+
+    def guardar_jsonl(self, ruta):
+        """Añade los registros al fichero 'ruta', uno por línea en formato JSON."""
+        with self._lock:
+            registros = list(self.registros)
+        with open(ruta, 'a') as fichero:
+            for registro in registros:
+                fichero.write(json.dumps(registro) + '\n')
+
+    def prometheus(self, prefijo='kraken'):
+        """Devuelve el resumen por etapa en el formato de texto de Prometheus."""
+        metricas = [
+            ('etapa_ejecuciones_total', 'counter', 'Ejecuciones de la etapa', 'ejecuciones'),
+            ('etapa_segundos_total', 'counter', 'Tiempo real acumulado de la etapa en segundos', 'segundos'),
+            ('etapa_cpu_segundos_total', 'counter', 'Tiempo de CPU acumulado de la etapa en segundos', 'cpu_segundos'),
+            ('etapa_filas_total', 'counter', 'Filas procesadas por la etapa', 'filas'),
+            ('etapa_errores_total', 'counter', 'Ejecuciones de la etapa terminadas con una excepción', 'errores'),
+            ('etapa_pico_bytes', 'gauge', 'Mayor pico de memoria de una ejecución de la etapa', 'pico_bytes'),
+        ]
+        resumen = self.resumen()
+        lineas = []
+        for nombre, tipo, ayuda, clave in metricas:
+            lineas.append(f'# HELP {prefijo}_{nombre} {ayuda}')
+            lineas.append(f'# TYPE {prefijo}_{nombre} {tipo}')
+            for etapa, valores in sorted(resumen.items()):
+                if valores[clave] is not None:
+                    etiqueta = etapa.replace('\\', '\\\\').replace('"', '\\"')
+                    lineas.append(f'{prefijo}_{nombre}{{etapa="{etiqueta}"}} {valores[clave]}')
+        return '\n'.join(lineas) + '\n'
+
+    def guardar_prometheus(self, ruta, prefijo='kraken'):
+        """Escribe el resumen en 'ruta' en el formato de texto de Prometheus (p. ej. para el textfile collector)."""
+        with open(ruta, 'w') as fichero:
+            fichero.write(self.prometheus(prefijo))
+
+
+# Instrumentación global del proceso: las etapas del proyecto se miden con ella
+instrumentacion = Instrumentacion()
+etapa = instrumentacion.etapa
+medir = instrumentacion.medir
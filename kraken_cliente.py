@@ -0,0 +1,355 @@
+# Importamos las librerías necesarias
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import krakenex
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentacion import etapa
+
+# Errores de Kraken que son transitorios y merece la pena reintentar
+ERRORES_TRANSITORIOS = ('EAPI:Rate limit exceeded', 'EGeneral:Too many requests', 'EService:Unavailable',
+                        'EService:Busy', 'EService:Deadline elapsed')
+
+
+### Clase LimitadorTokens
+class LimitadorTokens:
+    """
+    Cubo de tokens compartido entre varios hilos para limitar el ritmo de llamadas a la API de Kraken.
+    Se recargan 'llamadas_por_segundo' tokens por segundo hasta un máximo de 'rafaga'; cada llamada
+    consume un token y, si no hay, espera a que se recargue.
+    """
+
+    def __init__(self, llamadas_por_segundo=1.0, rafaga=1):
+        """Constructor de la clase. Recibe el ritmo sostenido y el número de llamadas seguidas permitidas."""
+        self.ritmo = llamadas_por_segundo
+        self.capacidad = rafaga
+        self.tokens = float(rafaga)
+        self.actualizado = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _recargar(self):
+        """Añade los tokens acumulados desde la última actualización (con el lock adquirido)."""
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.actualizado) * self.ritmo)
+        self.actualizado = ahora
+
+    def esperar(self):
+        """Bloquea el hilo hasta que le corresponde un token para llamar a la API."""
+        with self.lock:
+            self._recargar()
+            # El token se reserva aunque el saldo quede negativo: la deuda fija el turno de cada hilo
+            self.tokens -= 1
+            espera = -self.tokens / self.ritmo if self.tokens < 0 else 0.0
+        # Dormimos fuera del lock para que los demás hilos puedan reservar su turno
+        time.sleep(espera)
+
+    def pausar(self, segundos):
+        """Vacía el cubo durante 'segundos' (por ejemplo, cuando Kraken avisa de que se ha superado el límite)."""
+        with self.lock:
+            self._recargar()
+            self.tokens = min(self.tokens, 0.0) - segundos * self.ritmo
+
+
+### Clase ClienteKraken
+class ClienteKraken:
+    """
+    Cliente de la API pública de Kraken compartido por toda la aplicación y seguro entre hilos.
+    Reutiliza las conexiones HTTP, respeta un límite de llamadas con un cubo de tokens, aplica un
+    tiempo máximo a cada petición, reintenta los errores transitorios con esperas exponenciales
+    aleatorizadas y guarda la latencia de cada petición. Tiene la misma interfaz que krakenex.API
+    (query_public), por lo que puede sustituirlo en AlmacenOHLC, el escáner y descubrir_pares.
+    """
+
+    def __init__(self, clave=None, llamadas_por_segundo=1.0, rafaga=1, reintentos=3, espera_base=0.5,
+                 espera_maxima=10.0, timeout=10.0, conexiones=10, uri=None):
+        """
+        Constructor de la clase.
+        - llamadas_por_segundo, rafaga: parámetros del cubo de tokens.
+        - reintentos: reintentos de cada llamada tras un error transitorio.
+        - espera_base, espera_maxima: la espera antes del reintento n es aleatoria entre 0 y
+          min(espera_maxima, espera_base * 2**n) segundos.
+        - timeout: segundos máximos de cada petición HTTP.
+        - conexiones: conexiones HTTP que se mantienen abiertas para reutilizarlas entre hilos.
+        - uri: dirección de la API (por ejemplo, la de un ServidorReplay); por defecto, la de Kraken.
+        """
+        self.clave = clave or ''
+        self.limitador = LimitadorTokens(llamadas_por_segundo, rafaga)
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.timeout = timeout
+        self.uri = uri
+
+        # Una sola sesión con un grupo de conexiones compartido por todos los hilos
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=conexiones, pool_maxsize=conexiones)
+        self.session.mount('https://', adaptador)
+        self.session.mount('http://', adaptador)
+        self._local = threading.local()
+
+        # Métricas de las peticiones
+        self.lock = threading.Lock()
+        self.latencias = deque(maxlen=10000)
+        self.llamadas = 0
+        self.reintentos_realizados = 0
+        self.errores = 0
+
+    def _api(self):
+        """
+        Devuelve el cliente krakenex del hilo actual (krakenex guarda la última respuesta en el
+        objeto y no es seguro entre hilos); todos comparten la misma sesión HTTP.
+        """
+        if not hasattr(self._local, 'k'):
+            k = krakenex.API(self.clave)
+            k.session.close()
+            k.session = self.session
+            if self.uri is not None:
+                k.uri = self.uri.rstrip('/')
+            self._local.k = k
+        return self._local.k
+
+    @staticmethod
+    def _transitorio(error):
+        """Indica si una excepción de requests merece un reintento (red, tiempo agotado, 429 o 5xx)."""
+        if isinstance(error, requests.HTTPError):
+            codigo = error.response.status_code if error.response is not None else 0
+            return codigo == 429 or codigo >= 500
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def query_public(self, method, data=None, timeout=None):
+        """
+        Llama al método público 'method' de la API y devuelve la respuesta JSON.
+        Las respuestas con errores de Kraken no transitorios se devuelven tal cual (con la lista 'error');
+        si tras los reintentos persiste un error de red se lanza la última excepción.
+        """
+        with etapa(f'kraken.{method}'):
+            return self._consultar(method, data, timeout)
+
+    def _consultar(self, method, data, timeout):
+        """Llamada a la API con el límite de ritmo y los reintentos (ver query_public)."""
+        timeout = self.timeout if timeout is None else timeout
+        for intento in range(self.reintentos + 1):
+            self.limitador.esperar()
+            inicio = time.perf_counter()
+            try:
+                respuesta = self._api().query_public(method, data, timeout=timeout)
+                error = None
+            except requests.RequestException as e:
+                respuesta, error = None, e
+            latencia = time.perf_counter() - inicio
+
+            errores_kraken = respuesta.get('error', []) if respuesta is not None else []
+            transitorio = (error is not None and self._transitorio(error)) \
+                or any(e.startswith(ERRORES_TRANSITORIOS) for e in errores_kraken)
+
+            with self.lock:
+                self.llamadas += 1
+                self.latencias.append(latencia)
+                if error is not None or errores_kraken:
+                    self.errores += 1
+
+            if not transitorio or intento == self.reintentos:
+                if error is not None:
+                    raise error
+                return respuesta
+
+            # Espera exponencial aleatorizada antes del reintento
+            espera = random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** intento))
+            if any(e.startswith('EAPI:Rate limit exceeded') for e in errores_kraken):
+                # Kraken nos ha cortado: frenamos también al resto de hilos
+                self.limitador.pausar(espera)
+            with self.lock:
+                self.reintentos_realizados += 1
+            time.sleep(espera)
+
+    def metricas(self):
+        """Devuelve un diccionario con el número de llamadas, reintentos, errores y la latencia en segundos."""
+        with self.lock:
+            latencias = np.array(self.latencias)
+            resumen = {'llamadas': self.llamadas, 'reintentos': self.reintentos_realizados, 'errores': self.errores}
+        if len(latencias):
+            resumen.update({
+                'latencia_media': float(latencias.mean()),
+                'latencia_p50': float(np.percentile(latencias, 50)),
+                'latencia_p95': float(np.percentile(latencias, 95)),
+                'latencia_p99': float(np.percentile(latencias, 99)),
+                'latencia_maxima': float(latencias.max()),
+            })
+        return resumen
+
+    def close(self):
+        """Cierra las conexiones HTTP abiertas."""
+        self.session.close()
+
+
+def _nombre_respuesta(metodo, consulta):
+    """Nombre con el que se guarda una respuesta: el método seguido del par y el intervalo, si los hay."""
+    partes = [metodo] + [str(consulta[clave]) for clave in ('pair', 'interval') if clave in consulta]
+    return '_'.join(partes)
+
+
+def grabar_respuesta(cliente, directorio, metodo, consulta=None):
+    """
+    Llama a la API con 'cliente' y guarda la respuesta en 'directorio' para servirla después
+    con ServidorReplay. Devuelve la ruta del fichero.
+    """
+    consulta = consulta or {}
+    respuesta = cliente.query_public(metodo, consulta)
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, _nombre_respuesta(metodo, consulta) + '.json')
+    with open(ruta, 'w') as fichero:
+        json.dump(respuesta, fichero)
+    return ruta
+
+
+### Clase ServidorReplay
+class ServidorReplay:
+    """
+    Servidor HTTP local que imita la API pública de Kraken con respuestas grabadas.
+    Permite probar y medir la descarga de velas sin conexión: ClienteKraken(uri=servidor.uri).
+    Las respuestas OHLC y Trades respetan el parámetro 'since' (Trades, en páginas de 1000 operaciones).
+    Se pueden simular latencia y errores 503.
+    """
+
+    def __init__(self, directorio=None, respuestas=None, latencia=0.0, tasa_error=0.0, puerto=0, semilla=None):
+        """
+        Constructor de la clase.
+        - directorio: carpeta con las respuestas guardadas por grabar_respuesta.
+        - respuestas: diccionario adicional nombre -> respuesta (nombre como 'OHLC_XXBTZUSD_60').
+        - latencia: segundos de espera antes de cada respuesta.
+        - tasa_error: fracción de peticiones que responden con un error 503.
+        - puerto: puerto local (0 = uno libre cualquiera).
+        """
+        self.respuestas = {}
+        if directorio is not None:
+            for nombre in os.listdir(directorio):
+                if nombre.endswith('.json'):
+                    with open(os.path.join(directorio, nombre)) as fichero:
+                        self.respuestas[nombre[:-5]] = json.load(fichero)
+        self.respuestas.update(respuestas or {})
+        self.latencia = latencia
+        self.tasa_error = tasa_error
+        self.aleatorio = random.Random(semilla)
+        self.peticiones = 0
+        self.lock = threading.Lock()
+
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', puerto), self._manejador())
+        self.servidor.daemon_threads = True
+        self.hilo = None
+
+    @property
+    def uri(self):
+        """Dirección del servidor, para ClienteKraken(uri=...)."""
+        return f"http://127.0.0.1:{self.servidor.server_address[1]}"
+
+    def responder(self, metodo, consulta):
+        """Devuelve (código HTTP, respuesta) para una llamada al método público 'metodo'."""
+        with self.lock:
+            self.peticiones += 1
+            fallo = self.aleatorio.random() < self.tasa_error
+        if self.latencia:
+            time.sleep(self.latencia)
+        if fallo:
+            return 503, {'error': ['EService:Unavailable']}
+
+        respuesta = self.respuestas.get(_nombre_respuesta(metodo, consulta))
+        if respuesta is None:
+            return 200, {'error': ['EQuery:Unknown asset pair'], 'result': {}}
+
+        if metodo == 'OHLC' and 'since' in consulta:
+            # Solo las velas a partir del cursor, como hace Kraken
+            since = int(consulta['since'])
+            resultado = {clave: (valor if clave == 'last' else [fila for fila in valor if int(fila[0]) >= since])
+                         for clave, valor in respuesta['result'].items()}
+            respuesta = {'error': [], 'result': resultado}
+        elif metodo == 'Trades':
+            # Como Kraken: hasta 'count' (1000) operaciones posteriores al cursor (en segundos o nanosegundos)
+            since = int(consulta.get('since', 0))
+            since = since if since > 10**12 else since * 10**9
+            resultado = {'last': str(since)}
+            for clave, valor in respuesta['result'].items():
+                if clave != 'last':
+                    nanosegundos = [round(float(fila[2]) * 1e9) for fila in valor]
+                    posteriores = [i for i, fecha in enumerate(nanosegundos) if fecha > since][:int(consulta.get('count', 1000))]
+                    resultado[clave] = [valor[i] for i in posteriores]
+                    if posteriores:
+                        resultado['last'] = str(nanosegundos[posteriores[-1]])
+            respuesta = {'error': [], 'result': resultado}
+        return 200, respuesta
+
+    def _manejador(self):
+        """Crea la clase que atiende cada petición HTTP."""
+        replay = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                metodo = url.path.rstrip('/').split('/')[-1]
+                consulta = {clave: valores[-1] for clave, valores in parse_qs(url.query).items()}
+                codigo, respuesta = replay.responder(metodo, consulta)
+                cuerpo = json.dumps(respuesta).encode()
+                self.send_response(codigo)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, formato, *args):
+                # Sin una línea por petición en la consola
+                pass
+
+        return Manejador
+
+    def iniciar(self):
+        """Arranca el servidor en un hilo en segundo plano y devuelve su dirección."""
+        self.hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.hilo.start()
+        return self.uri
+
+    def detener(self):
+        """Detiene el servidor y libera el puerto."""
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.detener()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Graba respuestas de Kraken o las sirve con un servidor local.")
+    parser.add_argument('--grabar', nargs='+', metavar='PAR', help="Códigos de Kraken de los pares a grabar")
+    parser.add_argument('--servir', action='store_true', help="Sirve las respuestas grabadas")
+    parser.add_argument('--directorio', default='respuestas', help="Directorio de las respuestas grabadas")
+    parser.add_argument('--interval', type=int, default=60, help="Intervalo de las velas en minutos")
+    parser.add_argument('--puerto', type=int, default=8765, help="Puerto del servidor local")
+    parser.add_argument('--latencia', type=float, default=0.0, help="Latencia simulada por petición (segundos)")
+    parser.add_argument('--tasa-error', type=float, default=0.0, help="Fracción de peticiones con error 503")
+    args = parser.parse_args()
+
+    if args.grabar:
+        cliente = ClienteKraken()
+        grabar_respuesta(cliente, args.directorio, 'AssetPairs')
+        for pair in args.grabar:
+            print(grabar_respuesta(cliente, args.directorio, 'OHLC', {'pair': pair, 'interval': args.interval}))
+    if args.servir:
+        servidor = ServidorReplay(args.directorio, latencia=args.latencia, tasa_error=args.tasa_error,
+                                  puerto=args.puerto)
+        print(f"Sirviendo {len(servidor.respuestas)} respuestas en {servidor.uri} (KRAKEN_URI={servidor.uri})")
+        try:
+            servidor.servidor.serve_forever()
+        except KeyboardInterrupt:
+            servidor.detener()
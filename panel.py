@@ -0,0 +1,221 @@
+# Importamos las librerías necesarias
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from Clase import Dataset
+
+
+def _segundos(df):
+    """Timestamps Unix (segundos) de un DataFrame con la columna 'Date' (Dataset) o 'timestamp' (Kraken/almacén)."""
+    if 'Date' in df:
+        return df['Date'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    return df['timestamp'].to_numpy(dtype=np.int64)
+
+
+def _sumas_acumuladas(valores):
+    """Suma acumulada a lo largo del tiempo con una fila de ceros delante (para sumas de ventanas por diferencia)."""
+    acumulada = np.zeros((valores.shape[0] + 1,) + valores.shape[1:])
+    np.cumsum(valores, axis=0, out=acumulada[1:])
+    return acumulada
+
+
+### Clase PanelPares
+class PanelPares:
+    """
+    Panel de varios pares alineados en un mismo índice temporal regular (una fila por vela).
+    Los precios de cierre y el volumen se guardan en arrays 2-D contiguos (velas x pares), de modo que
+    las rentabilidades, correlaciones y betas de todos los pares se calculan a la vez con operaciones
+    vectorizadas, sin unir DataFrames por fecha.
+
+    Kraken no envía las velas sin operaciones: esas filas quedan marcadas como ausentes en 'presente',
+    con el último cierre conocido y volumen 0. Las rentabilidades de las velas ausentes son NaN y las
+    correlaciones y betas usan, para cada pareja de pares, solo las velas presentes en los dos.
+    """
+
+    def __init__(self, datos, interval=60):
+        """
+        Constructor de la clase.
+        - datos: diccionario par -> Dataset o DataFrame con las columnas 'close' y 'volume' y la fecha
+          en 'Date' o en 'timestamp' (segundos Unix).
+        - interval: minutos por vela del índice común.
+        """
+        if not datos:
+            raise ValueError("El panel necesita al menos un par")
+        self.pares = list(datos)
+        self.interval = interval
+        paso = interval * 60
+
+        frames = [valor.data if isinstance(valor, Dataset) else valor for valor in datos.values()]
+        segundos = [_segundos(df) // paso * paso for df in frames]
+        inicio = min(s.min() for s in segundos if len(s))
+        fin = max(s.max() for s in segundos if len(s))
+        n = int((fin - inicio) // paso) + 1
+        self.fechas = pd.to_datetime(np.arange(inicio, fin + paso, paso), unit='s')
+
+        # Cada par se coloca en su columna según la posición de sus velas en el índice común
+        self.close = np.full((n, len(frames)), np.nan)
+        self.volume = np.zeros((n, len(frames)))
+        self.presente = np.zeros((n, len(frames)), dtype=bool)
+        for columna, (df, s) in enumerate(zip(frames, segundos)):
+            filas = (s - inicio) // paso
+            self.close[filas, columna] = df['close'].to_numpy(dtype=float)
+            self.volume[filas, columna] = df['volume'].to_numpy(dtype=float)
+            self.presente[filas, columna] = True
+
+        # Las velas ausentes toman el último cierre conocido del par (NaN antes de su primera vela)
+        ultima = np.where(self.presente, np.arange(n)[:, None], -1)
+        np.maximum.accumulate(ultima, axis=0, out=ultima)
+        self.close = np.where(ultima >= 0, self.close[np.maximum(ultima, 0), np.arange(len(frames))], np.nan)
+
+    @classmethod
+    def desde_almacen(cls, almacen, pares, interval=60, desde=None, hasta=None):
+        """Construye el panel con las velas guardadas en un AlmacenOHLC para los pares indicados."""
+        return cls({pair: almacen.leer(pair, interval, desde, hasta) for pair in pares}, interval)
+
+    def _tabla(self, valores):
+        """DataFrame velas x pares sobre un array del panel (sin copiarlo)."""
+        return pd.DataFrame(valores, index=self.fechas, columns=self.pares, copy=False)
+
+    def _matriz(self, valores):
+        """DataFrame pares x pares."""
+        return pd.DataFrame(valores, index=self.pares, columns=self.pares)
+
+    def rentabilidades(self, periodos=1, logaritmicas=True):
+        """
+        Array (velas x pares) con la rentabilidad de cada vela respecto a 'periodos' velas antes,
+        logarítmica o simple. Es NaN en las velas ausentes y mientras no hay un cierre anterior.
+        """
+        rentabilidad = np.full(self.close.shape, np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if logaritmicas:
+                np.subtract(np.log(self.close[periodos:]), np.log(self.close[:-periodos]), out=rentabilidad[periodos:])
+            else:
+                np.divide(self.close[periodos:], self.close[:-periodos], out=rentabilidad[periodos:])
+                rentabilidad[periodos:] -= 1
+        rentabilidad[~self.presente] = np.nan
+        return rentabilidad
+
+    def rentabilidad_movil(self, ventana, logaritmicas=True):
+        """DataFrame (velas x pares) con la rentabilidad acumulada de las últimas 'ventana' velas."""
+        return self._tabla(self.rentabilidades(ventana, logaritmicas))
+
+    def _momentos(self, x, y, validos_x, validos_y):
+        """
+        Sumas de los pares de series (x_i, y_j) usando solo las velas válidas en las dos, con productos
+        de matrices: número de velas, sumas de x e y, suma de x*y y sumas de x² e y².
+        Los arrays tienen la forma (..., velas, pares); el resultado, (..., pares de x, pares de y).
+        Si x e y son el mismo array, las sumas de y y de y² son las traspuestas de las de x y x².
+        """
+        if x is y:
+            m = validos_x.astype(float)
+            x = np.where(validos_x, x, 0.0)
+            mt = np.swapaxes(m, -1, -2)
+            xt = np.swapaxes(x, -1, -2)
+            sx = xt @ m
+            sxx = (xt * xt) @ m
+            return (mt @ m, sx, np.swapaxes(sx, -1, -2), xt @ x, sxx, np.swapaxes(sxx, -1, -2))
+        mx = validos_x.astype(float)
+        my = validos_y.astype(float)
+        x = np.where(validos_x, x, 0.0)
+        y = np.where(validos_y, y, 0.0)
+        xt = np.swapaxes(x, -1, -2)
+        mxt = np.swapaxes(mx, -1, -2)
+        return (mxt @ my, xt @ my, mxt @ y, xt @ y, (xt * xt) @ my, mxt @ (y * y))
+
+    @staticmethod
+    def _estadisticos(n, sx, sy, sxy, sxx, syy, min_periodos):
+        """Correlación y beta (de x respecto a y) a partir de las sumas de _momentos."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covarianza = sxy / n - (sx / n) * (sy / n)
+            varianza_x = np.maximum(sxx / n - (sx / n) ** 2, 0.0)
+            varianza_y = np.maximum(syy / n - (sy / n) ** 2, 0.0)
+            correlacion = np.clip(covarianza / np.sqrt(varianza_x * varianza_y), -1.0, 1.0)
+            beta = covarianza / varianza_y
+        insuficientes = n < min_periodos
+        correlacion[insuficientes] = np.nan
+        beta[insuficientes] = np.nan
+        return correlacion, beta
+
+    def _ventana(self, ventana, fin):
+        """Rentabilidades y velas válidas de las 'ventana' velas que terminan en la fila 'fin' (incluida)."""
+        fin = len(self.fechas) - 1 if fin is None else fin
+        if isinstance(fin, (str, pd.Timestamp)):
+            fin = int(self.fechas.searchsorted(pd.Timestamp(fin), side='right')) - 1
+        rentabilidades = self.rentabilidades()[max(fin - ventana + 1, 0):fin + 1]
+        return rentabilidades, ~np.isnan(rentabilidades)
+
+    def correlacion(self, ventana=720, fin=None, min_periodos=None):
+        """
+        Matriz de correlaciones (pares x pares) de las rentabilidades de las 'ventana' velas que terminan
+        en 'fin' (posición o fecha; por defecto, la última vela). Cada pareja usa solo las velas presentes en
+        los dos pares y es NaN con menos de 'min_periodos' velas comunes (por defecto, la mitad de la ventana).
+        """
+        return self._matriz(self.correlacion_y_beta(ventana, fin, min_periodos)[0])
+
+    def beta(self, ventana=720, fin=None, min_periodos=None):
+        """
+        Matriz de betas: la fila i, columna j es la beta del par i respecto al par j
+        (covarianza de sus rentabilidades dividida por la varianza del par j), en la misma ventana que correlacion.
+        """
+        return self._matriz(self.correlacion_y_beta(ventana, fin, min_periodos)[1])
+
+    def correlacion_y_beta(self, ventana=720, fin=None, min_periodos=None):
+        """Arrays (pares x pares) de correlaciones y betas calculados en una sola pasada (ver correlacion y beta)."""
+        rentabilidades, validas = self._ventana(ventana, fin)
+        momentos = self._momentos(rentabilidades, rentabilidades, validas, validas)
+        return self._estadisticos(*momentos, min_periodos or ventana // 2)
+
+    def matrices(self, ventana=720, paso=24, min_periodos=None, memoria=2**27):
+        """
+        Correlaciones y betas de todas las parejas en ventanas de 'ventana' velas que terminan cada 'paso'
+        velas (la última, en la última vela). Devuelve (fechas de fin, correlaciones, betas), con arrays de
+        forma (ventanas, pares, pares). Las ventanas son vistas del array de rentabilidades y se procesan
+        con productos de matrices por lotes de unos 'memoria' bytes.
+        """
+        rentabilidades = self.rentabilidades()
+        n = len(rentabilidades)
+        if n < ventana:
+            raise ValueError(f"El panel tiene {n} velas, menos que la ventana ({ventana})")
+        inicios = np.arange(n - ventana, -1, -paso)[::-1]
+        # Vista (ventanas, velas, pares) sin copiar las rentabilidades
+        vistas = np.swapaxes(sliding_window_view(rentabilidades, ventana, axis=0), 1, 2)[inicios[0]::paso]
+
+        lote = max(1, memoria // (ventana * len(self.pares) * 8))
+        correlaciones = np.empty((len(inicios), len(self.pares), len(self.pares)))
+        betas = np.empty_like(correlaciones)
+        for desde in range(0, len(inicios), lote):
+            bloque = vistas[desde:desde + lote]
+            validas = ~np.isnan(bloque)
+            momentos = self._momentos(bloque, bloque, validas, validas)
+            correlaciones[desde:desde + lote], betas[desde:desde + lote] = \
+                self._estadisticos(*momentos, min_periodos or ventana // 2)
+        return self.fechas[inicios + ventana - 1], correlaciones, betas
+
+    def correlacion_movil(self, referencia, ventana=720, min_periodos=None):
+        """DataFrame (velas x pares) con la correlación móvil de cada par con el par 'referencia'."""
+        return self._tabla(self._movil(referencia, ventana, min_periodos)[0])
+
+    def beta_movil(self, referencia, ventana=720, min_periodos=None):
+        """DataFrame (velas x pares) con la beta móvil de cada par respecto al par 'referencia'."""
+        return self._tabla(self._movil(referencia, ventana, min_periodos)[1])
+
+    def _movil(self, referencia, ventana, min_periodos):
+        """
+        Correlación y beta móviles de todos los pares con la referencia, con sumas acumuladas a lo largo
+        del tiempo: cada ventana se obtiene por diferencia de dos filas, sin recorrerla.
+        """
+        if referencia not in self.pares:
+            raise ValueError(f"Par no válido: {referencia}. Opciones: {', '.join(self.pares)}")
+        rentabilidades = self.rentabilidades()
+        y = rentabilidades[:, [self.pares.index(referencia)]]
+        validas = ~np.isnan(rentabilidades) & ~np.isnan(y)
+        x = np.where(validas, rentabilidades, 0.0)
+        y = np.where(validas, y, 0.0)
+
+        sumas = []
+        for valores in (validas.astype(float), x, y, x * y, x * x, y * y):
+            # Suma de las filas t-ventana+1..t (las primeras ventanas están incompletas)
+            acumulada = _sumas_acumuladas(valores)
+            sumas.append(acumulada[1:] - acumulada[np.maximum(np.arange(1, len(acumulada)) - ventana, 0)])
+        return self._estadisticos(*sumas, min_periodos or ventana // 2)
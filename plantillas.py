@@ -0,0 +1,186 @@
+# Importamos las librerías necesarias
+import io
+import threading
+
+import matplotlib.dates as mdates
+import numpy as np
+
+from Clase import Grafico
+from instrumentacion import etapa, medir
+
+# Tipos de gráfico con un segundo subplot de volumen
+CON_VOLUMEN = {'lineplot_with_volume', 'candlestick_with_volume'}
+
+# Identificadores (gid) de las tres líneas de velas de Grafico._dibujar_velas, en el orden de _segmentos_velas
+VELAS = ['velas_suben', 'velas_bajan', 'velas_mechas']
+
+# Columnas dibujadas como líneas en el eje de precio (Grafico marca cada línea con su columna como gid)
+LINEAS = ['close', 'SMA', 'Banda_Superior', 'Banda_Inferior']
+
+# Estilo de las señales de los gráficos sin volumen (el mismo que usa seaborn en Grafico)
+SENALES = {'Compra': '#00FF7F', 'Venta': '#FF6347'}
+
+
+### Clase PlantillaGrafico
+class PlantillaGrafico:
+    """
+    Figura de un tipo de gráfico de Grafico que se construye una sola vez y se reutiliza.
+    Para dibujar otro par u otra versión de los datos solo se sustituyen los datos de los artistas
+    existentes (set_data en las líneas, set_offsets en las señales y la altura de las barras de volumen)
+    y se reajustan los ejes, sin volver a crear la figura, los ejes, la leyenda ni el estilo.
+    No es segura entre hilos: cada hilo o proceso debe usar la suya (o Plantillas, que usa un lock).
+    """
+
+    def __init__(self, tipo, df, pair):
+        """
+        Constructor de la clase.
+        - tipo: método de Grafico ('lineplot', 'lineplot_with_volume', 'candlestick', 'candlestick_with_volume').
+        - df, pair: datos con las métricas calculadas y par con los que se construye la figura.
+        """
+        if not hasattr(Grafico, tipo) or tipo.startswith('_'):
+            raise ValueError(f"Tipo de gráfico no válido: {tipo}")
+        self.tipo = tipo
+        self.pair = pair
+        self.figura = getattr(Grafico(df, pair), tipo)()
+        self._localizar_artistas()
+        self._escala_ajustada = self._escala()
+
+    def _localizar_artistas(self):
+        """
+        Guarda las referencias a los artistas que dependen de los datos. Las líneas se buscan por el gid
+        con el que las marca Grafico (la columna que dibujan), no por su posición.
+        """
+        self.ax_precio = self.figura.axes[0]
+        self.ax_volumen = self.figura.axes[1] if self.tipo in CON_VOLUMEN else None
+
+        # Velas (tres líneas) o precio de cierre, la SMA y las dos bandas
+        lineas = {linea.get_gid(): linea for linea in self.ax_precio.lines}
+        self.velas = [lineas[gid] for gid in VELAS if gid in lineas]
+        self.lineas = {columna: lineas[columna] for columna in LINEAS if columna in lineas}
+
+        # seaborn no crea el artista de una señal sin puntos: se crea vacío con el mismo estilo
+        self.senales = {coleccion.get_label(): coleccion for coleccion in self.ax_precio.collections
+                        if coleccion.get_label() in SENALES}
+        if len(self.senales) < len(SENALES):
+            for etiqueta, color in SENALES.items():
+                if etiqueta not in self.senales:
+                    self.senales[etiqueta] = self.ax_precio.scatter([], [], color=color, s=100, marker='o',
+                                                                    edgecolor='white', linewidth=0.8, label=etiqueta)
+            self.ax_precio.legend(facecolor='black', frameon=True,
+                                  fontsize=12 if self.tipo == 'lineplot' else None)
+
+        if self.ax_volumen is not None:
+            self.barras = list(self.ax_volumen.containers[0].patches)
+            self.volumen_sma = next(linea for linea in self.ax_volumen.lines if linea.get_gid() == 'Volume_SMA')
+
+    @medir(filas=lambda self, df, pair: len(df))
+    def actualizar(self, df, pair):
+        """
+        Sustituye los datos de la figura por los de 'df' (con las métricas calculadas) y devuelve la figura.
+        Los márgenes (tight_layout) solo se recalculan si cambia la escala de algún eje Y, que es cuando
+        puede cambiar el ancho de sus etiquetas (por ejemplo, de un par en dólares a otro en bitcoins).
+        """
+        fechas = df.Date.to_numpy()
+
+        if self.velas:
+            for linea, (xs, ys) in zip(self.velas, Grafico(df, pair)._segmentos_velas()):
+                linea.set_data(xs, ys)
+        for columna, linea in self.lineas.items():
+            linea.set_data(fechas, df[columna].to_numpy())
+
+        x = mdates.date2num(fechas)
+        close = df['close'].to_numpy()
+        for etiqueta, columna in (('Compra', 'Buy_Signal'), ('Venta', 'Sell_Signal')):
+            marcadas = df[columna].to_numpy() == 1
+            self.senales[etiqueta].set_offsets(np.column_stack([x[marcadas], close[marcadas]]))
+
+        if self.ax_volumen is not None:
+            volumen = df['volume'].to_numpy()
+            volumen_sma = df['Volume_SMA'].to_numpy()
+            self._actualizar_barras(x, volumen)
+            self.volumen_sma.set_data(fechas, volumen_sma)
+
+        # Títulos con el nuevo par
+        for texto in [self.figura._suptitle] + [ax.title for ax in self.figura.axes]:
+            if texto is not None:
+                texto.set_text(texto.get_text().replace(self.pair, pair))
+        self.pair = pair
+
+        # Reajuste de los ejes a los nuevos datos. En el volumen, los límites se calculan directamente
+        # a partir de los datos: relim recorre las barras una a una y es mucho más lento
+        self.ax_precio.relim()
+        self.ax_precio.autoscale_view()
+        if self.ax_volumen is not None:
+            ancho = self.barras[0].get_width() if self.barras else 0.05
+            puntos = np.concatenate([np.column_stack([x - ancho / 2, np.zeros(len(x))]),
+                                     np.column_stack([x + ancho / 2, volumen]),
+                                     np.column_stack([x, volumen_sma])])
+            self.ax_volumen.ignore_existing_data_limits = True
+            self.ax_volumen.update_datalim(puntos[np.isfinite(puntos).all(axis=1)])
+            self.ax_volumen.autoscale_view()
+
+        escala = self._escala()
+        if escala != self._escala_ajustada:
+            self.figura.tight_layout()
+            self._escala_ajustada = escala
+        return self.figura
+
+    def _escala(self):
+        """Orden de magnitud del valor máximo y del rango de cada eje Y (determina el ancho de sus etiquetas)."""
+        escala = []
+        for ax in self.figura.axes:
+            inferior, superior = ax.get_ylim()
+            escala.append((int(np.floor(np.log10(max(abs(inferior), abs(superior), 1e-12)))),
+                           int(np.floor(np.log10(max(superior - inferior, 1e-12))))))
+        return escala
+
+    def _actualizar_barras(self, x, volumen):
+        """
+        Mueve las barras de volumen existentes y cambia su altura. Si hay más velas que barras solo se
+        crean las que faltan, y si hay menos se ocultan las sobrantes.
+        """
+        if len(x) > len(self.barras):
+            nuevas = self.ax_volumen.bar(x[len(self.barras):], volumen[len(self.barras):], color='#6495ED', width=0.05)
+            self.barras.extend(nuevas.patches)
+        ancho = self.barras[0].get_width() if self.barras else 0.05
+        for barra, posicion, altura in zip(self.barras, x - ancho / 2, volumen):
+            barra.set_x(posicion)
+            barra.set_height(altura)
+            barra.set_visible(True)
+        for barra in self.barras[len(x):]:
+            barra.set_visible(False)
+
+    def a_bytes(self, formato='png', dpi=100, **opciones):
+        """Dibuja la figura en memoria (sin cerrarla, para reutilizarla) y devuelve los bytes."""
+        buffer = io.BytesIO()
+        with etapa(f'PlantillaGrafico.a_bytes.{formato}'):
+            self.figura.savefig(buffer, format=formato, dpi=dpi, **opciones)
+        return buffer.getvalue()
+
+
+### Clase Plantillas
+class Plantillas:
+    """
+    Una PlantillaGrafico por tipo de gráfico, creada la primera vez que se pide y compartida entre hilos
+    (por ejemplo, todas las sesiones de Streamlit). Como matplotlib no es seguro entre hilos, cada
+    gráfico se actualiza y se dibuja con un lock.
+    """
+
+    def __init__(self):
+        """Constructor de la clase."""
+        self._plantillas = {}
+        self._lock = threading.Lock()
+
+    def figura(self, tipo, df, pair):
+        """Devuelve la figura del tipo indicado con los datos de 'df' (no se debe cerrar)."""
+        plantilla = self._plantillas.get(tipo)
+        if plantilla is None:
+            plantilla = self._plantillas[tipo] = PlantillaGrafico(tipo, df, pair)
+            return plantilla.figura
+        return plantilla.actualizar(df, pair)
+
+    def a_bytes(self, tipo, df, pair, formato='png', dpi=100, **opciones):
+        """Dibuja el gráfico del tipo indicado con los datos de 'df' y devuelve los bytes de la imagen."""
+        with self._lock:
+            self.figura(tipo, df, pair)
+            return self._plantillas[tipo].a_bytes(formato, dpi, **opciones)
@@ -0,0 +1,9 @@
+# Importamos las librerías necesarias
+import os
+import sys
+
+import matplotlib
+
+# Los módulos del proyecto están en la raíz del repositorio; los gráficos se dibujan sin ventana
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+matplotlib.use('Agg')
@@ -0,0 +1,27 @@
+# Importamos las librerías necesarias
+import numpy as np
+import pytest
+
+from backtest import Backtest
+from barrido import barrido
+from benchmark import generar_ohlc
+from Clase import Dataset
+
+FILAS = generar_ohlc(3000, 11)
+
+
+@pytest.mark.parametrize('rsi_compra, rsi_venta', [(None, None), (45, 55)])
+def test_barrido_igual_a_get_metrics_y_backtest(rsi_compra, rsi_venta):
+    tabla = barrido(Dataset(FILAS).data, ventanas=(10, 20), multiplicadores=(1.0, 1.8), ventanas_volumen=(5, 20),
+                    periodos_rsi=(7, 14), rsi_compra=rsi_compra, rsi_venta=rsi_venta, procesos=2)
+    assert len(tabla) == (16 if rsi_compra is not None else 8)
+
+    for _, fila in tabla.iloc[::3].iterrows():
+        dataset = Dataset(FILAS)
+        dataset.get_metrics(ventana=int(fila['ventana']), multiplicador=fila['multiplicador'],
+                            ventana_volumen=int(fila['ventana_volumen']), periodo_rsi=int(fila['periodo_rsi']),
+                            rsi_compra=rsi_compra, rsi_venta=rsi_venta)
+        assert fila['compras'] == dataset.data['Buy_Signal'].sum()
+        assert fila['ventas'] == dataset.data['Sell_Signal'].sum()
+        for clave, valor in Backtest(dataset.data).ejecutar().items():
+            np.testing.assert_allclose(fila[clave], valor, rtol=1e-9, equal_nan=True, err_msg=clave)
@@ -0,0 +1,34 @@
+# Importamos las librerías necesarias
+import numpy as np
+import pandas as pd
+
+from benchmark import generar_ohlc
+from Clase import Dataset
+
+
+def _con_indicadores(filas):
+    dataset = Dataset(filas)
+    dataset.get_metrics()
+    dataset.calculate_EMA()
+    dataset.calculate_ATR()
+    return dataset
+
+
+def test_append_igual_al_calculo_completo():
+    # Kraken vuelve a enviar la última vela (abierta) junto con la nueva
+    filas = generar_ohlc(1200, 5)
+    dataset = _con_indicadores(filas[:1000])
+    for i in range(1000, 1200):
+        dataset.append([filas[i - 1], filas[i]])
+    pd.testing.assert_frame_equal(dataset.data, _con_indicadores(filas).data, check_exact=False, rtol=1e-9)
+
+
+def test_append_escribe_en_los_arrays_sin_copiar_el_historico():
+    filas = generar_ohlc(1100, 5)
+    dataset = _con_indicadores(filas[:1000])
+    dataset.append(filas[1000:1001])  # Reserva arrays del doble de tamaño
+    close, ema = dataset.data['close'].to_numpy(), dataset.data['EMA'].to_numpy()
+    for i in range(1001, 1100):
+        dataset.append([filas[i - 1], filas[i]])
+    assert np.shares_memory(dataset.data['close'].to_numpy(), close)
+    assert np.shares_memory(dataset.data['EMA'].to_numpy(), ema)
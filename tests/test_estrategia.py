@@ -0,0 +1,92 @@
+# Importamos las librerías necesarias
+import numpy as np
+import pandas as pd
+import pytest
+
+from Clase import Estrategia
+
+
+def _senales_bucle(df):
+    """Señales con el recorrido fila a fila original de Estrategia (1 o None en cada fila)."""
+    compra, venta = [None] * len(df), [None] * len(df)
+    close, volumen = df['close'], df['volume']
+    for i in range(20, len(df)):
+        if close[i] < df['Banda_Inferior'][i] and volumen[i] > df['Volume_SMA'][i] and close[i] > close[i-1]:
+            compra[i] = 1
+        elif close[i] <= df['Banda_Inferior'][i] and volumen[i] < df['Volume_SMA'][i]:
+            compra[i] = 1
+        if close[i] > df['Banda_Superior'][i] and volumen[i] > df['Volume_SMA'][i] and close[i] < close[i-1]:
+            venta[i] = 1
+        elif close[i] >= df['Banda_Superior'][i] and volumen[i] < df['Volume_SMA'][i]:
+            venta[i] = 1
+    return np.array([s is not None for s in compra]), np.array([s is not None for s in venta])
+
+
+def _ohlc_sintetico(n, semilla):
+    """Cierres y volúmenes aleatorios con SMA, Bandas de Bollinger y SMA de volumen (NaN al principio)."""
+    rng = np.random.default_rng(semilla)
+    # Precios con un decimal para que haya cierres repetidos
+    close = pd.Series(np.round(100 + rng.normal(0, 1, n).cumsum(), 1))
+    volumen = pd.Series(rng.integers(1, 10, n).astype(float))
+    sma = close.rolling(20).mean()
+    desviacion = close.rolling(20).std(ddof=0).shift(1)
+    return pd.DataFrame({'close': close, 'volume': volumen, 'SMA': sma,
+                         'Banda_Superior': sma + 1.8 * desviacion, 'Banda_Inferior': sma - 1.8 * desviacion,
+                         'Volume_SMA': volumen.rolling(20).mean()})
+
+
+def _con_empates(df):
+    """Fuerza cierres iguales a las bandas y volúmenes iguales a su SMA en varias filas."""
+    df = df.copy()
+    filas = np.arange(25, len(df), 7)
+    df.loc[filas[::2], 'close'] = df.loc[filas[::2], 'Banda_Inferior']
+    df.loc[filas[1::2], 'close'] = df.loc[filas[1::2], 'Banda_Superior']
+    df.loc[filas[::3], 'volume'] = df.loc[filas[::3], 'Volume_SMA']
+    return df
+
+
+@pytest.mark.parametrize('semilla', [0, 1, 2])
+@pytest.mark.parametrize('empates', [False, True])
+def test_senales_iguales_al_bucle_original(semilla, empates):
+    df = _ohlc_sintetico(2000, semilla)
+    if empates:
+        df = _con_empates(df)
+    compra, venta = _senales_bucle(df)
+
+    estrategia = Estrategia(df.copy())
+    estrategia.buy_signal()
+    estrategia.sell_signal()
+    np.testing.assert_array_equal(estrategia.df['Buy_Signal'].to_numpy(), compra)
+    np.testing.assert_array_equal(estrategia.df['Sell_Signal'].to_numpy(), venta)
+    assert compra.any() and venta.any()
+
+
+def test_sin_senales_en_el_calentamiento():
+    # Las primeras 20 filas no tienen señal aunque cumplan las condiciones, y las bandas NaN no dan señal
+    df = _ohlc_sintetico(60, 3)
+    df.loc[:, 'Banda_Inferior'] = np.inf
+    df.loc[:, 'Volume_SMA'] = np.inf
+    df.loc[40:, 'Banda_Inferior'] = np.nan
+    estrategia = Estrategia(df)
+    estrategia.buy_signal()
+    senal = estrategia.df['Buy_Signal'].to_numpy()
+    assert not senal[:20].any() and senal[20:40].all() and not senal[40:].any()
+    np.testing.assert_array_equal(senal, _senales_bucle(df)[0])
+
+
+def test_empates_en_los_umbrales():
+    # Cierre igual a la banda: solo hay señal con volumen por debajo de su SMA (no con volumen igual)
+    n = 24
+    df = pd.DataFrame({'close': np.full(n, 100.0), 'volume': np.full(n, 5.0), 'SMA': np.full(n, 100.0),
+                       'Banda_Superior': np.full(n, 100.0), 'Banda_Inferior': np.full(n, 100.0),
+                       'Volume_SMA': np.full(n, 5.0)})
+    df.loc[21, 'volume'] = 4.0
+    df.loc[22, 'volume'] = 6.0
+    estrategia = Estrategia(df)
+    estrategia.buy_signal()
+    estrategia.sell_signal()
+    esperado = np.zeros(n, dtype=bool)
+    esperado[21] = True
+    np.testing.assert_array_equal(estrategia.df['Buy_Signal'].to_numpy(), esperado)
+    np.testing.assert_array_equal(estrategia.df['Sell_Signal'].to_numpy(), esperado)
+    np.testing.assert_array_equal(esperado, _senales_bucle(df)[0])
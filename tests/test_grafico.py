@@ -0,0 +1,32 @@
+# Importamos las librerías necesarias
+import matplotlib.pyplot as plt
+import numpy as np
+
+from benchmark import generar_ohlc
+from Clase import Dataset, Grafico
+
+
+def _artistas(filas):
+    """Número de líneas y colecciones del eje en el que se dibujan 'filas' velas."""
+    grafico = Grafico(Dataset(generar_ohlc(filas, 1)).data, 'XBTUSD')
+    figura, ax = plt.subplots()
+    try:
+        grafico._dibujar_velas(ax)
+        return len(ax.lines), len(ax.collections)
+    finally:
+        plt.close(figura)
+
+
+def test_artistas_no_dependen_del_numero_de_velas():
+    assert _artistas(100) == _artistas(100_000) == (3, 0)
+
+
+def test_segmentos_de_las_velas():
+    dataset = Dataset(generar_ohlc(1000, 1))
+    suben, bajan, mechas = Grafico(dataset.data, 'XBTUSD')._segmentos_velas()
+    # Cada vela aporta un cuerpo y dos mechas; cada segmento son dos puntos seguidos de un hueco
+    assert len(suben[1]) + len(bajan[1]) == 3 * len(dataset.data)
+    assert len(mechas[1]) == 2 * 3 * len(dataset.data)
+    for xs, ys in (suben, bajan, mechas):
+        assert np.isnan(ys[2::3]).all() and np.isnat(xs[2::3]).all()
+        assert np.isfinite(ys.reshape(-1, 3)[:, :2]).all()
@@ -0,0 +1,170 @@
+# Importamos las librerías necesarias
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import generar_ohlc
+from Clase import (Dataset, filtro_exponencial, media_varianza_movil, media_wilder, paso_atr, paso_ema, paso_keltner,
+                   paso_macd, paso_rsi_wilder)
+
+# Cierres del ejemplo de RSI de StockCharts y sus RSI de 14 periodos publicados (desde la 15.ª vela).
+# StockCharts redondea las medias a 2 decimales, por lo que los valores difieren en unas centésimas.
+CIERRES_RSI = [44.34, 44.09, 44.15, 43.61, 44.33, 44.83, 45.10, 45.42, 45.84, 46.08,
+               45.89, 46.03, 45.61, 46.28, 46.28, 46.00, 46.03, 46.41, 46.22, 45.64]
+RSI_PUBLICADO = [70.53, 66.32, 66.55, 69.41, 66.36, 57.97]
+
+
+def _dataset(filas):
+    """Dataset con velas de 1 hora a partir de (high, low, close)."""
+    return Dataset([[1700000000 + 3600 * i, c, h, l, c, c, 1.0, 1] for i, (h, l, c) in enumerate(filas)])
+
+
+def _velas(filas=3000, semilla=7):
+    """Dataset de velas sintéticas y sus columnas high, low y close."""
+    filas = np.array(generar_ohlc(filas, semilla))[:, 2:5].astype(float)
+    return _dataset(filas), filas.T
+
+
+def _rango_bucle(high, low, close):
+    """True range de cada vela (NaN en la primera, sin cierre anterior)."""
+    return np.r_[np.nan, np.maximum.reduce([high[1:] - low[1:], np.abs(high[1:] - close[:-1]),
+                                            np.abs(low[1:] - close[:-1])])]
+
+
+def _wilder_bucle(valores, periodo):
+    """Media de Wilder fila a fila, como la define Wilder (el primer valor de 'valores' es NaN)."""
+    media = np.full(len(valores), np.nan)
+    media[periodo] = np.mean(valores[1:periodo + 1])
+    for i in range(periodo + 1, len(valores)):
+        media[i] = (media[i - 1] * (periodo - 1) + valores[i]) / periodo
+    return media
+
+
+@pytest.mark.parametrize('alfa', [0.999, 0.9, 2 / 3, 0.5, 1 / 3, 0.1, 0.01, 1e-4])
+def test_filtro_exponencial_igual_a_pandas_ewm(alfa):
+    x = np.random.default_rng(0).normal(size=20000).cumsum() + 1000
+    esperado = pd.Series(x).ewm(alpha=alfa, adjust=False).mean().to_numpy()
+    np.testing.assert_allclose(filtro_exponencial(x, alfa), esperado, rtol=1e-12, atol=1e-9)
+
+
+@pytest.mark.parametrize('periodo', [2, 3, 20])
+def test_ema_periodos_cortos_en_series_largas(periodo):
+    filas = generar_ohlc(5000, 1)
+    dataset = Dataset(filas)
+    dataset.calculate_EMA(periodo=periodo)
+    esperado = dataset.data['close'].ewm(span=periodo, adjust=False).mean().to_numpy()
+    assert np.isfinite(dataset.data['EMA']).all()
+    np.testing.assert_allclose(dataset.data['EMA'], esperado, rtol=1e-12)
+
+
+@pytest.mark.parametrize('periodo', [2, 14])
+def test_media_wilder_igual_al_bucle(periodo):
+    x = np.abs(np.random.default_rng(1).normal(size=6000))
+    x[0] = np.nan
+    np.testing.assert_allclose(media_wilder(x, periodo), _wilder_bucle(x, periodo), rtol=1e-12, equal_nan=True)
+
+
+def test_rsi_wilder_valores_publicados():
+    dataset = _dataset([(c, c, c) for c in CIERRES_RSI])
+    dataset.calculate_RSI(metodo='wilder')
+    rsi = dataset.data['rsi'].to_numpy()
+    assert np.isnan(rsi[:14]).all()
+    np.testing.assert_allclose(rsi[14:], RSI_PUBLICADO, atol=0.1)
+
+
+def test_atr_igual_a_la_definicion_de_wilder():
+    dataset, (high, low, close) = _velas()
+    dataset.calculate_ATR(periodo=14)
+    np.testing.assert_allclose(dataset.data['ATR'], _wilder_bucle(_rango_bucle(high, low, close), 14),
+                               rtol=1e-12, equal_nan=True)
+
+
+def test_atr_con_rango_constante():
+    # Velas sin huecos con un rango de 2: el true range y el ATR valen 2 desde la segunda vela
+    dataset = _dataset([(101.0, 99.0, 100.0)] * 40)
+    dataset.calculate_ATR(periodo=14)
+    atr = dataset.data['ATR'].to_numpy()
+    assert np.isnan(atr[:14]).all()
+    np.testing.assert_allclose(atr[14:], 2.0)
+
+
+def test_bandas_de_bollinger_iguales_al_bucle_original():
+    # Serie con tramos planos: la desviación de las ventanas constantes debe ser la de np.std, no 0
+    filas = np.array(generar_ohlc(3000, 3))[:, 2:5].astype(float)
+    filas[1000:1100] = filas[1000]
+    filas[2500:2530] = filas[2500]
+    dataset = _dataset(filas)
+    dataset.calculate_bollinger_bands()
+    close = dataset.data['close'].to_numpy()
+    sma = dataset.data['close'].rolling(20).mean().to_numpy()
+    superior = np.full(len(close), np.nan)
+    for i in range(20, len(close)):
+        superior[i] = sma[i] + 1.8 * np.std(close[i - 20:i])
+    np.testing.assert_allclose(dataset.data['Banda_Superior'], superior, rtol=1e-13, equal_nan=True)
+
+
+def test_varianza_movil_de_ventanas_constantes_igual_a_np_var():
+    x = np.r_[np.random.default_rng(2).normal(30000, 500, 300), np.full(200, 30123.1)]
+    varianza = media_varianza_movil(x, 20)[1]
+    esperada = np.array([np.var(x[i - 19:i + 1]) for i in range(19, len(x))])
+    np.testing.assert_allclose(varianza[19:], esperada, rtol=1e-9, atol=0)
+    np.testing.assert_array_equal(varianza[-150:], esperada[-150:])
+
+
+def test_rsi_simple_igual_a_la_definicion():
+    dataset, (_, _, close) = _velas()
+    dataset.calculate_RSI(periodo=14)
+    delta = np.diff(close)
+    esperado = np.full(len(close), np.nan)
+    for i in range(14, len(close)):
+        ventana = delta[i - 14:i]
+        ganancia, perdida = ventana[ventana > 0].sum() / 14, -ventana[ventana < 0].sum() / 14
+        esperado[i] = 100 - 100 / (1 + ganancia / perdida)
+    # La primera diferencia cuenta como 0 en las medias de pandas, por lo que el RSI ya tiene valor en la fila 13
+    rsi = dataset.data['rsi'].to_numpy()
+    assert np.isnan(rsi[:13]).all()
+    np.testing.assert_allclose(rsi[14:], esperado[14:], rtol=1e-9)
+
+
+def test_macd_igual_a_pandas_ewm():
+    dataset, _ = _velas()
+    dataset.calculate_MACD(rapida=12, lenta=26, senal=9)
+    close = dataset.data['close']
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    senal = macd.ewm(span=9, adjust=False).mean()
+    np.testing.assert_allclose(dataset.data['MACD'], macd, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(dataset.data['MACD_Senal'], senal, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(dataset.data['MACD_Histograma'], macd - senal, rtol=1e-9, atol=1e-9)
+
+
+def test_keltner_igual_a_ewm_y_atr_de_wilder():
+    dataset, (high, low, close) = _velas()
+    dataset.calculate_keltner_channels(periodo=20, periodo_atr=14, multiplicador=2.0)
+    media = dataset.data['close'].ewm(span=20, adjust=False).mean().to_numpy()
+    atr = _wilder_bucle(_rango_bucle(high, low, close), 14)
+    np.testing.assert_allclose(dataset.data['Keltner_Media'], media, rtol=1e-12)
+    np.testing.assert_allclose(dataset.data['Keltner_Superior'], media + 2.0 * atr, rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(dataset.data['Keltner_Inferior'], media - 2.0 * atr, rtol=1e-12, equal_nan=True)
+
+
+def test_pasos_reproducen_la_ultima_fila():
+    # Cada paso_*, aplicado al estado de la penúltima vela y a la última, da el último valor de la serie
+    dataset, (high, low, close) = _velas()
+    ema = dataset.indicador('EMA', periodo_ema=20)
+    rapida, lenta = dataset.indicador('ema_rapida', macd_rapida=12), dataset.indicador('ema_lenta', macd_lenta=26)
+    macd, senal, histograma = (dataset.indicador(nombre, macd_rapida=12, macd_lenta=26, macd_senal=9)
+                               for nombre in ('MACD', 'MACD_Senal', 'MACD_Histograma'))
+    ganancia, perdida = dataset.indicador('ganancia_media'), dataset.indicador('perdida_media')
+    rsi = dataset.indicador('rsi_wilder')
+    atr = dataset.indicador('ATR', periodo_atr=14)
+    keltner = [dataset.indicador(nombre, periodo_keltner=20, periodo_atr=14, multiplicador_keltner=2.0)
+               for nombre in ('Keltner_Media', 'ATR', 'Keltner_Superior', 'Keltner_Inferior')]
+
+    np.testing.assert_allclose(paso_ema(ema[-2], close[-1], 20), ema[-1], rtol=1e-12)
+    np.testing.assert_allclose(paso_macd(rapida[-2], lenta[-2], senal[-2], close[-1], 12, 26, 9),
+                               [rapida[-1], lenta[-1], macd[-1], senal[-1], histograma[-1]], rtol=1e-9)
+    np.testing.assert_allclose(paso_rsi_wilder(ganancia[-2], perdida[-2], close[-2], close[-1], 14),
+                               [ganancia[-1], perdida[-1], rsi[-1]], rtol=1e-12)
+    np.testing.assert_allclose(paso_atr(atr[-2], high[-1], low[-1], close[-2], 14), atr[-1], rtol=1e-12)
+    np.testing.assert_allclose(paso_keltner(keltner[0][-2], keltner[1][-2], high[-1], low[-1], close[-1], close[-2],
+                                            20, 14, 2.0), [serie[-1] for serie in keltner], rtol=1e-12)
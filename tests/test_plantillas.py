@@ -0,0 +1,43 @@
+# Importamos las librerías necesarias
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+import Clase
+
+from benchmark import generar_ohlc
+from Clase import Dataset
+from plantillas import PlantillaGrafico
+
+
+def _datos(filas, semilla=1):
+    dataset = Dataset(generar_ohlc(filas, semilla))
+    dataset.get_metrics()
+    return dataset.data
+
+
+@pytest.fixture(params=[False, True], ids=['seaborn', 'sin_series_vacias'])
+def sin_series_vacias(request, monkeypatch):
+    # Algunas versiones de seaborn no crean la línea de una serie sin ningún valor
+    if request.param:
+        lineplot = Clase.sns.lineplot
+        monkeypatch.setattr(Clase.sns, 'lineplot', lambda ax=None, y=None, **opciones:
+                            ax if y.isna().all() else lineplot(ax=ax, y=y, **opciones))
+
+
+@pytest.mark.parametrize('tipo', ['lineplot', 'lineplot_with_volume', 'candlestick', 'candlestick_with_volume'])
+def test_lineas_por_columna_con_menos_velas_que_la_ventana(tipo, sin_series_vacias):
+    # Con 10 velas la SMA y las bandas son todo NaN y seaborn no crea sus líneas
+    plantilla = PlantillaGrafico(tipo, _datos(10), 'XBTUSD')
+    try:
+        df = _datos(200, 2)
+        plantilla.actualizar(df, 'ETHUSD')
+        for columna, linea in plantilla.lineas.items():
+            np.testing.assert_array_equal(linea.get_ydata(), df[columna].to_numpy())
+        assert set(plantilla.lineas) >= {'SMA', 'Banda_Superior', 'Banda_Inferior'}
+        if plantilla.ax_volumen is not None:
+            np.testing.assert_array_equal(plantilla.volumen_sma.get_ydata(), df['Volume_SMA'].to_numpy())
+        if tipo.startswith('candlestick'):
+            assert len(plantilla.velas) == 3
+    finally:
+        plt.close(plantilla.figura)